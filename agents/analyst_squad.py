@@ -1,21 +1,17 @@
 from agents.base_agent import BaseAgent
 from google.adk.agents import Agent
+from infrastructure.code_executor import code_executor
+from infrastructure.dataset_cache import dataset_cache
+from tools.stats_kernel import phase1_stats, plot_phase1
+from tools.sampling import SampleInfo, approximate_source, annotate_phase1, code_helpers, code_instructions
+from config import config
 import os
-import pandas as pd
-import matplotlib
 import uuid
 import json
 import asyncio
-import io
-import sys
-import traceback
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
-# Force Agg backend to prevent GUI errors on servers
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
-
 # --- Data Models (Pydantic) ---
 
 class CodeGeneration(BaseModel):
@@ -41,6 +37,41 @@ class DeepDivePlan(BaseModel):
     reasoning: str = Field(..., description="Why we are stopping or continuing.")
     next_tasks: Optional[List[DeepDiveTask]] = Field(None, description="List of tasks if is_complete is FALSE.")
 
+# Phase-1 scan: specialty -> (task instruction, plot filename)
+PHASE1_TASKS = {
+    "Univariate": ("Analyze distribution of key numeric columns. Calculate skewness and IQR.", "Univariate_chart.png"),
+    "Bivariate": ("Calculate Pearson correlation matrix for numeric columns.", "Bivariate_chart.png"),
+    "Trend": ("Analyze overall time-series trend and calculate slope/growth.", "Trend_chart.png")
+}
+
+PLOT_ROOT = "static/plots"
+
+def plot_dir_for(run_id: Optional[str] = None) -> str:
+    """
+    The chart directory of one analysis run, so concurrent runs (batch datasets, server
+    sessions) never write to the same files.
+
+    Args:
+        run_id (str, optional): The session ID of the run (None = the shared root).
+
+    Returns:
+        str: The directory. It is created by the stage that writes charts into it, so looking
+        the path up (e.g. to describe a server session) has no side effects.
+    """
+    plot_dir = os.path.join(PLOT_ROOT, run_id) if run_id else PLOT_ROOT
+    return plot_dir.replace('\\', '/')
+
+def without_plots(findings):
+    """
+    A copy of analysis findings without their 'plot' paths. The paths change with every session
+    and deep dive, so prompts that embed them would never hit the response cache.
+    """
+    if isinstance(findings, dict):
+        return {key: without_plots(value) for key, value in findings.items() if key != "plot"}
+    if isinstance(findings, list):
+        return [without_plots(value) for value in findings]
+    return findings
+
 # --- Agents ---
 
 class Analyst(BaseAgent):
@@ -53,12 +84,14 @@ class Analyst(BaseAgent):
         super().__init__(name=name, system_instruction=instruction)
         self.specialty = specialty
 
-    async def execute_task(self, file_path, schema, task_instruction, plot_filename):
+    async def execute_task(self, file_path, schema, task_instruction, plot_filename, sample: Optional[SampleInfo] = None, plot_dir: str = PLOT_ROOT):
         """
         Performs the analysis loop with Auto-Fix Retries.
+        With a sample (approximate mode), the code runs on the sampled rows and reports confidence intervals.
+        Charts are saved under `plot_dir` (see plot_dir_for). The path reaches the code as the
+        `plot_path` variable, not through the prompt, so reruns in other sessions hit the response cache.
         """
-        plot_dir = "static/plots"
-        if not os.path.exists(plot_dir): os.makedirs(plot_dir)
+        os.makedirs(plot_dir, exist_ok=True)
         plot_path = os.path.join(plot_dir, plot_filename).replace('\\', '/')
 
         # --- STEP 1: GENERATE INITIAL CODE ---
@@ -67,15 +100,17 @@ class Analyst(BaseAgent):
         CONTEXT: Dataset: '{file_path}' | Schema: {schema}
         
         INSTRUCTIONS:
-        1. Write Python code to load data and CALCULATE statistics.
+        1. Write Python code to CALCULATE statistics.
+           - The dataset is ALREADY LOADED as the pandas DataFrame `df`. Do NOT read the file again.
            - Univariate: Skew, Kurtosis, IQR, Outlier count.
            - Bivariate: Correlation coeff, covariance, p-values.
            - Trend: Growth rate, slope, seasonality.
         2. Generate a professional matplotlib plot.
-           - Save plot to: '{plot_path}'
+           - Save plot to the path in the predefined variable `plot_path`: `plt.savefig(plot_path)`
            - Call `plt.close()` at the end to free memory.
            - You MAY use seaborn for Heatmaps and complex statistical plots
         3. Return JSON with 'thought_process' and 'code'.
+        {code_instructions(sample) if sample else ""}
         """
         
         # Using BaseAgent.generate() to leverage ADK Runner internally
@@ -83,6 +118,7 @@ class Analyst(BaseAgent):
         code_data = self._parse_json(resp_code, CodeGeneration)
         
         if not code_data:
+            await self.reject_response(prompt_code)
             return {"error": "Failed to generate initial code."}
 
         # --- STEP 2: EXECUTE WITH AUTO-FIX RETRY LOOP ---
@@ -90,66 +126,82 @@ class Analyst(BaseAgent):
         execution_output = ""
         success = False
         current_code = code_data.code
+        code_prompt = prompt_code # The prompt whose answer produced current_code
         
+        plot_written = False
         for attempt in range(3): # 3 Attempts to fix code
-            try:
-                # Capture stdout to read stats later
-                old_stdout = sys.stdout
-                redirected_output = io.StringIO()
-                sys.stdout = redirected_output
-                
-                # Execution Scope
-                local_scope = {'pd': pd, 'plt': plt, 'np': __import__('numpy')}
-                exec(current_code, local_scope)
-                
-                sys.stdout = old_stdout
-                execution_output = redirected_output.getvalue()
-                
-                # Validation: Did it produce output or a plot?
-                if os.path.exists(plot_path) or len(execution_output.strip()) > 0:
-                    success = True
-                    break # Success! Exit loop.
-                else:
-                    raise Exception("Code executed but produced no output and no plot.")
-                    
-            except Exception as e:
-                sys.stdout = sys.__stdout__ # Safety restore
-                # print(f"  [Attempt {attempt+1} Failed] Error: {e}") # Optional debug print
-                
-                # FEEDBACK LOOP: Ask Agent to Fix Code
-                fix_prompt = f"""
-                Your previous code failed to execute or produced no output.
-                
-                ERROR: {str(e)}
-                
-                PREVIOUS CODE:
-                {current_code}
-                
-                TASK: Fix the code errors. Check paths, column names, and libraries.
-                OUTPUT: Return JSON with 'thought_process' and 'code' (the fixed version).
-                """
-                resp_fix = await self.generate(fix_prompt)
-                fix_data = self._parse_json(resp_fix, CodeGeneration)
-                if fix_data:
-                    current_code = fix_data.code
-                else:
-                    break # Failed to generate fix, stop trying
+            # A chart left by an earlier attempt or run must not count as this attempt's output
+            if os.path.exists(plot_path):
+                os.remove(plot_path)
+            # Runs in a worker process with its own stdout capture (see CodeExecutor)
+            if sample:
+                result = await code_executor.submit(current_code, variables={**code_helpers(sample), 'plot_path': plot_path}, dataset_path=sample.sample_path)
+            else:
+                result = await code_executor.submit(current_code, variables={'plot_path': plot_path}, dataset_path=file_path)
+            execution_output = result.output
+            
+            # Validation: Did it produce output or a plot?
+            plot_written = os.path.exists(plot_path)
+            if result.success and (plot_written or len(execution_output.strip()) > 0):
+                success = True
+                break # Success! Exit loop.
+            error = (result.error or "Code executed but produced no output and no plot.").replace(plot_path, "<plot_path>")
+            await self.reject_response(code_prompt)
+            
+            # FEEDBACK LOOP: Ask Agent to Fix Code
+            fix_prompt = f"""
+            Your previous code failed to execute or produced no output.
+            
+            ERROR: {error}
+            
+            PREVIOUS CODE:
+            {current_code}
+            
+            TASK: Fix the code errors. Check paths, column names, and libraries. The data is preloaded as `df`
+            and the plot file name as `plot_path`.
+            OUTPUT: Return JSON with 'thought_process' and 'code' (the fixed version).
+            """
+            resp_fix = await self.generate(fix_prompt)
+            fix_data = self._parse_json(resp_fix, CodeGeneration)
+            if fix_data:
+                current_code = fix_data.code
+                code_prompt = fix_prompt
+            else:
+                await self.reject_response(fix_prompt)
+                break # Failed to generate fix, stop trying
 
         if not success:
-            return {"error": f"Code execution failed after 3 attempts. Last error: {execution_output}"}
+            return {"error": f"Code execution failed after 3 attempts. Last error: {error}"}
 
         # --- STEP 3: INTERPRET RESULTS (STATISTICAL INSIGHT) ---
+        if sample:
+            execution_output = f"{sample.describe()}\n{execution_output}"
+        return await self.interpret(execution_output, plot_path if plot_written else "none")
+
+    async def interpret(self, execution_output: str, plot_path: str) -> dict:
+        """
+        Turns computed statistics into an insight (the only model call when the
+        statistics come from the built-in kernel).
+
+        Args:
+            execution_output (str): The statistics, as printed by analysis code or the kernel.
+            plot_path (str): The chart that goes with them.
+
+        Returns:
+            dict: 'insight', 'visuals', 'plot' and 'stats', or 'error'.
+        """
         prompt_insight = f"""
         The code has been executed successfully.
         
         CODE OUTPUT (Statistics):
         {execution_output}
         
-        PLOT GENERATED: {plot_path}
+        PLOT GENERATED: {"no" if plot_path == "none" else "yes"}
         
         TASK: Interpret these specific numbers.
         - Do NOT hallucinate numbers. Use the "CODE OUTPUT" above.
         - Example: If output says "Skew: 2.5", write "Distribution is highly right-skewed (skew=2.5)".
+        - If the output comes from a sample, quote the confidence intervals next to the estimates.
         
         OUTPUT: Return JSON with 'key_finding', 'detailed_interpretation', and 'visual_pattern'.
         """
@@ -158,6 +210,7 @@ class Analyst(BaseAgent):
         insight_data = self._parse_json(resp_insight, AnalysisInsight)
         
         if not insight_data:
+            await self.reject_response(prompt_insight)
             return {"error": "Failed to interpret results."}
 
         return {
@@ -190,7 +243,7 @@ class LeadAnalyst(BaseAgent):
         # Strict instruction to ensure the 'is_complete' field is correct (Fixes the Pydantic error)
         prompt = f"""
         CURRENT INSIGHTS FOUND:
-        {json.dumps(current_insights, indent=2, default=str)}
+        {json.dumps(without_plots(current_insights), indent=2, default=str)}
         
         DATASET SCHEMA: {schema}
         
@@ -222,6 +275,7 @@ class LeadAnalyst(BaseAgent):
             return DeepDivePlan.model_validate_json(clean)
         except Exception as e:
             self.logger.error(f"Planning failed: {e}")
+            await self.reject_response(prompt)
             # Fail-safe: return complete to avoid system crash
             return DeepDivePlan(is_complete=True, reasoning=f"Planning parsing error: {e}", next_tasks=[])
 
@@ -241,37 +295,26 @@ class AnalystSquad:
             "Trend": self.trend_agent
         }
 
-    async def run_parallel_analysis(self, file_path: str, schema: dict):
+    async def run_parallel_analysis(self, file_path: str, schema: dict, run_id: Optional[str] = None):
         print("Starting Expert Hybrid Analysis...")
         abs_file_path = os.path.abspath(file_path).replace('\\', '/')
+        plot_dir = plot_dir_for(run_id)
         
         # Knowledge Graph to store all findings
         knowledge_graph = {
             'dataset_metadata': {"schema": schema, "file_path": abs_file_path},
             'findings': {}
         }
+        sample = await self._approximate(abs_file_path)
+        if sample:
+            knowledge_graph['dataset_metadata']['approximation'] = sample.describe()
 
         # --- PHASE 1: STANDARD PARALLEL SCAN (Replaces ParallelAgent with asyncio.gather) ---
         # This ensures your 3 base agents run simultaneously.
         print("\n--- Phase 1: Standard Parallel Scan (Uni/Bi/Trend) ---")
         
-        initial_tasks = [
-            (self.uni_agent, "Analyze distribution of key numeric columns. Calculate skewness and IQR.", "Univariate_chart.png"),
-            (self.bi_agent, "Calculate Pearson correlation matrix for numeric columns.", "Bivariate_chart.png"),
-            (self.trend_agent, "Analyze overall time-series trend and calculate slope/growth.", "Trend_chart.png")
-        ]
-        
         # Run all 3 simultaneously
-        results = await asyncio.gather(*[
-            agent.execute_task(abs_file_path, schema, task, fname) 
-            for agent, task, fname in initial_tasks
-        ])
-        
-        knowledge_graph['findings']['Initial_Scan'] = {
-            "Univariate": results[0],
-            "Bivariate": results[1],
-            "Trend": results[2]
-        }
+        knowledge_graph['findings']['Initial_Scan'] = await self._run_initial_scan(abs_file_path, schema, list(PHASE1_TASKS), sample, plot_dir)
 
         # --- PHASE 2: ITERATIVE DEEP DIVES (The "Lead Analyst" Layer) ---
         iteration = 0
@@ -299,7 +342,7 @@ class AnalystSquad:
                 
                 print(f"  -> {task.analyst_type} Agent: {task.task_name}")
                 dive_coroutines.append(
-                    agent.execute_task(abs_file_path, schema, task.instruction, fname)
+                    agent.execute_task(abs_file_path, schema, task.instruction, fname, sample, plot_dir)
                 )
             
             # Run deep dives in parallel
@@ -311,4 +354,96 @@ class AnalystSquad:
             iteration += 1
 
         print("Expert Analysis Workflow Complete.")
-        return knowledge_graph
\ No newline at end of file
+        return knowledge_graph
+
+    async def _approximate(self, file_path: str) -> Optional[SampleInfo]:
+        """
+        The sample to analyze in approximate mode, or None for the full data (see tools/sampling.py).
+        """
+        try:
+            sample = await asyncio.to_thread(approximate_source, file_path)
+        except Exception as e:
+            print(f"Sampling failed ({e}); analyzing the full data.")
+            return None
+        if sample:
+            print(sample.describe())
+        return sample
+
+    async def _run_initial_scan(self, file_path: str, schema: dict, specialties: List[str], sample: Optional[SampleInfo] = None,
+                                plot_dir: str = PLOT_ROOT) -> Dict[str, Any]:
+        # Standard scans are computed natively; analysts only interpret the numbers.
+        # Anything the kernel cannot cover falls back to the generate-and-execute loop.
+        kernel_results = {}
+        if config.STATS_KERNEL_ENABLED:
+            try:
+                kernel_results = await asyncio.to_thread(self._compute_phase1, file_path, specialties, sample, plot_dir)
+            except Exception as e:
+                print(f"Statistics kernel failed ({e}); falling back to generated analysis code.")
+
+        async def scan(specialty: str):
+            if specialty in kernel_results:
+                stats_text, plot_path = kernel_results[specialty]
+                return await self.analysts_map[specialty].interpret(stats_text, plot_path)
+            return await self.analysts_map[specialty].execute_task(file_path, schema, *PHASE1_TASKS[specialty], sample, plot_dir)
+
+        results = await asyncio.gather(*[scan(specialty) for specialty in specialties])
+        return dict(zip(specialties, results))
+
+    def _compute_phase1(self, file_path: str, specialties: List[str], sample: Optional[SampleInfo] = None,
+                        plot_dir: str = PLOT_ROOT) -> Dict[str, tuple]:
+        """
+        Runs the built-in statistics kernel over the cached dataset (or its sample, adding
+        confidence intervals) and renders the Phase-1 charts.
+
+        Returns:
+            Dict[str, tuple]: specialty -> (statistics text, plot path) for the scans that apply.
+        """
+        df = dataset_cache.get(sample.sample_path if sample else file_path)
+        stats = phase1_stats(df, config.STATS_KERNEL_MAX_COLUMNS)
+        if sample:
+            stats = annotate_phase1(stats, sample)
+        os.makedirs(plot_dir, exist_ok=True)
+
+        results = {}
+        for specialty in specialties:
+            if not stats.get(specialty):
+                continue
+            plot_path = os.path.join(plot_dir, PHASE1_TASKS[specialty][1]).replace('\\', '/')
+            try:
+                plot_path = plot_phase1(df, specialty, stats[specialty], plot_path) or "none"
+            except Exception as e:
+                print(f"{specialty} chart failed: {e}")
+                plot_path = "none"
+            results[specialty] = (json.dumps(stats[specialty], indent=1), plot_path)
+        return results
+
+    async def rerun_initial_scan(self, file_path: str, schema: dict, knowledge_graph: dict, specialties: List[str],
+                                 run_id: Optional[str] = None) -> dict:
+        """
+        Re-runs only the given Phase-1 analysts (e.g. after rows were appended) and
+        replaces their findings in an existing knowledge graph. Deep-dive findings are kept as they were.
+
+        Args:
+            file_path (str): The cleaned dataset.
+            schema (dict): The dataset schema.
+            knowledge_graph (dict): The findings of the previous run.
+            specialties (List[str]): The analysts to re-run ("Univariate", "Bivariate", "Trend").
+            run_id (str, optional): The session ID, which scopes the chart directory.
+
+        Returns:
+            dict: The updated knowledge graph.
+        """
+        print(f"Refreshing Phase-1 analysts: {', '.join(specialties)}")
+        abs_file_path = os.path.abspath(file_path).replace('\\', '/')
+        knowledge_graph = dict(knowledge_graph)
+        knowledge_graph['dataset_metadata'] = {"schema": schema, "file_path": abs_file_path}
+        sample = await self._approximate(abs_file_path)
+        if sample:
+            knowledge_graph['dataset_metadata']['approximation'] = sample.describe()
+        findings = dict(knowledge_graph.get('findings', {}))
+        findings['Initial_Scan'] = {
+            **findings.get('Initial_Scan', {}),
+            **await self._run_initial_scan(abs_file_path, schema, specialties, sample, plot_dir_for(run_id))
+        }
+        knowledge_graph['findings'] = findings
+        return knowledge_graph
@@ -1,31 +1,51 @@
 import os
+import time
+import uuid
+import asyncio
 import logging
+from functools import cached_property
+from typing import Optional
 from google.adk import Agent, Runner
 from google.adk.models import Gemini
 from google.adk.sessions import InMemorySessionService
+from google.genai import Client, types
 from config import config
 from infrastructure.stream_handler import get_stream_logger
+from infrastructure.response_cache import response_cache
+from infrastructure.observability import tracer, trace_logger
+from infrastructure.key_pool import key_pool
+from infrastructure.resilience import call_with_retries, retry_policy, circuit_breaker
 
-class SimplePart:
+_llm_semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_LLM_CALLS)
+
+def set_llm_concurrency(limit: int):
     """
-    Represents a simple text part of a message.
+    Sets the process-wide limit on in-flight model calls.
+
+    Args:
+        limit (int): The maximum number of concurrent generate() round-trips.
     """
-    def __init__(self, text):
-        self.text = text
+    global _llm_semaphore
+    _llm_semaphore = asyncio.Semaphore(max(1, limit))
 
-class SimpleMessage:
+class KeyedGemini(Gemini):
     """
-    Represents a simple message with a role and content.
+    Gemini model bound to one API key from the key pool instead of GOOGLE_API_KEY.
     """
-    def __init__(self, role, content):
-        self.role = role
-        self.parts = [SimplePart(content)]
+    api_key: Optional[str] = None
+
+    @cached_property
+    def api_client(self) -> Client:
+        return Client(api_key=self.api_key)
 
 class BaseAgent:
     """
     Base class for all agents in the system.
     Wraps the Google ADK Agent and provides common functionality.
     """
+    # Set to False in subclasses whose answers must stay fresh (e.g. search-grounded reports)
+    cache_responses = True
+
     def __init__(self, name: str, model_name: str = config.MODEL_FLASH, system_instruction: str = None):
         """
         Initialize the BaseAgent.
@@ -61,9 +81,26 @@ class BaseAgent:
         """
         self.logger.info(f"STEP: {step_name} | {details}")
 
+    def _response_cache_key(self, prompt: str) -> str:
+        """
+        Builds the response-cache key from the model, instruction, tools and prompt.
+
+        Args:
+            prompt (str): The user prompt.
+
+        Returns:
+            str: The cache key.
+        """
+        tool_names = [
+            getattr(tool, 'name', None) or getattr(tool, '__name__', None) or type(tool).__name__
+            for tool in (self.agent.tools or [])
+        ]
+        return response_cache.make_key(self.model_name, str(self.agent.instruction), tool_names, prompt)
+
     async def generate(self, prompt: str, system_instruction: str = None, tools: list = None):
         """
         Generates content using the ADK Runner.
+        Every call emits an `llm.generate` span and records tokens and latency to the meters.
 
         Args:
             prompt (str): The user prompt.
@@ -73,46 +110,163 @@ class BaseAgent:
         Returns:
             str: The generated response text.
         """
-        import time
         start_time = time.time()
         
+        with tracer.start_as_current_span("llm.generate") as span:
+            span.set_attribute("agent.name", self.name)
+            span.set_attribute("llm.model", self.model_name)
+            
+            use_cache = self.cache_responses and config.RESPONSE_CACHE_ENABLED
+            if use_cache:
+                cache_key = self._response_cache_key(prompt)
+                cached = await asyncio.to_thread(response_cache.get, cache_key)
+                if cached is not None:
+                    self._record_usage(span, start_time, {}, retries=0, cache_hit=True)
+                    self.logger.info(f"Cache hit: {cached[:200]}..." if len(cached) > 200 else f"Cache hit: {cached}")
+                    return cached
+            
+            usage = {"prompt_tokens": 0, "response_tokens": 0}
+            attempted_keys = set()
+            retries = 0
+
+            def on_retry(retry, kind, error, delay):
+                nonlocal retries
+                retries = retry
+                self.logger.warning(f"Model call failed ({kind}: {error}); retry {retry}/{retry_policy.max_retries} in {delay:.1f}s")
+
+            try:
+                response_text, retries = await call_with_retries(
+                    lambda: self._run_model(prompt, usage, attempted_keys),
+                    policy=retry_policy,
+                    breaker=circuit_breaker,
+                    timeout=config.LLM_CALL_TIMEOUT,
+                    hedge_after=config.LLM_HEDGE_AFTER_SECONDS,
+                    on_retry=on_retry
+                )
+            except Exception as e:
+                span.record_exception(e)
+                self._record_usage(span, start_time, usage, retries=retries, cache_hit=False)
+                self.logger.error(f"ADK Execution Error: {e}")
+                return f"Error: {e}"
+            
+            self._record_usage(span, start_time, usage, retries=retries, cache_hit=False)
+
+        if use_cache and response_text.strip():
+            await asyncio.to_thread(response_cache.put, cache_key, response_text)
+
+        self.logger.info(f"Thinking: {response_text[:500]}..." if len(response_text) > 500 else f"Thinking: {response_text}")
+        return response_text
+
+    async def reject_response(self, prompt: str):
+        """
+        Drops the cached response to `prompt`. Call it when the answer turned out unusable
+        (unparseable JSON, failing code, ...), so a retry or rerun asks the model again
+        instead of replaying the same answer.
+
+        Args:
+            prompt (str): The prompt passed to generate().
+        """
+        if self.cache_responses and config.RESPONSE_CACHE_ENABLED:
+            await asyncio.to_thread(response_cache.delete, self._response_cache_key(prompt))
+
+    def _agent_for_key(self, key: Optional[str]) -> Agent:
+        """
+        Returns a copy of this agent's ADK Agent whose model uses the given API key.
+
+        Args:
+            key (Optional[str]): The API key (None keeps the default model).
+
+        Returns:
+            Agent: The ADK Agent to run.
+        """
+        # Only Gemini models take a key; anything else (e.g. a benchmark stub) runs as is
+        if key is None or not isinstance(self.agent.model, Gemini):
+            return self.agent
+        # Subclasses replace self.agent after __init__, so key the copies on the current agent
+        cache = self.__dict__.setdefault("_keyed_agents", {})
+        cache_key = (id(self.agent), key)
+        if cache_key not in cache:
+            keyed_model = KeyedGemini(model=self.agent.model.model, api_key=key)
+            cache[cache_key] = self.agent.model_copy(update={"model": keyed_model})
+        return cache[cache_key]
+
+    async def _run_model(self, prompt: str, usage: dict, attempted_keys: set) -> str:
+        """
+        Runs one prompt through a fresh ephemeral ADK session on a leased API key.
+
+        Args:
+            prompt (str): The user prompt.
+            usage (dict): Accumulates 'prompt_tokens' and 'response_tokens' from the model's usage metadata.
+            attempted_keys (set): Keys already tried for this prompt; the lease avoids them and adds its own.
+
+        Returns:
+            str: The response text.
+        """
         # Create a new ephemeral session for each generation request
         session_service = InMemorySessionService()
-        import uuid
         session_id = str(uuid.uuid4())
         await session_service.create_session(app_name="DataGuild", user_id="user", session_id=session_id)
 
-        runner = Runner(agent=self.agent, session_service=session_service, app_name="DataGuild")
-
         response_text = ""
-        try:
-            message = SimpleMessage(role="user", content=prompt)
-            
-            # Execute the runner and collect text from events
-            for event in runner.run(user_id="user", session_id=session_id, new_message=message):
-                if hasattr(event, 'text') and event.text:
-                     response_text += event.text
-                elif hasattr(event, 'part') and hasattr(event.part, 'text') and event.part.text:
-                     response_text += event.part.text
-            
-            # Fallback: If no text was collected from events, inspect the session history
-            if not response_text.strip():
-                session = await session_service.get_session(session_id=session_id, app_name="DataGuild", user_id="user")
-                if hasattr(session, 'events') and session.events:
-                    for event in reversed(session.events):
-                        if hasattr(event, 'content') and hasattr(event.content, 'role') and event.content.role == 'model':
-                            if hasattr(event.content, 'parts'):
-                                text_parts = [
-                                    p.text for p in event.content.parts 
-                                    if hasattr(p, 'text') and p.text is not None
-                                ]
-                                if text_parts:
-                                    response_text = "".join(text_parts)
-                                    break
-
-        except Exception as e:
-            self.logger.error(f"ADK Execution Error: {e}")
-            return f"Error: {e}"
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        
+        # Execute the async runner so concurrent agents overlap their network waits.
+        # The key is leased first: a call waiting for a key off cooldown must not hold a concurrency slot.
+        async with key_pool.lease(exclude=attempted_keys) as key:
+            async with _llm_semaphore:
+                attempted_keys.add(key)
+                runner = Runner(agent=self._agent_for_key(key), session_service=session_service, app_name="DataGuild")
+                async for event in runner.run_async(user_id="user", session_id=session_id, new_message=message):
+                    usage_metadata = getattr(event, 'usage_metadata', None)
+                    if usage_metadata:
+                        usage["prompt_tokens"] += usage_metadata.prompt_token_count or 0
+                        usage["response_tokens"] += usage_metadata.candidates_token_count or 0
+                    if hasattr(event, 'text') and event.text:
+                         response_text += event.text
+                    elif hasattr(event, 'part') and hasattr(event.part, 'text') and event.part.text:
+                         response_text += event.part.text
+        
+        # Fallback: If no text was collected from events, inspect the session history
+        if not response_text.strip():
+            session = await session_service.get_session(session_id=session_id, app_name="DataGuild", user_id="user")
+            if hasattr(session, 'events') and session.events:
+                for event in reversed(session.events):
+                    if hasattr(event, 'content') and hasattr(event.content, 'role') and event.content.role == 'model':
+                        if hasattr(event.content, 'parts'):
+                            text_parts = [
+                                p.text for p in event.content.parts 
+                                if hasattr(p, 'text') and p.text is not None
+                            ]
+                            if text_parts:
+                                response_text = "".join(text_parts)
+                                break
+        return response_text
 
-        self.logger.info(f"Thinking: {response_text[:500]}..." if len(response_text) > 500 else f"Thinking: {response_text}")
-        return response_text
\ No newline at end of file
+    def _record_usage(self, span, start_time: float, usage: dict, retries: int, cache_hit: bool):
+        """
+        Attaches token, latency, retry and cache attributes to the span and records them to the meters.
+
+        Args:
+            span: The active `llm.generate` span.
+            start_time (float): When the generation started (time.time()).
+            usage (dict): Token counts collected by _run_model.
+            retries (int): Number of retries performed.
+            cache_hit (bool): True if the response came from the response cache.
+        """
+        latency_ms = (time.time() - start_time) * 1000
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        response_tokens = usage.get("response_tokens", 0)
+        span.set_attribute("llm.prompt_tokens", prompt_tokens)
+        span.set_attribute("llm.response_tokens", response_tokens)
+        span.set_attribute("llm.latency_ms", latency_ms)
+        span.set_attribute("llm.retry_count", retries)
+        span.set_attribute("llm.cache_hit", cache_hit)
+        trace_logger.record_generation(
+            agent=self.name,
+            model=self.model_name,
+            prompt_tokens=prompt_tokens,
+            response_tokens=response_tokens,
+            latency_ms=latency_ms,
+            retries=retries,
+            cache_hit=cache_hit
+        )
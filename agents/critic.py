@@ -7,6 +7,9 @@ class Critic(BaseAgent):
     """
     Agent responsible for critiquing analysis and adding context using external search.
     """
+    # Search-grounded reports must reflect current search results, never a replay
+    cache_responses = False
+
     def __init__(self):
         super().__init__(name="Critic")
         self.agent = Agent(
@@ -1,29 +1,37 @@
 from agents.base_agent import BaseAgent
 from memory.session_manager import SessionManager
-from infrastructure.a2a_registry import registry
+from infrastructure.a2a_registry import agent_pool
+from typing import Optional
+import os
 import json
 import asyncio
-import importlib
-from infrastructure.mcp_server import list_files
+from config import config
+
+def _iter_insights(knowledge_graph: dict):
+    """
+    Yields (phase, analyst, finding) for every finding of the Analyst Squad that has an insight
+    (Phase 1 findings are keyed by analyst, deep dives are lists).
+    """
+    for phase, findings in knowledge_graph.get("findings", {}).items():
+        items = findings.items() if isinstance(findings, dict) else [(None, f) for f in findings]
+        for analyst, finding in items:
+            if isinstance(finding, dict) and finding.get("insight"):
+                yield phase, analyst, finding
 
 class Orchestrator(BaseAgent):
-    def __init__(self, session_manager: SessionManager):
+    def __init__(self, session_manager: SessionManager, sandboxed: bool = False):
         super().__init__(name="Orchestrator")
         self.session_manager = session_manager
-        self.agents = {}
-        for agent_name in registry.list_agents():
-            card = registry.get_agent(agent_name)
-            try:
-                module = importlib.import_module(card.module_path)
-                agent_class = getattr(module, card.class_name)
-                self.agents[agent_name] = agent_class()
-                self.logger.info(f"Dynamically loaded agent: {agent_name}")
-            except Exception as e:
-                self.logger.error(f"Failed to load agent {agent_name}: {e}")
+        # Server tenants may only name files inside DATA_DIR (see _resolve_input)
+        self.sandboxed = sandboxed
+        # Agents are imported and built on first use, not at startup
+        self.agents = agent_pool
         
         self.current_file = None
         self.cleaning_result = None
         self.insights = None
+        # Why the last pipeline stage (or refresh) failed; None when it succeeded
+        self.last_error = None
         self.hydrate_state()
 
     def hydrate_state(self):
@@ -33,14 +41,31 @@ class Orchestrator(BaseAgent):
             self.insights = self.session_manager.context.get("insights")
             self.logger.info(f"State hydrated: File={self.current_file}")
 
+    def _fail(self, message: str) -> str:
+        """
+        Records that the current stage failed (see `last_error`) and returns the message for the user.
+        """
+        self.last_error = message
+        self.logger.error(message)
+        return message
+
+    def _resolve_input(self, filename: str) -> str:
+        """
+        Maps a file named by the user to its path. A sandboxed Orchestrator (a server tenant)
+        only uses the base name inside DATA_DIR, like the MCP tools, so no session can reach
+        other files on the host; the CLI also accepts paths.
+        """
+        if self.sandboxed:
+            return os.path.join(config.DATA_DIR, os.path.basename(filename))
+        return filename if os.path.exists(filename) else f"data_storage/{filename}"
+
     async def _handle_qa_fallback(self, user_input: str, default_msg: str):
         if not self.current_file: return default_msg
         import os
-        file_path = self.current_file
         if self.cleaning_result and os.path.exists(self.cleaning_result):
             file_path = self.cleaning_result
-        elif not os.path.exists(file_path):
-            file_path = f"data_storage/{self.current_file}"
+        else:
+            file_path = self._resolve_input(self.current_file)
         
         if os.path.exists(file_path):
             qa_agent = self.agents.get("QAAgent")
@@ -54,9 +79,17 @@ class Orchestrator(BaseAgent):
         current_state = self.session_manager.state
         self.log_step("Routing", f"Current State: {current_state}, Input: {user_input}")
 
+        if user_input.lower().startswith("refresh "):
+            filename = user_input[len("refresh "):].strip()
+            response = await self.refresh_dataset(filename)
+            if response is None:
+                return f"{filename} has no previous run it can be refreshed from (new, or changed other than by appended rows). Type 'reset' and run the full pipeline on it."
+            return response
+
         if current_state == "IDLE":
             if user_input.lower() == "start":
-                files = list_files()
+                from infrastructure.mcp_client import mcp_client
+                files = await mcp_client.list_files()
                 if not files: return "No files found. Please add a CSV."
                 file_list = "\n".join([f"- {f}" for f in files])
                 return f"Available files:\n{file_list}\n\nPlease type filename."
@@ -96,14 +129,18 @@ class Orchestrator(BaseAgent):
 
     async def delegate_to_steward(self, filename: str):
         self.log_step("Delegating", f"Steward -> {filename}")
+        self.last_error = None
+        if self.sandboxed:
+            filename = os.path.basename(filename)
         self.current_file = filename
         self.session_manager.context["current_file"] = filename 
         self.session_manager.session_name = f"Analysis of {filename}"
         
         steward = self.agents.get("Steward")
-        if not steward: return "Error: Steward agent missing."
+        if not steward: return self._fail("Error: Steward agent missing.")
         
-        profile = await steward.ingest(filename)
+        profile = await steward.ingest(self._resolve_input(filename) if self.sandboxed else filename)
+        if profile.startswith("Error"): return self._fail(f"Error: Steward could not profile {filename} ({profile})")
         self.session_manager.add_message("system", f"Data Profile: {profile}")
         
         # CORRECTED: Removed [:200] slice to show full report
@@ -111,45 +148,198 @@ class Orchestrator(BaseAgent):
 
     async def run_cleaning_loop(self):
         self.log_step("Delegating", "Refinery")
+        self.last_error = None
         import os
-        if not self.current_file: return "Error: No file."
-        file_path = self.current_file
-        if not os.path.exists(file_path): file_path = f"data_storage/{self.current_file}"
+        if not self.current_file: return self._fail("Error: No file.")
+        file_path = self._resolve_input(self.current_file)
 
         refinery = self.agents.get("Refinery")
-        if not refinery: return "Error: Refinery agent missing."
+        if not refinery: return self._fail("Error: Refinery agent missing.")
 
-        self.cleaning_result = await refinery.clean_data(file_path)
+        run_info = {}
+        self.cleaning_result = await refinery.clean_data(file_path, run_info)
         self.session_manager.context["cleaning_result"] = self.cleaning_result
         
-        if "Error" in self.cleaning_result: return f"Refinery failed: {self.cleaning_result}"
+        if "Error" in self.cleaning_result: return self._fail(f"Refinery failed: {self.cleaning_result}")
+
+        # Fingerprint the input up to the rows that were cleaned, so a later refresh picks up
+        # exactly the rows appended after them (including any appended while cleaning ran)
+        from infrastructure.run_manifest import fingerprint_source
+        try:
+            source = await asyncio.to_thread(fingerprint_source, file_path, run_info.get("rows"))
+        except Exception as e:
+            self.logger.warning(f"Could not fingerprint {file_path}: {e}")
+            source = None
+
+        self.session_manager.context["source"] = source
+        self.session_manager.context["cleaning_code"] = run_info.get("code")
 
         self.session_manager.add_message("system", f"Cleaned File: {self.cleaning_result}")
         return f"Refinery finished. Saved to: {self.cleaning_result}\n\nProceed to analysis?"
 
     async def transition_to_analysis(self):
         self.log_step("Context Compaction", "Preparing analysis...")
-        if not self.cleaning_result: return "Error: No cleaned data."
+        self.last_error = None
+        if not self.cleaning_result: return self._fail("Error: No cleaned data.")
 
-        from infrastructure.mcp_server import get_file_metadata
+        from infrastructure.mcp_client import mcp_client
         import os
         cleaned_filename = os.path.basename(self.cleaning_result)
-        schema = get_file_metadata(cleaned_filename)
+        schema = await mcp_client.get_file_metadata(cleaned_filename)
+        if isinstance(schema, dict) and "error" in schema:
+            return self._fail(f"Error: Could not read the schema of {cleaned_filename} ({schema['error']})")
         
         self.log_step("Delegating", "Analyst Squad")
         analyst_squad = self.agents.get("AnalystSquad")
-        if not analyst_squad: return "Error: AnalystSquad missing."
+        if not analyst_squad: return self._fail("Error: AnalystSquad missing.")
 
-        self.insights = await analyst_squad.run_parallel_analysis(self.cleaning_result, schema)
+        self.insights = await analyst_squad.run_parallel_analysis(self.cleaning_result, schema, self.session_manager.current_session_id)
         self.session_manager.context["insights"] = self.insights
+        if next(_iter_insights(self.insights), None) is None:
+            errors = [f.get("error") for f in self.insights["findings"].get("Initial_Scan", {}).values() if isinstance(f, dict)]
+            return self._fail(f"Error: No analyst produced an insight ({'; '.join(filter(None, errors)) or 'no findings'})")
         
         return f"Analyst Squad finished.\n\nProceed to report?"
 
     async def generate_final_report(self):
         self.log_step("Delegating", "Critic")
+        self.last_error = None
         critic = self.agents.get("Critic")
-        if not critic: return "Error: Critic missing."
-        if not self.insights: return "Error: No insights."
+        if not critic: return self._fail("Error: Critic missing.")
+        if not self.insights: return self._fail("Error: No insights.")
 
         report = await critic.evaluate_and_report(self.insights)
-        return f"FINAL REPORT:\n\n{report}\n\n(Ask questions or type 'reset')"
\ No newline at end of file
+        if report.startswith("Error"): return self._fail(f"Error: Critic could not write the report ({report})")
+        await asyncio.to_thread(self._record_run, report)
+        return f"FINAL REPORT:\n\n{report}\n\n(Ask questions or type 'reset')"
+
+    def _record_run(self, report: str):
+        """
+        Saves the run manifest that lets `refresh <file>` update this analysis incrementally.
+        """
+        source = self.session_manager.context.get("source")
+        code = self.session_manager.context.get("cleaning_code")
+        if not source or not code or not self.cleaning_result:
+            return
+        from infrastructure.run_manifest import RunManifest, save_manifest
+        from tools.running_stats import RunningStats
+        from agents.analyst_squad import PHASE1_TASKS
+        try:
+            stats = RunningStats.from_file(self.cleaning_result, config.CLEANING_CHUNK_ROWS).to_dict()
+            save_manifest(RunManifest(
+                **source,
+                cleaned_path=os.path.abspath(self.cleaning_result),
+                cleaning_code=code,
+                stats=stats,
+                analysis_baselines={specialty: stats for specialty in PHASE1_TASKS},
+                insights=self.insights,
+                report=report
+            ))
+        except Exception as e:
+            self.logger.warning(f"Could not record run manifest: {e}")
+
+    async def refresh_dataset(self, filename: str) -> Optional[str]:
+        """
+        Brings a previous analysis up to date after rows were appended to its dataset.
+        Only the new rows are cleaned (with the stored cleaning code), the statistics are
+        merged incrementally, and only the Phase-1 analysts whose statistics drifted beyond
+        config.REFRESH_DRIFT_THRESHOLD re-run; the Critic re-runs only if any of them did.
+
+        Args:
+            filename (str): The dataset filename (or path).
+
+        Returns:
+            Optional[str]: The refreshed report, or None if the dataset needs a full run
+            (it was never run, it changed other than by appended rows, or its cleaning code
+            aggregates over the whole frame).
+        """
+        from infrastructure.run_manifest import (
+            UNCHANGED, REWRITTEN, load_manifest, save_manifest, detect_change, read_appended_rows, hash_file
+        )
+        from tools.running_stats import RunningStats, drifted_analyses
+
+        self.last_error = None
+        file_path = self._resolve_input(filename)
+        if not os.path.exists(file_path):
+            return self._fail(f"Error: {filename} not found.")
+        manifest = load_manifest(file_path)
+        if manifest is None or not os.path.exists(manifest.cleaned_path):
+            return None
+        change = await asyncio.to_thread(detect_change, file_path, manifest)
+        if change == REWRITTEN:
+            return None
+        refinery = self.agents.get("Refinery")
+        if not refinery: return self._fail("Error: Refinery agent missing.")
+        from agents.refinery import find_aggregates
+        if change != UNCHANGED and find_aggregates(manifest.cleaning_code):
+            # Aggregates computed on the new rows alone would not match a full clean
+            self.log_step("Refresh", f"{os.path.basename(file_path)}: cleaning code is not row-local; a full run is needed")
+            return None
+
+        self.current_file = os.path.basename(file_path)
+        self.cleaning_result = manifest.cleaned_path
+        self.insights = manifest.insights
+        self.session_manager.context.update({
+            "current_file": self.current_file,
+            "cleaning_result": self.cleaning_result,
+            "insights": self.insights
+        })
+        self.session_manager.session_name = f"Refresh of {self.current_file}"
+        if change == UNCHANGED:
+            self.session_manager.set_state("REPORTING")
+            return f"No new rows since the last run.\n\nFINAL REPORT:\n\n{manifest.report}\n\n(Ask questions or type 'reset')"
+
+        self.log_step("Refresh", f"{self.current_file}: rows appended since the last run")
+        new_rows, read_to = await asyncio.to_thread(read_appended_rows, file_path, manifest)
+        try:
+            cleaned_rows = await refinery.clean_appended(new_rows, manifest.cleaning_code, manifest.cleaned_path)
+        except Exception as e:
+            return self._fail(f"Error: Stored cleaning code failed on the appended rows ({e}). Run the full pipeline again.")
+
+        try:
+            stats = RunningStats.from_dict(manifest.stats).merge(RunningStats.from_frame(cleaned_rows))
+        except ValueError:
+            # The new rows cleaned to different numeric columns; summarize the whole output instead
+            try:
+                stats = await asyncio.to_thread(RunningStats.from_file, manifest.cleaned_path, config.CLEANING_CHUNK_ROWS)
+            except ValueError as e:
+                return self._fail(f"Error: Could not update statistics for {self.current_file} ({e}). Run the full pipeline again.")
+
+        from agents.analyst_squad import PHASE1_TASKS
+        stale = [
+            specialty for specialty in PHASE1_TASKS
+            if specialty in drifted_analyses(
+                RunningStats.from_dict(manifest.analysis_baselines.get(specialty, manifest.stats)),
+                stats,
+                config.REFRESH_DRIFT_THRESHOLD
+            )
+        ]
+        self.log_step("Refresh", f"{len(new_rows)} new rows; analysts to re-run: {', '.join(stale) or 'none'}")
+
+        report = manifest.report
+        if stale:
+            analyst_squad = self.agents.get("AnalystSquad")
+            critic = self.agents.get("Critic")
+            if not analyst_squad or not critic: return self._fail("Error: AnalystSquad or Critic missing.")
+            from infrastructure.mcp_client import mcp_client
+            schema = await mcp_client.get_file_metadata(os.path.basename(manifest.cleaned_path))
+            self.insights = await analyst_squad.rerun_initial_scan(
+                manifest.cleaned_path, schema, manifest.insights, stale, self.session_manager.current_session_id
+            )
+            report = await critic.evaluate_and_report(self.insights)
+            if report.startswith("Error"): return self._fail(f"Error: Critic could not write the report ({report})")
+            self.session_manager.context["insights"] = self.insights
+            for specialty in stale:
+                manifest.analysis_baselines[specialty] = stats.to_dict()
+
+        # Record only what was read: rows appended during this refresh are picked up by the next one
+        manifest.source_size = read_to
+        manifest.source_hash = await asyncio.to_thread(hash_file, file_path, read_to)
+        manifest.stats = stats.to_dict()
+        manifest.insights = self.insights
+        manifest.report = report
+        await asyncio.to_thread(save_manifest, manifest)
+
+        self.session_manager.set_state("REPORTING")
+        summary = f"Refreshed with {len(new_rows)} new rows. Re-ran: {', '.join(stale) or 'no analysts (statistics within threshold)'}."
+        return f"{summary}\n\nFINAL REPORT:\n\n{report}\n\n(Ask questions or type 'reset')"
\ No newline at end of file
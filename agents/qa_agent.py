@@ -1,8 +1,9 @@
-import pandas as pd
-import io
-import sys
 from agents.base_agent import BaseAgent
+from infrastructure.code_executor import code_executor
+from infrastructure.dataset_cache import dataset_cache
+from tools.sampling import approximate_source, needs_full_data, code_helpers, code_instructions
 from config import config
+import asyncio
 
 class QAAgent(BaseAgent):
     def __init__(self):
@@ -10,8 +11,15 @@ class QAAgent(BaseAgent):
 
     async def answer_question(self, question: str, file_path: str) -> str:
         self.log_step("Q&A", f"Analyzing: {question}")
+        # Estimates run on a sample in approximate mode; exact questions always use the full data
+        sample = None
+        if not needs_full_data(question):
+            try:
+                sample = await asyncio.to_thread(approximate_source, file_path)
+            except Exception as e:
+                self.logger.warning(f"Sampling failed, using the full data: {e}")
         try:
-            df = pd.read_csv(file_path)
+            df = dataset_cache.get(sample.sample_path if sample else file_path)
         except Exception as e:
             return f"Error loading data: {e}"
 
@@ -29,6 +37,7 @@ class QAAgent(BaseAgent):
            - CRITICAL: Print the answer as a COMPLETE SENTENCE.
              (e.g., "The average sales amount is $150.")
            - Wrap code in ```python ... ```
+        {code_instructions(sample) if sample else ""}
         """
         
         response = await self.generate(prompt)
@@ -42,18 +51,17 @@ class QAAgent(BaseAgent):
         
         self.log_step("Code Gen", code)
 
-        try:
-            old_stdout = sys.stdout
-            redirected_output = io.StringIO()
-            sys.stdout = redirected_output
-            local_scope = {'df': df, 'pd': pd}
-            exec(code, {}, local_scope)
-            sys.stdout = old_stdout
-            result = redirected_output.getvalue().strip()
-            return result if result else "Code ran but printed nothing."
-        except Exception as e:
-            sys.stdout = old_stdout
-            return f"Error executing code: {e}"
+        if sample:
+            execution = await code_executor.submit(code, variables=code_helpers(sample), dataset_path=sample.sample_path)
+        else:
+            execution = await code_executor.submit(code, dataset_path=file_path)
+        if not execution.success:
+            await self.reject_response(prompt)
+            return f"Error executing code: {execution.error}"
+        result = execution.output.strip()
+        if not result:
+            return "Code ran but printed nothing."
+        return f"{result}\n({sample.describe()})" if sample else result
 
     def _extract_code(self, text: str) -> str:
         if "```python" in text:
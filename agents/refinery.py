@@ -1,10 +1,20 @@
 from agents.base_agent import BaseAgent
 from tools.knowledge_client import kb_client
+from infrastructure.code_executor import code_executor
+from infrastructure.dataset_cache import dataset_cache
+from infrastructure.plan_store import plan_store
+from tools.data_ops import save_data, ChunkedWriter
+from tools.profiler import profile_dataset, iter_chunks
+from config import config
 from google.adk.agents import Agent
 import pandas as pd
 import os
+import asyncio
+import ast
+import shutil
 import traceback
 import json
+from collections import deque
 from pydantic import BaseModel, Field
 
 class CleaningPlan(BaseModel):
@@ -14,6 +24,93 @@ class CleaningPlan(BaseModel):
     explanation: str = Field(..., description="Summary of cleaning.")
     code: str = Field(..., description="Executable Python code.")
 
+# Whole-column computations that give a different answer on every chunk
+_CHUNK_AGGREGATES = frozenset({
+    "median", "mean", "mode", "quantile", "std", "var", "nunique", "value_counts", "sort_values",
+    "drop_duplicates", "duplicated", "rank", "cumsum", "interpolate"
+})
+
+def _frame_names(tree: ast.AST) -> set:
+    """
+    The names bound to the frame being cleaned: 'df' and anything assigned from an expression using it.
+    """
+    names = {"df"}
+    assignments = [node for node in ast.walk(tree) if isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign)) and node.value is not None]
+    while True:
+        found = set(names)
+        for node in assignments:
+            if _uses(node.value, found):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                found.update(n.id for target in targets for n in ast.walk(target) if isinstance(n, ast.Name))
+        if found == names:
+            return names
+        names = found
+
+def _uses(node: ast.AST, names: set) -> bool:
+    return any(isinstance(n, ast.Name) and n.id in names for n in ast.walk(node))
+
+def find_aggregates(code: str) -> list:
+    """
+    Lists the whole-column computations in cleaning code, i.e. why it is not row-local.
+    Only calls on the frame count (`df['a'].median()`, `np.median(df['a'])`); the same methods
+    on constants, such as `np.mean([stats['a']['min'], stats['a']['max']])`, are row-local.
+
+    Args:
+        code (str): The cleaning code.
+
+    Returns:
+        list: The sorted aggregate method names (empty if the code is row-local).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return [] # It fails in the executor instead
+    frame = _frame_names(tree)
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in _CHUNK_AGGREGATES:
+            arguments = node.args + [keyword.value for keyword in node.keywords]
+            if _uses(node.func.value, frame) or any(_uses(arg, frame) for arg in arguments):
+                found.add(node.func.attr)
+    return sorted(found)
+
+def output_mismatch(cleaned_df: pd.DataFrame, expected: list) -> str:
+    """
+    Compares cleaned output with the output signature stored with a plan (see PlanStore.output_signature).
+    A column that is 'empty' on either side has no real dtype, so only its presence is checked.
+
+    Returns:
+        str: Why the output differs, or an empty string if it matches.
+    """
+    expected_kinds = {col: kind for col, kind in expected}
+    actual = plan_store.output_signature(cleaned_df)
+    missing = [col for col in expected_kinds if col not in {c for c, _ in actual}]
+    extra = [col for col, _ in actual if col not in expected_kinds]
+    if missing or extra:
+        return f"Cleaned columns differ from the stored plan's output (missing {missing}, unexpected {extra})."
+    changed = [
+        f"{col}: {kind} instead of {expected_kinds[col]}"
+        for col, kind in actual
+        if kind != expected_kinds[col] and "empty" not in (kind, expected_kinds[col])
+    ]
+    if changed:
+        return f"Cleaned dtypes differ from the stored plan's output ({', '.join(changed)})."
+    return ""
+
+def _append_csv(path: str, rows: pd.DataFrame):
+    """
+    Appends rows to a CSV file atomically: the rows are added to a copy, which then replaces the file.
+    """
+    tmp_path = f"{path}.partial"
+    try:
+        shutil.copyfile(path, tmp_path)
+        rows.to_csv(tmp_path, mode='a', header=False, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 class Refinery(BaseAgent):
     """
     Agent responsible for cleaning and refining data.
@@ -30,21 +127,48 @@ class Refinery(BaseAgent):
             instruction="You are a Data Engineer. Generate Python code to clean the dataframe 'df'. Return valid JSON."
         )
 
-    async def clean_data(self, dataset_path: str) -> str:
+    async def clean_data(self, dataset_path: str, run_info: dict = None) -> str:
         """
         Cleans the data at the given path.
 
         Args:
             dataset_path (str): The path to the dataset file.
+            run_info (dict, optional): Receives the number of raw rows cleaned ('rows'), so a caller
+                can record exactly which part of a file that is still growing was read, and the code
+                that produced the cleaned file ('code'). Per call, since agents are shared across sessions.
 
         Returns:
-            str: The path to the cleaned dataset file, or an error message.
+            str: The path to the cleaned dataset file (Parquet by default, see config.CLEANED_FORMAT), or an error message.
         """
         self.log_step("Start Cleaning", f"Cleaning {dataset_path}")
+        if self._needs_chunking(dataset_path):
+            return await self.clean_data_chunked(dataset_path, run_info)
         try:
-            df = pd.read_csv(dataset_path)
+            df = dataset_cache.get(dataset_path)
         except Exception as e:
             return f"Error: Failed to load data: {e}"
+        run_info = {} if run_info is None else run_info
+        run_info["rows"] = len(df)
+
+        # A file with a known schema is cleaned by the plan that worked last time, without the model
+        fingerprint = plan_store.schema_fingerprint(df)
+        if config.PLAN_REPLAY_ENABLED:
+            stored = await asyncio.to_thread(plan_store.get, fingerprint)
+            if stored:
+                self.log_step("Replaying Plan", f"Schema seen before ({stored['source']}): {stored['explanation']}")
+                result = await code_executor.submit(stored['code'], return_vars=['df'], dataset_path=dataset_path)
+                error = result.error if not result.success else self._validate_output(df, result.variables.get('df'), stored['output_signature'])
+                if not error:
+                    await asyncio.to_thread(plan_store.mark_used, fingerprint)
+                    try:
+                        cleaned_path = self._save_cleaned(dataset_path, result.variables['df'])
+                        run_info["code"] = stored['code']
+                        return cleaned_path
+                    except Exception as e:
+                        self.logger.error(f"Cleaning failed: {e}")
+                        return f"Error during cleaning: {e}"
+                self.logger.warning(f"Stored plan failed on {dataset_path} ({error}); requesting a new one.")
+                await asyncio.to_thread(plan_store.discard, fingerprint)
 
         dataset_id = os.path.basename(dataset_path).split('.')[0]
         
@@ -53,7 +177,12 @@ class Refinery(BaseAgent):
         except:
             schema = "Infer from data."
 
-        audit_report = f"Nulls: {df.isnull().sum().to_dict()}"
+        # Audit from the cached streaming profile instead of rescanning the frame
+        try:
+            profile = await asyncio.to_thread(profile_dataset, dataset_path)
+            audit_report = self._audit_report(profile)
+        except Exception:
+            audit_report = f"Nulls: {df.isnull().sum().to_dict()}"
         
         prompt = f"""
         You are a generic Data Cleaning expert.
@@ -89,22 +218,329 @@ class Refinery(BaseAgent):
             plan = CleaningPlan.model_validate_json(clean_json)
             self.log_step("Plan Generated", plan.explanation)
             
-            local_scope = {'df': df, 'pd': pd, 'np': __import__('numpy')}
-            exec(plan.code, local_scope)
-            
-            cleaned_filename = f"cleaned_{os.path.basename(dataset_path)}"
-            storage_dir = os.path.dirname(dataset_path) or "data_storage"
-            if not os.path.exists(storage_dir): os.makedirs(storage_dir)
-            
-            cleaned_path = os.path.join(storage_dir, cleaned_filename)
-            local_scope['df'].to_csv(cleaned_path, index=False)
-            
-            self.log_step("Success", f"Cleaned data saved to {cleaned_path}")
+            result = await code_executor.submit(plan.code, return_vars=['df'], dataset_path=dataset_path)
+            if not result.success:
+                raise Exception(result.error)
+            error = self._validate_output(df, result.variables.get('df'))
+            if error:
+                raise Exception(error)
+
+            cleaned_path = self._save_cleaned(dataset_path, result.variables['df'])
+            run_info["code"] = plan.code
+            await asyncio.to_thread(
+                plan_store.put, fingerprint, plan.explanation, plan.code, os.path.basename(dataset_path),
+                plan_store.output_signature(result.variables['df'])
+            )
             return cleaned_path
 
         except Exception as e:
             self.logger.error(f"Cleaning failed: {e}")
+            await self.reject_response(prompt)
+            return f"Error during cleaning: {e}"
+
+    def _needs_chunking(self, dataset_path: str) -> bool:
+        """
+        Checks whether a dataset is too large to clean as one in-memory DataFrame.
+        """
+        return (
+            dataset_path.endswith(('.csv', '.parquet', '.feather', '.arrow'))
+            and os.path.exists(dataset_path)
+            and os.path.getsize(dataset_path) >= config.CHUNKED_CLEANING_MIN_MB * 1024 * 1024
+        )
+
+    async def clean_data_chunked(self, dataset_path: str, run_info: dict = None) -> str:
+        """
+        Cleans a dataset larger than memory.
+        A first streaming pass (the profiler) computes whole-file statistics such as medians and modes;
+        the cleaning code must be row-local, gets those statistics as `stats`, and runs chunk by chunk
+        in the code executor while the output is written incrementally.
+
+        Args:
+            dataset_path (str): The path to the dataset file.
+            run_info (dict, optional): Receives the number of raw rows cleaned ('rows'), the code that
+                produced the cleaned file with `stats` bound ('code') and its output signature ('output').
+
+        Returns:
+            str: The path to the cleaned dataset file, or an error message.
+        """
+        size_mb = os.path.getsize(dataset_path) / (1024 * 1024)
+        self.log_step("Chunked Cleaning", f"{dataset_path} is {size_mb:.0f} MB; cleaning {config.CLEANING_CHUNK_ROWS} rows at a time")
+        try:
+            profile = await asyncio.to_thread(profile_dataset, dataset_path)
+            first_chunk = await asyncio.to_thread(lambda: next(iter_chunks(dataset_path, 1000)))
+        except Exception as e:
+            return f"Error: Failed to load data: {e}"
+        stats = {
+            col: {key: col_stats.get(key) for key in ("null_count", "min", "max", "mean", "std", "approx_median", "approx_mode", "approx_distinct")}
+            for col, col_stats in profile["columns"].items()
+        }
+
+        run_info = {} if run_info is None else run_info
+        fingerprint = plan_store.schema_fingerprint(first_chunk, variant="chunked")
+        if config.PLAN_REPLAY_ENABLED:
+            stored = await asyncio.to_thread(plan_store.get, fingerprint)
+            if stored:
+                self.log_step("Replaying Plan", f"Schema seen before ({stored['source']}): {stored['explanation']}")
+                cleaned_path = await self._run_chunked(dataset_path, stored['code'], stats, run_info, stored['output_signature'])
+                if not cleaned_path.startswith("Error"):
+                    await asyncio.to_thread(plan_store.mark_used, fingerprint)
+                    return cleaned_path
+                self.logger.warning(f"Stored plan failed on {dataset_path} ({cleaned_path}); requesting a new one.")
+                await asyncio.to_thread(plan_store.discard, fingerprint)
+
+        requested = await self._request_chunked_plan(dataset_path, profile, first_chunk)
+        if isinstance(requested, str):
+            return requested
+        plan, prompt = requested
+        self.log_step("Plan Generated", plan.explanation)
+        cleaned_path = await self._run_chunked(dataset_path, plan.code, stats, run_info)
+        if cleaned_path.startswith("Error"):
+            await self.reject_response(prompt)
+        else:
+            await asyncio.to_thread(
+                plan_store.put, fingerprint, plan.explanation, plan.code, os.path.basename(dataset_path), run_info["output"]
+            )
+        return cleaned_path
+
+    async def _request_chunked_plan(self, dataset_path: str, profile: dict, first_chunk: pd.DataFrame):
+        """
+        Asks the model for row-local cleaning code, pushing back once if it aggregates over the chunk.
+
+        Returns:
+            Tuple[CleaningPlan, str] | str: The plan and the prompt that produced it, or an error message.
+        """
+        try:
+            schema = kb_client.get_schema(os.path.basename(dataset_path).split('.')[0])
+        except:
+            schema = "Infer from data."
+
+        prompt = f"""
+        You are a generic Data Cleaning expert.
+
+        TASK: Generate a cleaning plan and executable Python code for a dataset too large to load at once.
+        Your code runs ONCE PER CHUNK of rows, with the chunk loaded as the dataframe 'df'.
+
+        CONTEXT:
+        - Audit (whole file): {self._audit_report(profile)}
+        - Schema: {schema}
+        - Columns and dtypes (first chunk): {json.dumps({str(c): str(t) for c, t in first_chunk.dtypes.items()})}
+        - A dict `stats` is available to your code with whole-file statistics per column:
+          stats[col]['approx_median'], ['mean'], ['std'], ['min'], ['max'], ['approx_mode'], ['null_count'], ['approx_distinct'].
+
+        RULES:
+        1. The code must be row-local: fill with constants taken from `stats`
+           (e.g. `df['age'] = df['age'].fillna(stats['age']['approx_median'])`), cast types, normalize strings, filter rows.
+        2. Do NOT compute aggregates from 'df' (median, mean, mode, quantile, value_counts, ...), sort, or drop
+           duplicates: each chunk would get a different answer.
+        3. Every chunk must come out with the same columns and dtypes
+           (use `pd.to_numeric(..., errors='coerce')` / `pd.to_datetime(..., errors='coerce')`).
+        4. Output a VALID JSON object with two keys: 'explanation' and 'code'.
+
+        CRITICAL: Return ONLY the JSON object. Do not add markdown formatting or extra text.
+        """
+
+        for attempt in range(2):
+            response_text = await self.generate(prompt)
+            try:
+                plan = CleaningPlan.model_validate_json(self._clean_json_string(response_text))
+            except Exception as e:
+                await self.reject_response(prompt)
+                return f"Error during cleaning: {e}"
+            aggregates = find_aggregates(plan.code)
+            if not aggregates:
+                return plan, prompt
+            await self.reject_response(prompt)
+            self.logger.warning(f"Chunked plan is not row-local ({', '.join(aggregates)}), asking for a revision.")
+            prompt = f"""
+            Your cleaning code computes {', '.join(aggregates)} over 'df', but it runs once per chunk,
+            so every chunk would get a different answer.
+
+            PREVIOUS CODE:
+            {plan.code}
+
+            TASK: Rewrite it to use the precomputed whole-file values in `stats` instead
+            (keys: approx_median, mean, std, min, max, approx_mode, null_count, approx_distinct).
+            OUTPUT: Return JSON with 'explanation' and 'code'.
+            """
+        return "Error during cleaning: the model did not produce a row-local plan for chunked cleaning."
+
+    async def _run_chunked(self, dataset_path: str, code: str, stats: dict, run_info: dict, expected_output: list = None) -> str:
+        """
+        Streams the dataset through the cleaning code and writes the output chunk by chunk.
+        Up to one chunk per executor worker is in flight; output keeps the input order.
+
+        Args:
+            run_info (dict): Receives 'rows', 'code' and 'output' on success (see clean_data_chunked).
+            expected_output (list, optional): The stored output signature of a replayed plan; a chunk that
+                does not match it fails the run.
+
+        Returns:
+            str: The path of the cleaned dataset, or an error message.
+        """
+        base_path = self._cleaned_base_path(dataset_path)
+        writers = [ChunkedWriter(base_path, config.CLEANED_FORMAT)]
+        if config.CLEANED_CSV_EXPORT and writers[0].file_format != "csv":
+            writers.append(ChunkedWriter(base_path, "csv"))
+
+        chunks = iter_chunks(dataset_path, config.CLEANING_CHUNK_ROWS)
+        window = max(1, config.CODE_EXECUTOR_WORKERS)
+        pending = deque()
+        rows_in = 0
+        signature = {} # column -> dtype kind, from the first chunk with a value in that column
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is not None:
+                    rows_in += len(chunk)
+                    pending.append(asyncio.ensure_future(
+                        code_executor.submit(code, variables={'df': chunk, 'stats': stats}, return_vars=['df'])
+                    ))
+                if pending and (chunk is None or len(pending) >= window):
+                    result = await pending.popleft()
+                    if not result.success:
+                        raise Exception(result.error)
+                    cleaned_chunk = result.variables.get('df')
+                    if not isinstance(cleaned_chunk, pd.DataFrame):
+                        raise Exception(f"Cleaning code left 'df' as {type(cleaned_chunk).__name__}, not a DataFrame.")
+                    mismatch = output_mismatch(cleaned_chunk, expected_output) if expected_output is not None else ""
+                    if mismatch:
+                        raise Exception(mismatch)
+                    for col, kind in plan_store.output_signature(cleaned_chunk):
+                        if signature.get(col, "empty") == "empty":
+                            signature[col] = kind
+                    for writer in writers:
+                        await asyncio.to_thread(writer.write, cleaned_chunk)
+                if chunk is None and not pending:
+                    break
+            if writers[0].rows == 0 and rows_in > 0:
+                raise Exception("Cleaning code removed every row.")
+            cleaned_path = writers[0].close()
+            for writer in writers[1:]:
+                writer.close()
+        except Exception as e:
+            for task in pending:
+                task.cancel()
+            for writer in writers:
+                writer.abort()
+            self.logger.error(f"Chunked cleaning failed: {e}")
             return f"Error during cleaning: {e}"
+        finally:
+            # Release the reader (and its file handle) on every exit, including errors and cancellation
+            try:
+                chunks.close()
+            except ValueError:
+                pass # A cancelled read is still advancing it on a worker thread; it is closed when collected
+
+        # Bind the whole-file statistics so the code also replays on its own (e.g. on appended rows)
+        run_info["code"] = f"import json\nstats = json.loads({json.dumps(stats, default=str)!r})\n{code}"
+        run_info["output"] = [[col, kind] for col, kind in signature.items()]
+        run_info["rows"] = rows_in
+        self.log_step("Success", f"Cleaned {rows_in} rows into {writers[0].rows} and saved to {cleaned_path}")
+        return cleaned_path
+
+    def _audit_report(self, profile: dict) -> str:
+        """
+        Summarizes a streaming profile for the cleaning prompt.
+        """
+        return json.dumps({
+            "rows": profile["row_count"],
+            "nulls": {col: stats["null_count"] for col, stats in profile["columns"].items()},
+            "inferred_types": {col: stats["inferred_type"] for col, stats in profile["columns"].items()},
+            "ranges": {col: [stats["min"], stats["max"]] for col, stats in profile["columns"].items() if stats["min"] is not None}
+        }, default=str)
+
+    def _cleaned_base_path(self, dataset_path: str) -> str:
+        cleaned_stem = f"cleaned_{os.path.splitext(os.path.basename(dataset_path))[0]}"
+        storage_dir = os.path.dirname(dataset_path) or "data_storage"
+        if not os.path.exists(storage_dir): os.makedirs(storage_dir)
+        return os.path.join(storage_dir, cleaned_stem)
+
+    def _validate_output(self, raw_df: pd.DataFrame, cleaned_df, expected_output: list = None) -> str:
+        """
+        Sanity-checks the result of cleaning code before it is saved or stored for replay.
+
+        Args:
+            raw_df (pd.DataFrame): The input the code ran on.
+            cleaned_df: What the code left in 'df'.
+            expected_output (list, optional): For a replayed plan, the output signature stored with it.
+
+        Returns:
+            str: Why the output is rejected, or an empty string if it is usable.
+        """
+        if not isinstance(cleaned_df, pd.DataFrame):
+            return f"Cleaning code left 'df' as {type(cleaned_df).__name__}, not a DataFrame."
+        if len(cleaned_df) == 0 and len(raw_df) > 0:
+            return "Cleaning code removed every row."
+        if expected_output is not None:
+            return output_mismatch(cleaned_df, expected_output)
+        return ""
+
+    def _save_cleaned(self, dataset_path: str, cleaned_df: pd.DataFrame) -> str:
+        """
+        Writes the cleaned dataset next to the input.
+
+        Returns:
+            str: The path of the cleaned dataset.
+        """
+        # Columnar working format keeps the cleaned dtypes for downstream stages
+        base_path = self._cleaned_base_path(dataset_path)
+        cleaned_path = save_data(cleaned_df, base_path, config.CLEANED_FORMAT)
+        if config.CLEANED_CSV_EXPORT and not cleaned_path.endswith('.csv'):
+            save_data(cleaned_df, base_path, "csv")
+
+        self.log_step("Success", f"Cleaned data saved to {cleaned_path}")
+        return cleaned_path
+
+    async def clean_appended(self, new_rows: pd.DataFrame, code: str, cleaned_path: str) -> pd.DataFrame:
+        """
+        Cleans rows appended to a dataset with the code from its last run and adds them
+        to the existing cleaned output, without calling the model.
+        Only row-local code can be replayed this way (see find_aggregates): a median or
+        drop_duplicates computed on the new rows alone would not match a full clean.
+        Whole-file statistics bound by chunked cleaning are replayed as stored.
+
+        Args:
+            new_rows (pd.DataFrame): The appended raw rows.
+            code (str): The validated cleaning code of the previous run.
+            cleaned_path (str): The cleaned dataset to extend.
+
+        Returns:
+            pd.DataFrame: The cleaned new rows.
+
+        Raises:
+            ValueError: If the code aggregates over the whole frame; the dataset needs a full clean.
+            Exception: If the stored code fails on the new rows.
+        """
+        aggregates = find_aggregates(code)
+        if aggregates:
+            raise ValueError(f"Cleaning code is not row-local ({', '.join(aggregates)}).")
+        self.log_step("Incremental Cleaning", f"Cleaning {len(new_rows)} appended rows into {cleaned_path}")
+        result = await code_executor.submit(code, variables={'df': new_rows}, return_vars=['df'])
+        if not result.success:
+            raise Exception(result.error)
+        cleaned_rows = result.variables['df']
+
+        base_path, ext = os.path.splitext(cleaned_path)
+        if ext == ".csv":
+            await asyncio.to_thread(_append_csv, cleaned_path, cleaned_rows)
+        else:
+            # Columnar files cannot be appended in place; stream the old rows into a new file
+            def rewrite():
+                writer = ChunkedWriter(base_path, ext.lstrip('.'))
+                try:
+                    for chunk in iter_chunks(cleaned_path, config.CLEANING_CHUNK_ROWS):
+                        writer.write(chunk)
+                    writer.write(cleaned_rows)
+                except Exception:
+                    writer.abort()
+                    raise
+                writer.close()
+            await asyncio.to_thread(rewrite)
+            if config.CLEANED_CSV_EXPORT and os.path.exists(f"{base_path}.csv"):
+                await asyncio.to_thread(_append_csv, f"{base_path}.csv", cleaned_rows)
+
+        self.log_step("Success", f"Appended {len(cleaned_rows)} cleaned rows to {cleaned_path}")
+        return cleaned_rows
 
     def _clean_json_string(self, text):
         """
@@ -1,7 +1,10 @@
 from agents.base_agent import BaseAgent
 from google.adk.agents import Agent
 from tools.search_tool import search_tool
-from infrastructure.mcp_server import get_file_metadata
+from infrastructure.mcp_client import mcp_client
+from tools.profiler import profile_dataset
+from config import config
+import asyncio
 import json
 import os
 
@@ -42,9 +45,22 @@ class Steward(BaseAgent):
         """
         self.log_step("Ingestion", f"Reading file: {file_path}")
         
-        metadata = get_file_metadata(file_path)
+        metadata = await mcp_client.get_file_metadata(file_path)
         filename = os.path.basename(file_path)
         
+        # Full-file streaming profile (bounded memory, cached by file fingerprint)
+        local_path = file_path if os.path.exists(file_path) else os.path.join(config.DATA_DIR, filename)
+        try:
+            profile = await asyncio.to_thread(profile_dataset, local_path)
+            profile_text = json.dumps({
+                "row_count": profile["row_count"],
+                "columns": profile["columns"],
+                "sample": profile["sample"][:5]
+            }, default=str)
+        except Exception as e:
+            self.logger.error(f"Profiling failed: {e}")
+            profile_text = "Unavailable."
+        
         # Prompt the Agent to use the tool internally
         prompt = f"""
         I have ingested a file named '{filename}'.
@@ -52,6 +68,9 @@ class Steward(BaseAgent):
         Metadata extracted:
         {json.dumps(metadata)}
         
+        Full-file statistical profile (row count, nulls, ranges, approximate distinct counts, inferred types):
+        {profile_text}
+        
         INSTRUCTIONS:
         1. Use the 'google_search' tool to research common data schema patterns, expected value ranges, and quality issues associated with datasets in this domain (inferred from filename/columns).
         2. Combine search findings with the provided metadata to create a Data Profile.
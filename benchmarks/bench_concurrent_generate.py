@@ -0,0 +1,58 @@
+"""
+Benchmark: Phase-1 style fan-out of three agents through BaseAgent.generate.
+
+Compares the legacy synchronous `runner.run(...)` path (which blocks the event
+loop, so asyncio.gather runs the agents one after another) with the async
+runner path used by BaseAgent.generate today.
+
+Usage:
+    python -m benchmarks.bench_concurrent_generate [--latency 0.5] [--rounds 3]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from google.adk import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from agents.base_agent import BaseAgent
+from benchmarks.fake_llm import use_fake_model
+
+async def legacy_generate(agent: BaseAgent, prompt: str) -> str:
+    """The pre-async implementation: iterates the blocking runner.run generator."""
+    session_service = InMemorySessionService()
+    session_id = str(uuid.uuid4())
+    await session_service.create_session(app_name="DataGuild", user_id="user", session_id=session_id)
+    runner = Runner(agent=agent.agent, session_service=session_service, app_name="DataGuild")
+    text = ""
+    for event in runner.run(user_id="user", session_id=session_id, new_message=types.Content(role="user", parts=[types.Part(text=prompt)])):
+        if event.content and event.content.parts:
+            text += "".join(p.text or "" for p in event.content.parts)
+    return text
+
+async def phase1(agents, generate, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*[generate(agent, "Analyze the dataset.") for agent in agents])
+    return time.perf_counter() - start
+
+async def main(latency: float, rounds: int):
+    agents = [use_fake_model(BaseAgent(name), latency=latency) for name in ("UniAgent", "BiAgent", "TrendAgent")]
+    for agent in agents:
+        # Every round repeats the prompt; cache hits would skip the model calls being measured
+        agent.cache_responses = False
+
+    legacy = await phase1(agents, legacy_generate, rounds)
+    current = await phase1(agents, lambda agent, prompt: agent.generate(prompt), rounds)
+
+    print(f"\nPhase-1 fan-out: 3 agents x {rounds} rounds, {latency:.2f}s simulated model latency")
+    print(f"  legacy runner.run : {legacy:6.2f}s")
+    print(f"  async run_async   : {current:6.2f}s")
+    print(f"  speedup           : {legacy / current:6.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.rounds))
@@ -0,0 +1,61 @@
+"""
+Benchmark: correlations on a wide table.
+
+Compares the old `numeric_df.corr().to_dict()` (dense float64 matrix, nested dict) with the
+blockwise float32 engine in tools/correlation.py, serial and threaded, for each output form.
+No model calls are made.
+
+Usage:
+    python -m benchmarks.bench_correlation [--rows 20000] [--columns 1000] [--skip-pandas]
+"""
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from tools.correlation import correlate
+
+def make_frame(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, columns))
+    # A few planted relationships, so the top pairs are known
+    for k in range(0, columns - 1, max(1, columns // 10)):
+        X[:, k + 1] = X[:, k] * 0.8 + rng.normal(size=rows) * 0.3
+    X[rng.random(X.shape) < 0.01] = np.nan
+    return pd.DataFrame(X, columns=[f"col_{i}" for i in range(columns)])
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def size_of(result) -> str:
+    if isinstance(result, dict) and "matrix" in result:
+        return f"{result['matrix'].nbytes / 1e6:8.1f} MB array"
+    return f"{len(json.dumps(result, default=str)) / 1e6:8.2f} MB JSON"
+
+def main(rows: int, columns: int, skip_pandas: bool):
+    df = make_frame(rows, columns)
+    print(f"\nCorrelations on {rows:,} rows x {columns:,} columns (1% missing)")
+    if not skip_pandas:
+        seconds, result = timed(lambda: df.corr().to_dict())
+        print(f"  pandas corr().to_dict()        : {seconds:7.2f}s  {size_of(result)}")
+    for workers in (1, 4):
+        seconds, result = timed(lambda: correlate(df, output="top_k", workers=workers))
+        print(f"  engine top_k, {workers} thread(s)      : {seconds:7.2f}s  {size_of(result)}")
+    seconds, result = timed(lambda: correlate(df, output="edges", threshold=0.5))
+    print(f"  engine edges |r|>=0.5          : {seconds:7.2f}s  {size_of(result)}")
+    seconds, result = timed(lambda: correlate(df, output="array"))
+    print(f"  engine array (float32)         : {seconds:7.2f}s  {size_of(result)}")
+    seconds, result = timed(lambda: correlate(df, method="spearman"))
+    print(f"  engine spearman (sampled)      : {seconds:7.2f}s  rows used {result['rows']:,}")
+    seconds, result = timed(lambda: correlate(df, method="kendall"))
+    print(f"  engine kendall (sampled)       : {seconds:7.2f}s  rows used {result['rows']:,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=1000)
+    parser.add_argument("--skip-pandas", action="store_true", help="Skip the slow dense baseline")
+    args = parser.parse_args()
+    main(args.rows, args.columns, args.skip_pandas)
@@ -0,0 +1,84 @@
+"""
+Benchmark: MemoryBank query latency with and without the embedding cache.
+
+Fills a temporary MemoryBank with preferences and insights, then times repeated lookups:
+the fixed "preference" query of get_all_preferences and a repeated retrieve_insights query,
+plus the embedding call alone. Compared setups:
+  * Chroma default              : DefaultEmbeddingFunction, which reloads the model every call (MiniLM only)
+  * shared model                : the model loaded once, no cache
+  * shared model + cache (hot)  : repeats served from the in-memory LRU
+  * shared model + cache (disk) : in-memory LRU cleared before each lookup, served from SQLite
+No model calls (LLM) are made. The embedding model must be available locally; if it cannot be
+loaded, the dependency-free 'hashing' model is used instead.
+
+Usage:
+    python -m benchmarks.bench_embedding_cache [--model all-MiniLM-L6-v2] [--documents 500] [--repeats 50]
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from config import config
+from memory.memory_bank import MemoryBank
+from memory.embedding_cache import EmbeddingCache, CachedEmbeddingFunction, load_model, DEFAULT_MODEL, HASHING_MODEL
+
+def median_ms(fn, repeats: int, before=None) -> float:
+    times = []
+    for _ in range(repeats):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def fill(bank: MemoryBank, documents: int):
+    for i in range(documents // 5):
+        bank.store_preference(f"User prefers chart style {i % 7} with {['bar', 'line', 'pie'][i % 3]} charts")
+    for i in range(documents - documents // 5):
+        bank.store_insight(f"Sales in region {i % 4} grew {i % 23}% after campaign {i}", {"dataset": f"d{i % 5}.csv"})
+    bank.flush()
+
+def measure(label: str, function, root: str, documents: int, repeats: int, before=None):
+    directory = "".join(c if c.isalnum() else "_" for c in label)
+    bank = MemoryBank(os.path.join(root, directory), embedding_function=function, flush_seconds=0)
+    fill(bank, documents)
+    embed = median_ms(lambda: function(["preference"]), repeats, before)
+    preferences = median_ms(bank.get_all_preferences, repeats, before)
+    insights = median_ms(lambda: bank.retrieve_insights("which region grew fastest?"), repeats, before)
+    print(f"  {label:<30}: embed {embed:9.3f} ms   get_all_preferences {preferences:8.3f} ms   retrieve_insights {insights:8.3f} ms")
+    bank.close()
+
+def main(model: str, documents: int, repeats: int):
+    root = tempfile.mkdtemp(prefix="bench_embeddings_")
+    try:
+        try:
+            base = load_model(model)
+            base(["warm-up"])
+        except Exception as e:
+            print(f"Model '{model}' could not be loaded ({type(e).__name__}: {e}); using '{HASHING_MODEL}'.")
+            model, base = HASHING_MODEL, load_model(HASHING_MODEL)
+
+        print(f"\nMemoryBank lookups, model '{model}', {documents} documents, median of {repeats}")
+        if model == DEFAULT_MODEL:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            measure("Chroma default", DefaultEmbeddingFunction(), root, documents, max(3, repeats // 10))
+        measure("shared model", base, root, documents, repeats)
+
+        cache = EmbeddingCache(os.path.join(root, "embeddings.sqlite3"), config.EMBEDDING_CACHE_MAX_ENTRIES, config.EMBEDDING_CACHE_MEMORY_ENTRIES)
+        cached = CachedEmbeddingFunction(base, model, cache)
+        measure("shared model + cache (hot)", cached, root, documents, repeats)
+        measure("shared model + cache (disk)", cached, root, documents, repeats, before=cache.clear_memory)
+        print(f"  cache: {cache.stats()}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config.MEMORY_EMBEDDING_MODEL)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    main(args.model, args.documents, args.repeats)
@@ -0,0 +1,90 @@
+"""
+Benchmark: per-call overhead of BaseAgent.generate on hundreds of short Q&A calls.
+
+Compares what BaseAgent does, which builds a new InMemorySessionService, session and Runner
+for every prompt, with a pooled variant that keeps one session service and one Runner per
+agent and only creates and deletes a session per call (public ADK API). The model is an
+instant offline fake and the response cache is off, so the numbers are pure orchestration
+overhead.
+
+Pooling was evaluated with this script and rejected. Five runs of 1000 calls measured
+roughly 7.2-8.3 ms per call either way, and the difference changed sign from run to run
+(-333 us to +456 us per call). Model round-trips take hundreds of milliseconds, so that is noise.
+One pooled variant recycled session slots by editing the service's private `sessions` dict; it was
+no faster either.
+
+Usage:
+    python -m benchmarks.bench_generate_overhead [--calls 500]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from google.adk import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from agents.base_agent import BaseAgent
+from benchmarks.fake_llm import use_fake_model
+from infrastructure.key_pool import key_pool
+
+class QAAgent(BaseAgent):
+    cache_responses = False
+
+class PooledQAAgent(QAAgent):
+    """The evaluated alternative: one session service and Runner per agent, a new session per call."""
+    async def _run_model(self, prompt: str, usage: dict, attempted_keys: set) -> str:
+        if not hasattr(self, "_session_service"):
+            self._session_service = InMemorySessionService()
+            self._runners = {}
+        session_id = str(uuid.uuid4())
+        await self._session_service.create_session(app_name="DataGuild", user_id="user", session_id=session_id)
+        response_text = ""
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        try:
+            async with key_pool.lease(exclude=attempted_keys) as key:
+                attempted_keys.add(key)
+                agent = self._agent_for_key(key)
+                runner = self._runners.get(id(agent))
+                if runner is None:
+                    runner = self._runners[id(agent)] = Runner(agent=agent, session_service=self._session_service, app_name="DataGuild")
+                async for event in runner.run_async(user_id="user", session_id=session_id, new_message=message):
+                    if getattr(event, 'text', None):
+                        response_text += event.text
+        finally:
+            await self._session_service.delete_session(app_name="DataGuild", user_id="user", session_id=session_id)
+        return response_text
+
+async def measure(agent: BaseAgent, calls: int) -> list:
+    await agent.generate("warm-up")
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        await agent.generate(f"What is the mean of column {i}?")
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+def summarize(label: str, timings: list):
+    ordered = sorted(timings)
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    print(f"  {label:<22}: mean {statistics.mean(timings):8.0f}us  p50 {statistics.median(timings):8.0f}us  p99 {p99:8.0f}us")
+
+async def main(calls: int):
+    per_call_agent = use_fake_model(QAAgent("PerCallQA"), latency=0, reply="42")
+    pooled_agent = use_fake_model(PooledQAAgent("PooledQA"), latency=0, reply="42")
+    for agent in (per_call_agent, pooled_agent):
+        agent.logger.disabled = True
+
+    per_call = await measure(per_call_agent, calls)
+    pooled = await measure(pooled_agent, calls)
+
+    print(f"\ngenerate() overhead over {calls} sequential short Q&A calls (instant fake model)")
+    summarize("new runner per call", per_call)
+    summarize("pooled runner", pooled)
+    print(f"  mean overhead saved   : {statistics.mean(per_call) - statistics.mean(pooled):8.0f}us per call")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
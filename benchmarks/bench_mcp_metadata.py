@@ -0,0 +1,88 @@
+"""
+Benchmark: MCP file server metadata calls per second.
+
+Compares calling `get_file_metadata` in-process (directly, and on a thread as the async
+agents would) with the pooled client in infrastructure/mcp_client.py talking to 1 and N
+server processes over stdio, with many requests in flight. Each mode gets its own fresh
+files, so the first pass measures cold calls (header parsed) and the later passes warm ones
+(served from the directory index). Temporary '_bench_*' files are created in data_storage/
+and removed afterwards. No model calls are made.
+
+Usage:
+    python -m benchmarks.bench_mcp_metadata [--files 200] [--rows 20000] [--calls 2000] [--concurrency 64] [--processes 4]
+"""
+import os
+import glob
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+from config import config
+from infrastructure import mcp_server
+from infrastructure.mcp_client import MCPClientPool
+
+def make_files(prefix: str, files: int, rows: int) -> list:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "amount": rng.normal(100, 20, rows).round(2),
+        "units": rng.integers(1, 50, rows),
+    })
+    names = []
+    for i in range(files):
+        name = f"_bench_{prefix}_{i}.csv"
+        df.to_csv(os.path.join(config.DATA_DIR, name), index=False)
+        names.append(name)
+    return names
+
+async def run_calls(call, names: list, calls: int, concurrency: int) -> float:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with limit:
+            result = await call(names[i % len(names)])
+            assert "columns" in result, result
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(calls)])
+    return calls / (time.perf_counter() - start)
+
+async def measure(label: str, call, names: list, calls: int, concurrency: int):
+    cold = await run_calls(call, names, len(names), concurrency)
+    warm = await run_calls(call, names, calls, concurrency)
+    print(f"  {label:<34}: cold {cold:9,.0f} calls/s   warm {warm:9,.0f} calls/s")
+
+async def main(files: int, rows: int, calls: int, concurrency: int, processes: int):
+    print(f"\nget_file_metadata over {files} CSV files of {rows:,} rows, {concurrency} requests in flight")
+    try:
+        async def direct(name):
+            return mcp_server.get_file_metadata(name)
+        await measure("in-process, on the event loop", direct, make_files("direct", files, rows), calls, concurrency)
+
+        async def threaded(name):
+            return await asyncio.to_thread(mcp_server.get_file_metadata, name)
+        await measure("in-process, on threads", threaded, make_files("thread", files, rows), calls, concurrency)
+
+        for count in sorted({1, processes}):
+            pool = MCPClientPool(processes=count)
+            start = time.perf_counter()
+            await pool.list_files()
+            print(f"  ({count} server process(es) started in {time.perf_counter() - start:.1f}s)")
+            await measure(f"pooled client, {count} process(es)", pool.get_file_metadata,
+                          make_files(f"pool{count}", files, rows), calls, concurrency)
+            await pool.close()
+    finally:
+        for path in glob.glob(os.path.join(config.DATA_DIR, "_bench_*")):
+            os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.files, args.rows, args.calls, args.concurrency, args.processes))
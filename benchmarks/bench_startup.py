@@ -0,0 +1,68 @@
+"""
+Benchmark: CLI cold start.
+
+Each measurement runs in a fresh interpreter, so module caches are cold:
+  * import main                  : module import time of the CLI entry point
+  * startup (lazy)               : import + MemoryBank/SessionManager/Orchestrator, as main() does
+  * startup (eager, old behaviour): the same plus instantiating every registered agent up front
+
+Also prints the slowest top-level imports reported by `python -X importtime`.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_ONLY = "import main"
+LAZY_STARTUP = """
+import main
+from memory.memory_bank import MemoryBank
+from memory.session_manager import SessionManager
+main.Orchestrator(SessionManager(MemoryBank()))
+"""
+EAGER_STARTUP = LAZY_STARTUP + """
+from infrastructure.a2a_registry import registry, agent_pool
+for name in registry.list_agents():
+    agent_pool.get(name)
+"""
+
+def time_snippet(snippet: str, repeat: int) -> float:
+    timer = f"import time; _t = time.perf_counter()\n{snippet}\nprint(time.perf_counter() - _t)"
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", timer], cwd=ROOT, capture_output=True, text=True, check=True)
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def slowest_imports(limit: int = 8):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Only direct children of main (two leading spaces of nesting)
+        if name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def main(repeat: int):
+    print(f"\nCLI cold start (median of {repeat} fresh interpreters)")
+    print(f"  import main                   : {time_snippet(IMPORT_ONLY, repeat):6.2f}s")
+    print(f"  startup (lazy agents)         : {time_snippet(LAZY_STARTUP, repeat):6.2f}s")
+    print(f"  startup (eager, all agents)   : {time_snippet(EAGER_STARTUP, repeat):6.2f}s")
+    print("\nSlowest imports under main:")
+    for cumulative_us, name in slowest_imports():
+        print(f"  {name:<40}{cumulative_us / 1e6:6.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.repeat)
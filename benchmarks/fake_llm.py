@@ -0,0 +1,55 @@
+import asyncio
+from typing import AsyncGenerator
+from google.adk.models import BaseLlm, LlmResponse
+from google.genai import types
+from infrastructure.key_pool import key_pool
+
+class FakeLatencyLlm(BaseLlm):
+    """
+    Offline stand-in for Gemini that sleeps for a fixed latency and returns canned text.
+    Used by the benchmarks to measure orchestration overhead without network calls.
+    """
+    model: str = "fake-latency-model"
+    latency: float = 0.5
+    reply: str = '{"ok": true}'
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        """
+        Simulates one model round-trip.
+
+        Args:
+            llm_request: The request built by the ADK flow (ignored).
+            stream (bool): Whether streaming was requested (ignored).
+
+        Yields:
+            LlmResponse: A single response carrying the canned reply.
+        """
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=self.reply)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=100,
+                candidates_token_count=20,
+                total_token_count=120
+            )
+        )
+
+def use_fake_model(agent, latency: float = 0.5, reply: str = '{"ok": true}'):
+    """
+    Swaps a BaseAgent's underlying ADK model for a FakeLatencyLlm.
+    Also lifts the key pool's RPM budget, since no real API is called.
+
+    Args:
+        agent (BaseAgent): The agent to patch.
+        latency (float): Simulated seconds per model call.
+        reply (str): The text every call returns.
+
+    Returns:
+        BaseAgent: The same agent, for chaining.
+    """
+    fake = FakeLatencyLlm(latency=latency, reply=reply)
+    key_pool.set_rpm(1e9)
+    agent.model = fake
+    agent.agent = agent.agent.model_copy(update={"model": fake})
+    return agent
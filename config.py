@@ -29,12 +29,139 @@ class Config:
 
     MODEL_FLASH = "gemini-2.5-flash" 
     MODEL_PRO = "gemini-2.5-flash"
+
+    # USD per 1M (input, output) tokens, used for the session cost summary
+    MODEL_PRICING = {
+        "gemini-2.5-flash": (0.30, 2.50),
+        "gemini-2.5-pro": (1.25, 10.00),
+    }
     
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     MEMORY_DIR = os.path.join(BASE_DIR, "chroma_db")
+    DATA_DIR = os.path.join(BASE_DIR, "data_storage")
+    CACHE_DIR = os.path.join(BASE_DIR, "cache")
+    PROFILE_CACHE_DIR = os.path.join(CACHE_DIR, "profiles")
+    RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite3")
+    RUN_MANIFEST_DIR = os.path.join(CACHE_DIR, "manifests")
+    PLAN_STORE_PATH = os.path.join(CACHE_DIR, "cleaning_plans.sqlite3")
+    SAMPLE_CACHE_DIR = os.path.join(CACHE_DIR, "samples")
+    DATA_CATALOG_PATH = os.path.join(CACHE_DIR, "data_catalog.sqlite3")
+    EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+    DATASET_SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
     
     SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 
+    # Upper bound on in-flight model calls across all agents
+    MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "8"))
+
+    # Headless batch mode (infrastructure/batch_runner.py)
+    BATCH_MAX_CONCURRENT_DATASETS = int(os.getenv("BATCH_MAX_CONCURRENT_DATASETS", "4"))
+    BATCH_OUTPUT_DIR = os.path.join(BASE_DIR, "reports")
+
+    # Multi-session HTTP/WebSocket server (infrastructure/server.py)
+    SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "64"))
+    SERVER_SESSION_IDLE_MINUTES = float(os.getenv("SERVER_SESSION_IDLE_MINUTES", "60"))
+    SERVER_EVICT_INTERVAL_SECONDS = float(os.getenv("SERVER_EVICT_INTERVAL_SECONDS", "60")) # how often idle sessions are checked
+
+    # Per-key limits for the API key pool (infrastructure/key_pool.py)
+    KEY_RPM = float(os.getenv("KEY_RPM", "10"))
+    KEY_MAX_CONCURRENCY = int(os.getenv("KEY_MAX_CONCURRENCY", "4"))
+    KEY_COOLDOWN_SECONDS = float(os.getenv("KEY_COOLDOWN_SECONDS", "30"))
+
+    # Retries, backoff, hedging and circuit breaking for model calls (infrastructure/resilience.py)
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+    LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "180"))
+    LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0")) # 0 disables hedging
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+    # Incremental refresh of appended datasets (infrastructure/run_manifest.py)
+    REFRESH_DRIFT_THRESHOLD = float(os.getenv("REFRESH_DRIFT_THRESHOLD", "0.05"))
+
+    # Sandboxed execution of generated code (infrastructure/code_executor.py)
+    CODE_EXECUTOR_WORKERS = int(os.getenv("CODE_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+    CODE_EXECUTION_TIMEOUT = float(os.getenv("CODE_EXECUTION_TIMEOUT", "120"))
+    CODE_EXECUTION_MEMORY_MB = int(os.getenv("CODE_EXECUTION_MEMORY_MB", "4096"))
+
+    # In-memory budget for parsed datasets (infrastructure/dataset_cache.py)
+    DATASET_CACHE_MAX_MB = int(os.getenv("DATASET_CACHE_MAX_MB", "2048"))
+    # Disk budget for the Arrow snapshots that code-execution workers memory-map
+    DATASET_SNAPSHOT_MAX_MB = int(os.getenv("DATASET_SNAPSHOT_MAX_MB", "20480"))
+
+    # Working format for cleaned datasets: "parquet", "feather" or "csv"
+    CLEANED_FORMAT = os.getenv("CLEANED_FORMAT", "parquet").lower()
+    # Also write a CSV copy of the cleaned dataset for spreadsheet users
+    CLEANED_CSV_EXPORT = os.getenv("CLEANED_CSV_EXPORT", "false").lower() in ("1", "true", "yes")
+
+    # Chunked (out-of-core) cleaning for files too large to load at once (agents/refinery.py)
+    CHUNKED_CLEANING_MIN_MB = float(os.getenv("CHUNKED_CLEANING_MIN_MB", "1024"))
+    CLEANING_CHUNK_ROWS = int(os.getenv("CLEANING_CHUNK_ROWS", "250000"))
+
+    # Built-in Phase-1 statistics instead of generated analysis code (tools/stats_kernel.py)
+    STATS_KERNEL_ENABLED = os.getenv("STATS_KERNEL_ENABLED", "true").lower() in ("1", "true", "yes")
+    STATS_KERNEL_MAX_COLUMNS = int(os.getenv("STATS_KERNEL_MAX_COLUMNS", "50"))
+
+    # Blockwise correlation engine (tools/correlation.py)
+    CORRELATION_BLOCK_SIZE = int(os.getenv("CORRELATION_BLOCK_SIZE", "256"))
+    CORRELATION_WORKERS = int(os.getenv("CORRELATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+    CORRELATION_SAMPLE_ROWS = int(os.getenv("CORRELATION_SAMPLE_ROWS", "100000"))
+    CORRELATION_KENDALL_ROWS = int(os.getenv("CORRELATION_KENDALL_ROWS", "500"))
+    CORRELATION_MAX_EDGES = int(os.getenv("CORRELATION_MAX_EDGES", "10000"))
+
+    # Approximate analysis on a row sample for very large datasets (tools/sampling.py)
+    APPROX_ENABLED = os.getenv("APPROX_ENABLED", "false").lower() in ("1", "true", "yes")
+    APPROX_MIN_ROWS = int(os.getenv("APPROX_MIN_ROWS", "5000000"))
+    APPROX_TARGET_ERROR = float(os.getenv("APPROX_TARGET_ERROR", "0.01"))
+    APPROX_CONFIDENCE = float(os.getenv("APPROX_CONFIDENCE", "0.95"))
+    APPROX_STRATIFY = os.getenv("APPROX_STRATIFY", "true").lower() in ("1", "true", "yes")
+    APPROX_MAX_STRATA = int(os.getenv("APPROX_MAX_STRATA", "50"))
+
+    # Paged reads from the MCP file server (infrastructure/mcp_server.py)
+    MCP_READ_DEFAULT_ROWS = int(os.getenv("MCP_READ_DEFAULT_ROWS", "1000"))
+    MCP_READ_MAX_ROWS = int(os.getenv("MCP_READ_MAX_ROWS", "50000"))
+
+    # Directory index of data_storage/ (infrastructure/data_catalog.py)
+    DATA_CATALOG_RESCAN_SECONDS = float(os.getenv("DATA_CATALOG_RESCAN_SECONDS", "2"))
+
+    # Out-of-process MCP file server (infrastructure/mcp_client.py)
+    MCP_SERVER_PROCESSES = int(os.getenv("MCP_SERVER_PROCESSES", "2")) # 0 = call the file tools in-process
+    MCP_MAX_IN_FLIGHT = int(os.getenv("MCP_MAX_IN_FLIGHT", "16")) # Pipelined requests per server process
+    MCP_REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "60"))
+
+    # Write-behind batching of MemoryBank writes (memory/memory_bank.py)
+    MEMORY_WRITE_BEHIND = os.getenv("MEMORY_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+    MEMORY_WRITE_BATCH_SIZE = int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "64"))
+    MEMORY_FLUSH_SECONDS = float(os.getenv("MEMORY_FLUSH_SECONDS", "2"))
+
+    # Embedding model and cache for the MemoryBank (memory/embedding_cache.py)
+    # 'all-MiniLM-L6-v2' (Chroma's ONNX model), 'hashing' (no download) or a sentence-transformers model.
+    # Vectors differ between models, so a different model needs a fresh chroma_db/.
+    MEMORY_EMBEDDING_MODEL = os.getenv("MEMORY_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+    EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "4096"))
+
+    # Replay validated cleaning plans for files with a known schema (infrastructure/plan_store.py)
+    PLAN_REPLAY_ENABLED = os.getenv("PLAN_REPLAY_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # On-disk LLM response cache (infrastructure/response_cache.py)
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_TTL_HOURS = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "168"))
+    RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "256"))
+
+    # Batched telemetry export (infrastructure/observability.py)
+    TELEMETRY_MAX_QUEUE_SIZE = int(os.getenv("TELEMETRY_MAX_QUEUE_SIZE", "2048"))
+    TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "512"))
+    TELEMETRY_FLUSH_INTERVAL_MS = int(os.getenv("TELEMETRY_FLUSH_INTERVAL_MS", "5000"))
+
+    # Streaming profiler (tools/profiler.py)
+    PROFILE_CHUNK_ROWS = int(os.getenv("PROFILE_CHUNK_ROWS", "200000"))
+    PROFILE_SAMPLE_SIZE = int(os.getenv("PROFILE_SAMPLE_SIZE", "1000"))
+
     @classmethod
     def setup_adk_auth(cls):
         """
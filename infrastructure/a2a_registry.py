@@ -1,5 +1,8 @@
+import importlib
+import threading
 from typing import Dict, Any, List
 from pydantic import BaseModel
+from infrastructure.stream_handler import get_stream_logger
 
 class AgentCard(BaseModel):
     """
@@ -53,6 +56,58 @@ class A2ARegistry:
         """
         return list(self.agents.keys())
 
+class AgentPool:
+    """
+    Instantiates agents on first use from their AgentCard (module_path / class_name).
+    An agent's module, and whatever it imports, is only loaded when a workflow step needs it.
+    """
+    def __init__(self, registry: A2ARegistry):
+        """
+        Initialize the AgentPool.
+
+        Args:
+            registry (A2ARegistry): The registry holding the agent cards.
+        """
+        self.registry = registry
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.logger = get_stream_logger("AgentPool")
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the agent instance for a name, importing and constructing it on first use.
+
+        Args:
+            name (str): The name of the agent.
+
+        Returns:
+            Any: The agent instance, or None if it is not registered or failed to load.
+        """
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            card = self.registry.get_agent(name)
+            if card is None:
+                return None
+            try:
+                module = importlib.import_module(card.module_path)
+                agent_class = getattr(module, card.class_name)
+                self._instances[name] = agent_class()
+                self.logger.info(f"Dynamically loaded agent: {name}")
+            except Exception as e:
+                self.logger.error(f"Failed to load agent {name}: {e}")
+                return None
+            return self._instances[name]
+
+    def loaded(self) -> List[str]:
+        """
+        Lists the agents that have been instantiated so far.
+
+        Returns:
+            List[str]: A list of agent names.
+        """
+        return list(self._instances.keys())
+
 # Global Registry
 registry = A2ARegistry()
 
@@ -113,3 +168,6 @@ registry.register_agent(refinery_card)
 registry.register_agent(analyst_card)
 registry.register_agent(critic_card)
 registry.register_agent(qa_card)
+
+# Global Agent Pool (shared by every Orchestrator)
+agent_pool = AgentPool(registry)
@@ -0,0 +1,242 @@
+import os
+import glob
+import json
+import time
+import shutil
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from config import config
+from agents.base_agent import set_llm_concurrency
+from agents.orchestrator import Orchestrator
+from memory.memory_bank import MemoryBank
+from memory.session_manager import SessionManager
+from infrastructure.observability import trace_logger, current_session_id
+from infrastructure.stream_handler import get_stream_logger
+
+DATA_DIR = config.DATA_DIR
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".parquet", ".feather", ".arrow")
+
+class DatasetResult(BaseModel):
+    """
+    Outcome of running the full pipeline on one dataset.
+    """
+    dataset: str = Field(..., description="The dataset filename.")
+    session_id: str = Field(..., description="The session the run was saved under.")
+    status: str = Field("failed", description="'completed' or 'failed'.")
+    stage: str = Field("IDLE", description="The last pipeline state reached.")
+    report_path: Optional[str] = Field(None, description="Where the final report was written.")
+    error: Optional[str] = Field(None, description="Why the run stopped, if it failed.")
+    seconds: float = Field(0.0, description="Wall-clock duration of the run.")
+    llm_calls: int = Field(0, description="Model calls made (including cache hits).")
+    prompt_tokens: int = Field(0, description="Prompt tokens consumed.")
+    response_tokens: int = Field(0, description="Response tokens produced.")
+    cost_usd: float = Field(0.0, description="Estimated cost (MODEL_PRICING).")
+
+def discover_datasets(target: str) -> List[str]:
+    """
+    Expands a directory or glob pattern into the dataset files to process.
+    Cleaned outputs (cleaned_*) are skipped.
+
+    Args:
+        target (str): A directory or a glob pattern (e.g. "incoming/*.csv").
+
+    Returns:
+        List[str]: Sorted dataset paths.
+    """
+    pattern = os.path.join(target, "*") if os.path.isdir(target) else target
+    return sorted(
+        path for path in glob.glob(pattern)
+        if path.lower().endswith(SUPPORTED_EXTENSIONS)
+        and os.path.isfile(path)
+        and not os.path.basename(path).startswith("cleaned_")
+    )
+
+def stage_into_data_dir(path: str) -> str:
+    """
+    Makes a dataset visible to the MCP sandbox, copying it into data_storage/ if needed.
+    An identical copy from a previous run (same size and mtime) is reused; an outdated one is
+    replaced in place (atomically), so repeated batches keep one copy per dataset and
+    incremental runs find the previous run under the same name.
+
+    Args:
+        path (str): The dataset path.
+
+    Returns:
+        str: The filename inside data_storage/.
+    """
+    filename = os.path.basename(path)
+    if os.path.dirname(os.path.abspath(path)) == DATA_DIR:
+        return filename
+    os.makedirs(DATA_DIR, exist_ok=True)
+    dest_path = os.path.join(DATA_DIR, filename)
+    if os.path.exists(dest_path):
+        src, dest = os.stat(path), os.stat(dest_path)
+        if (src.st_size, int(src.st_mtime)) == (dest.st_size, int(dest.st_mtime)):
+            return filename
+    tmp_path = f"{dest_path}.partial"
+    shutil.copy2(path, tmp_path)
+    os.replace(tmp_path, dest_path)
+    return filename
+
+class BatchRunner:
+    """
+    Runs INGESTING -> CLEANING -> ANALYZING -> REPORTING over many datasets without the REPL.
+    Datasets run concurrently (each with its own Orchestrator and session) while the
+    process-wide LLM semaphore and key pool bound the load on the model API.
+    """
+    def __init__(self, max_concurrent_datasets: int = None, llm_concurrency: int = None, output_dir: str = None, incremental: bool = False):
+        """
+        Initialize the BatchRunner.
+
+        Args:
+            max_concurrent_datasets (int, optional): Datasets processed at the same time.
+            llm_concurrency (int, optional): Global limit on in-flight model calls.
+            output_dir (str, optional): Root directory for per-batch reports.
+            incremental (bool): Refresh previously analyzed datasets from their appended rows
+                instead of re-running the full pipeline (see Orchestrator.refresh_dataset).
+        """
+        self.max_concurrent_datasets = max_concurrent_datasets or config.BATCH_MAX_CONCURRENT_DATASETS
+        self.llm_concurrency = llm_concurrency or config.MAX_CONCURRENT_LLM_CALLS
+        self.batch_id = datetime.now().strftime("batch_%Y%m%d_%H%M%S")
+        self.output_dir = os.path.join(output_dir or config.BATCH_OUTPUT_DIR, self.batch_id)
+        self.incremental = incremental
+        self.memory_bank = MemoryBank()
+        self.summary = {}
+        self.logger = get_stream_logger("BatchRunner")
+
+    async def run(self, datasets: List[str]) -> List[DatasetResult]:
+        """
+        Processes every dataset and writes the per-dataset reports and a summary.json.
+        The aggregate is also kept on `self.summary`.
+
+        Args:
+            datasets (List[str]): Dataset paths (see discover_datasets).
+
+        Returns:
+            List[DatasetResult]: One result per dataset, in input order.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        set_llm_concurrency(self.llm_concurrency)
+        slots = asyncio.Semaphore(self.max_concurrent_datasets)
+
+        async def bounded(path: str) -> DatasetResult:
+            async with slots:
+                return await self.run_dataset(path)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[bounded(path) for path in datasets])
+        self.summary = self.summarize(results, time.perf_counter() - start)
+
+        with open(os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "batch_id": self.batch_id,
+                "summary": self.summary,
+                "datasets": [result.model_dump() for result in results]
+            }, f, indent=2)
+        return results
+
+    async def run_dataset(self, path: str) -> DatasetResult:
+        """
+        Runs the full pipeline on one dataset in its own session (in incremental mode,
+        a refresh from the appended rows when the previous run allows it).
+        Runs inside its own asyncio task, so setting the session context var here
+        attributes this dataset's model usage to its own session.
+
+        Args:
+            path (str): The dataset path.
+
+        Returns:
+            DatasetResult: The outcome of the run.
+        """
+        session_manager = SessionManager(self.memory_bank)
+        current_session_id.set(session_manager.current_session_id)
+        orchestrator = Orchestrator(session_manager)
+        result = DatasetResult(dataset=os.path.basename(path), session_id=session_manager.current_session_id)
+        start = time.perf_counter()
+
+        try:
+            filename = stage_into_data_dir(path)
+            result.dataset = filename
+            refreshed = await orchestrator.refresh_dataset(filename) if self.incremental else None
+            if refreshed is not None:
+                self.logger.info(f"[{filename}] REFRESH")
+                result.stage = "REFRESH"
+                session_manager.add_message("system", refreshed)
+                if orchestrator.last_error:
+                    result.error = orchestrator.last_error
+                else:
+                    result.report_path = self._write_report(filename, refreshed)
+                    result.status = "completed"
+            else:
+                await self._run_full_pipeline(orchestrator, session_manager, filename, result)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            self.logger.error(f"[{result.dataset}] failed: {e}")
+        finally:
+            session_manager.session_name = f"Batch {self.batch_id}: {result.dataset}"
+            # Saving flushes queued memory writes, which must not stall the other datasets
+            await asyncio.to_thread(session_manager.save_state)
+
+        result.seconds = round(time.perf_counter() - start, 2)
+        for stats in trace_logger.pop_usage(session_manager.current_session_id).values():
+            result.llm_calls += int(stats["calls"])
+            result.prompt_tokens += int(stats["prompt_tokens"])
+            result.response_tokens += int(stats["response_tokens"])
+            result.cost_usd += stats["cost_usd"]
+        return result
+
+    async def _run_full_pipeline(self, orchestrator: Orchestrator, session_manager: SessionManager, filename: str, result: DatasetResult):
+        stages = [
+            ("INGESTING", lambda: orchestrator.delegate_to_steward(filename)),
+            ("CLEANING", orchestrator.run_cleaning_loop),
+            ("ANALYZING", orchestrator.transition_to_analysis),
+            ("REPORTING", orchestrator.generate_final_report)
+        ]
+        response = ""
+        for state, step in stages:
+            self.logger.info(f"[{filename}] {state}")
+            session_manager.set_state(state)
+            result.stage = state
+            response = await step()
+            session_manager.add_message("system", response)
+            if orchestrator.last_error:
+                result.error = orchestrator.last_error
+                return
+        result.report_path = self._write_report(filename, response)
+        result.status = "completed"
+
+    def _write_report(self, filename: str, report: str) -> str:
+        # Keep the extension: sales.csv and sales.xlsx are different datasets
+        report_path = os.path.join(self.output_dir, f"{filename}.md")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(report)
+        return report_path
+
+    @staticmethod
+    def summarize(results: List[DatasetResult], elapsed: float) -> dict:
+        """
+        Aggregates batch throughput and cost.
+
+        Args:
+            results (List[DatasetResult]): The per-dataset results.
+            elapsed (float): Wall-clock duration of the whole batch in seconds.
+
+        Returns:
+            dict: Totals plus completed datasets/hour (processed_per_hour counts failures too) and tokens/dataset.
+        """
+        completed = sum(1 for r in results if r.status == "completed")
+        tokens = sum(r.prompt_tokens + r.response_tokens for r in results)
+        return {
+            "datasets": len(results),
+            "completed": completed,
+            "failed": len(results) - completed,
+            "elapsed_seconds": round(elapsed, 2),
+            # Failed datasets can stop after one stage, so only completed ones count as throughput
+            "datasets_per_hour": round(completed * 3600 / elapsed, 2) if elapsed else 0.0,
+            "processed_per_hour": round(len(results) * 3600 / elapsed, 2) if elapsed else 0.0,
+            "tokens_per_dataset": round(tokens / len(results)) if results else 0,
+            "total_tokens": tokens,
+            "total_cost_usd": round(sum(r.cost_usd for r in results), 4)
+        }
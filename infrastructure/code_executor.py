@@ -0,0 +1,269 @@
+import asyncio
+import contextlib
+import io
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from config import config
+from infrastructure.stream_handler import get_stream_logger
+from infrastructure.dataset_cache import ensure_snapshot
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+class ExecutionResult(BaseModel):
+    """
+    Outcome of one sandboxed code-execution job.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    success: bool = Field(..., description="True if the code ran to completion.")
+    output: str = Field("", description="Everything the code printed to stdout.")
+    error: Optional[str] = Field(None, description="Error message if the job failed.")
+    variables: Dict[str, Any] = Field(default_factory=dict, description="Requested variables read back from the scope.")
+
+class _JobTimeout(Exception):
+    pass
+
+def _raise_timeout(signum, frame):
+    raise _JobTimeout()
+
+_started_queue = None # Set in each worker: job IDs are reported here when a job starts running
+_memory_limit = 0 # Worker address-space limit in bytes (0 = none)
+
+def _set_memory_limit(extra_bytes: int = 0):
+    """
+    Applies the worker's address-space limit plus `extra_bytes` (e.g. a memory-mapped snapshot,
+    which counts against RLIMIT_AS although its pages are shared with the other workers).
+    Only the soft limit is set, so it can be raised again for the next job.
+    """
+    if not _memory_limit or resource is None:
+        return
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = _memory_limit + extra_bytes
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    except (ValueError, OSError):
+        pass # Unsupported platform
+
+def _init_worker(memory_limit_mb: int, started_queue=None):
+    """
+    Warms a worker process: pre-imports the analysis stack and applies the memory cap.
+
+    Args:
+        memory_limit_mb (int): Address-space limit in MB (0 disables the limit).
+        started_queue (SimpleQueue, optional): Where the worker reports the jobs it starts.
+    """
+    global _started_queue, _memory_limit
+    _started_queue = started_queue
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+    import numpy
+    import pandas
+    import pyarrow
+
+    _memory_limit = memory_limit_mb * 1024 * 1024
+    _set_memory_limit()
+
+def _run_job(code: str, variables: Optional[Dict[str, Any]], return_vars: Optional[List[str]], timeout: float,
+             dataset_path: Optional[str] = None, job_id: Optional[int] = None, snapshot: Optional[str] = None) -> dict:
+    """
+    Executes one job inside a worker process. Must stay module-level so it can be pickled.
+
+    Args:
+        code (str): The Python source to execute.
+        variables (dict, optional): Extra names injected into the execution scope.
+        return_vars (list, optional): Names to read back from the scope after execution.
+        timeout (float): Wall-clock limit in seconds.
+        dataset_path (str, optional): Dataset to inject as `df` (parsed here only if there is no snapshot).
+        job_id (int, optional): Reported to the parent when the job starts, which starts its backstop timer.
+        snapshot (str, optional): Arrow snapshot of `dataset_path` to memory-map (see dataset_cache.ensure_snapshot).
+
+    Returns:
+        dict: Fields of an ExecutionResult.
+    """
+    if job_id is not None and _started_queue is not None:
+        _started_queue.put(job_id)
+    import numpy as np
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    scope = {'pd': pd, 'np': np, 'plt': plt}
+    scope.update(variables or {})
+    buffer = io.StringIO()
+
+    if snapshot:
+        _set_memory_limit(os.path.getsize(snapshot))
+    use_alarm = timeout and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if snapshot:
+            from infrastructure.dataset_cache import load_snapshot
+            # Built from the shared memory-mapped snapshot; the frame is private to this job
+            scope['df'] = load_snapshot(snapshot)
+        elif dataset_path:
+            from tools.data_ops import load_data
+            scope['df'] = load_data(dataset_path)
+        # Each worker runs one job at a time, so redirecting stdout here cannot
+        # mix output between concurrent analysts.
+        with contextlib.redirect_stdout(buffer):
+            exec(code, scope)
+        returned = {name: scope.get(name) for name in (return_vars or [])}
+        return {"success": True, "output": buffer.getvalue(), "variables": returned}
+    except _JobTimeout:
+        error = f"Execution exceeded the {timeout:.0f}s wall-clock limit."
+    except MemoryError:
+        error = "Execution exceeded the worker memory limit."
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        plt.close('all')
+        if snapshot:
+            _set_memory_limit()
+    return {"success": False, "output": buffer.getvalue(), "error": error}
+
+class CodeExecutor:
+    """
+    Runs LLM-generated analysis code in a pool of warm worker processes.
+    Each job gets its own stdout capture, a wall-clock limit and a per-worker memory cap,
+    so concurrent analysts execute on separate cores without blocking the event loop.
+    """
+    def __init__(self, max_workers: int = None, timeout: float = None, memory_limit_mb: int = None):
+        """
+        Initialize the CodeExecutor. Worker processes are started on first use.
+
+        Args:
+            max_workers (int, optional): Number of worker processes.
+            timeout (float, optional): Default wall-clock limit per job in seconds.
+            memory_limit_mb (int, optional): Address-space cap per worker in MB (0 disables).
+        """
+        self.max_workers = max_workers or config.CODE_EXECUTOR_WORKERS
+        self.timeout = timeout or config.CODE_EXECUTION_TIMEOUT
+        self.memory_limit_mb = config.CODE_EXECUTION_MEMORY_MB if memory_limit_mb is None else memory_limit_mb
+        self.logger = get_stream_logger("CodeExecutor")
+        self._pool = None
+        self._job_ids = itertools.count()
+        self._started = {} # job ID -> (loop, asyncio.Event set when a worker starts the job)
+        self._started_queue = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            if self._started_queue is None:
+                self._started_queue = context.SimpleQueue()
+                threading.Thread(target=self._watch_started, name="CodeExecutorStarted", daemon=True).start()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb, self._started_queue)
+            )
+        return self._pool
+
+    def _watch_started(self):
+        """
+        Relays "job started" reports from the workers to the waiting submit() calls.
+        """
+        while True:
+            waiting = self._started.get(self._started_queue.get())
+            if waiting is not None:
+                loop, event = waiting
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    pass # The submitting loop has closed
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        """
+        Discards a pool, killing workers that are stuck or crashed.
+
+        Args:
+            broken (ProcessPoolExecutor): The pool the failed job ran on. If it was already replaced
+                (another job reported the same failure), the current pool is left alone.
+        """
+        if broken is None or broken is not self._pool:
+            return
+        pool, self._pool = self._pool, None
+        processes = list(getattr(pool, "_processes", {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+
+    async def submit(self, code: str, variables: Dict[str, Any] = None, return_vars: List[str] = None, timeout: float = None, dataset_path: str = None) -> ExecutionResult:
+        """
+        Executes code in a worker process without blocking the event loop.
+
+        Args:
+            code (str): The Python source to execute. `pd`, `np` and `plt` are pre-imported.
+            variables (dict, optional): Extra names injected into the scope (must be picklable; each job
+                pickles them into the worker, so pass a dataset as `dataset_path` rather than as a DataFrame).
+            return_vars (list, optional): Names to read back from the scope after execution.
+            timeout (float, optional): Wall-clock limit in seconds (defaults to the executor's).
+            dataset_path (str, optional): Dataset injected as `df`. It is parsed once (in this process) and
+                written as an Arrow snapshot that the workers memory-map, so jobs skip both parsing and pickling.
+
+        Returns:
+            ExecutionResult: The captured output, error and requested variables.
+        """
+        timeout = timeout or self.timeout
+        job_id = next(self._job_ids)
+        started = asyncio.Event()
+        self._started[job_id] = (asyncio.get_running_loop(), started)
+        pool = started_wait = None
+        snapshot = None
+        if dataset_path:
+            try:
+                snapshot = await asyncio.to_thread(ensure_snapshot, dataset_path)
+            except Exception as e:
+                # E.g. mixed-type columns Arrow cannot store; the worker parses the file itself
+                self.logger.warning(f"No snapshot for {dataset_path} ({type(e).__name__}: {e}); the worker will parse it.")
+        try:
+            pool = self._get_pool()
+            future = asyncio.wrap_future(pool.submit(_run_job, code, variables, return_vars, timeout, dataset_path, job_id, snapshot))
+            # Time spent queued behind other jobs does not count: the backstop starts once a worker picks the job up
+            started_wait = asyncio.ensure_future(started.wait())
+            await asyncio.wait({future, started_wait}, return_when=asyncio.FIRST_COMPLETED)
+            # The worker enforces the limit itself; this is the backstop for code stuck in C extensions.
+            raw = await asyncio.wait_for(future, timeout + 10)
+        except asyncio.TimeoutError:
+            self.logger.error(f"Worker unresponsive after {timeout:.0f}s, restarting pool.")
+            self._restart_pool(pool)
+            return ExecutionResult(success=False, error=f"Execution exceeded the {timeout:.0f}s wall-clock limit.")
+        except BrokenProcessPool:
+            self.logger.error("Worker process died, restarting pool.")
+            self._restart_pool(pool)
+            return ExecutionResult(success=False, error="Worker process crashed (likely exceeded the memory limit).")
+        except Exception as e:
+            return ExecutionResult(success=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            self._started.pop(job_id, None)
+            if started_wait is not None:
+                started_wait.cancel()
+        return ExecutionResult(**raw)
+
+    def shutdown(self):
+        """
+        Stops all worker processes.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+# Global instance
+code_executor = CodeExecutor()
@@ -0,0 +1,307 @@
+import os
+import time
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from config import config
+from tools.data_ops import read_head, metadata_row_count
+
+DATASET_EXTENSIONS = ('.csv', '.xlsx', '.parquet', '.feather', '.arrow')
+
+class DataCatalog:
+    """
+    Persistent index of the storage directory (SQLite, mirrored in memory): size, mtime, content
+    hash, row count, schema and a sample row set per file.
+    The directory is rescanned only when its mtime changes (files added, removed or renamed) or
+    every `rescan_seconds`, and only new or changed files are re-indexed. A single-file lookup
+    checks that file's stat, so it is never stale. Headers, hashes and row counts are read on
+    first request and kept until the file changes.
+    """
+    def __init__(self, directory: str, path: str, rescan_seconds: float = 2.0):
+        """
+        Initialize the DataCatalog. The database is opened on first use.
+
+        Args:
+            directory (str): The storage directory to index.
+            path (str): The path to the SQLite database file.
+            rescan_seconds (float): Longest time a directory listing is served without a rescan
+                (catches files modified in place, which do not change the directory mtime).
+        """
+        self.directory = directory
+        self.path = path
+        self.rescan_seconds = rescan_seconds
+        self._conn = None
+        self._entries = None # name -> entry dict
+        self._dir_mtime = None
+        self._scanned_at = 0.0
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "name TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "content_hash TEXT, row_count INTEGER, metadata TEXT)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            rows = self._connect().execute("SELECT name, size, mtime_ns, content_hash, row_count, metadata FROM files").fetchall()
+            self._entries = {
+                row[0]: {
+                    "name": row[0], "size": row[1], "mtime_ns": row[2], "content_hash": row[3],
+                    "row_count": row[4], "metadata": json.loads(row[5]) if row[5] else None
+                }
+                for row in rows
+            }
+        return self._entries
+
+    def _save(self, entries: List[Dict[str, Any]]):
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO files (name, size, mtime_ns, content_hash, row_count, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (e["name"], e["size"], e["mtime_ns"], e["content_hash"], e["row_count"],
+                 json.dumps(e["metadata"], default=str) if e["metadata"] is not None else None)
+                for e in entries
+            ]
+        )
+        conn.commit()
+
+    def _remove(self, names: List[str]):
+        entries = self._load()
+        for name in names:
+            entries.pop(name, None)
+        conn = self._connect()
+        conn.executemany("DELETE FROM files WHERE name = ?", [(name,) for name in names])
+        conn.commit()
+
+    @staticmethod
+    def _new_entry(name: str, stat: os.stat_result) -> Dict[str, Any]:
+        return {"name": name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "content_hash": None, "row_count": None, "metadata": None}
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Brings the index up to date with the directory, re-indexing only new and changed files.
+
+        Args:
+            force (bool): Rescan even if the directory looks unchanged.
+
+        Returns:
+            Dict[str, int]: Counts of 'added', 'changed' and 'removed' files (all 0 if no rescan was needed).
+        """
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        with self._lock:
+            entries = self._load()
+            try:
+                dir_mtime = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime = None
+            fresh = time.monotonic() - self._scanned_at < self.rescan_seconds
+            if not force and fresh and dir_mtime == self._dir_mtime:
+                return counts
+
+            seen, updated = set(), []
+            if dir_mtime is not None:
+                with os.scandir(self.directory) as scan:
+                    for item in scan:
+                        if not item.is_file():
+                            continue
+                        stat = item.stat()
+                        seen.add(item.name)
+                        entry = entries.get(item.name)
+                        if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                            counts["changed" if entry else "added"] += 1
+                            entries[item.name] = self._new_entry(item.name, stat)
+                            updated.append(entries[item.name])
+            removed = [name for name in entries if name not in seen]
+            counts["removed"] = len(removed)
+            if updated:
+                self._save(updated)
+            if removed:
+                self._remove(removed)
+            self._dir_mtime = dir_mtime
+            self._scanned_at = time.monotonic()
+        return counts
+
+    def _current(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        The entry for one file, checked against a single stat call.
+        """
+        name = os.path.basename(name)
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            with self._lock:
+                if name in self._load():
+                    self._remove([name])
+            return None
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(name)
+            if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                entry = entries[name] = self._new_entry(name, stat)
+                self._save([entry])
+            return entry
+
+    def _update(self, entry: Dict[str, Any], **fields):
+        """
+        Stores lazily computed fields, unless the file changed while they were computed.
+        """
+        with self._lock:
+            current = self._load().get(entry["name"])
+            if current is None or (current["size"], current["mtime_ns"]) != (entry["size"], entry["mtime_ns"]):
+                return
+            current.update(fields)
+            self._save([current])
+
+    def list_files(self, extensions: Tuple[str, ...] = None) -> List[str]:
+        """
+        Lists the files in the storage directory.
+
+        Args:
+            extensions (tuple, optional): Only names ending in one of these (e.g. DATASET_EXTENSIONS).
+
+        Returns:
+            List[str]: Sorted file names.
+        """
+        self.refresh()
+        with self._lock:
+            names = list(self._entries)
+        return sorted(name for name in names if extensions is None or name.endswith(extensions))
+
+    def entries(self, extensions: Tuple[str, ...] = None) -> List[Dict[str, Any]]:
+        """
+        Lists the files with their size and modification time.
+
+        Args:
+            extensions (tuple, optional): Only names ending in one of these.
+
+        Returns:
+            List[Dict[str, Any]]: Per file 'name', 'path', 'size', 'mtime' (seconds) and 'row_count' (None if not known yet).
+        """
+        self.refresh()
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            {
+                "name": e["name"], "path": os.path.join(self.directory, e["name"]), "size": e["size"],
+                "mtime": e["mtime_ns"] / 1e9, "row_count": e["row_count"]
+            }
+            for e in sorted(entries, key=lambda e: e["name"])
+            if extensions is None or e["name"].endswith(extensions)
+        ]
+
+    def fingerprint(self, name: str) -> Optional[Tuple[str, int, int]]:
+        """
+        The cache key of a file version: (absolute path, mtime in ns, size), as used by the dataset cache.
+
+        Args:
+            name (str): The file name.
+
+        Returns:
+            Optional[Tuple[str, int, int]]: The fingerprint, or None if the file does not exist.
+        """
+        entry = self._current(name)
+        if entry is None:
+            return None
+        return (os.path.abspath(os.path.join(self.directory, entry["name"])), entry["mtime_ns"], entry["size"])
+
+    def metadata(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Columns, dtypes, a 5-row sample and (for columnar files, or once profiled) the row count.
+        The file header is read once per file version.
+
+        Args:
+            name (str): The file name.
+
+        Returns:
+            Optional[Dict[str, Any]]: The metadata ({'error': ...} for unsupported formats), or None if the file does not exist.
+
+        Raises:
+            Exception: If the file cannot be read.
+        """
+        entry = self._current(name)
+        if entry is None:
+            return None
+        if entry["metadata"] is None:
+            path = os.path.join(self.directory, entry["name"])
+            df = read_head(path, 5)
+            if df is None:
+                return {"error": "Unsupported file format"}
+            metadata = {
+                "columns": list(df.columns),
+                "dtypes": {k: str(v) for k, v in df.dtypes.items()},
+                # Round-trip through JSON so datetimes from columnar files stay serializable
+                "sample": json.loads(df.to_json(orient='records', date_format='iso'))
+            }
+            row_count = entry["row_count"] if entry["row_count"] is not None else metadata_row_count(path)
+            self._update(entry, metadata=metadata, row_count=row_count)
+            entry = {**entry, "metadata": metadata, "row_count": row_count}
+        result = dict(entry["metadata"])
+        if entry["row_count"] is not None:
+            result["row_count"] = entry["row_count"]
+        return result
+
+    def content_hash(self, name: str) -> Optional[str]:
+        """
+        SHA-256 of the file contents, computed once per file version.
+
+        Args:
+            name (str): The file name.
+
+        Returns:
+            Optional[str]: The hex digest, or None if the file does not exist.
+        """
+        entry = self._current(name)
+        if entry is None:
+            return None
+        if entry["content_hash"] is None:
+            from infrastructure.run_manifest import hash_file
+            digest = hash_file(os.path.join(self.directory, entry["name"]))
+            self._update(entry, content_hash=digest)
+            return digest
+        return entry["content_hash"]
+
+    def profile(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        The streaming profile of a file (see tools/profiler.py), recording its row count in the catalog.
+
+        Args:
+            name (str): The file name.
+
+        Returns:
+            Optional[Dict[str, Any]]: The profile, or None if the file does not exist.
+        """
+        entry = self._current(name)
+        if entry is None:
+            return None
+        from tools.profiler import profile_dataset
+        profile = profile_dataset(os.path.join(self.directory, entry["name"]))
+        if entry["row_count"] is None:
+            self._update(entry, row_count=profile["row_count"])
+        return profile
+
+    def invalidate(self):
+        """
+        Drops the in-memory index, so the next call reloads it and rescans the directory.
+        """
+        with self._lock:
+            self._entries = None
+            self._dir_mtime = None
+            self._scanned_at = 0.0
+
+# Global instance
+data_catalog = DataCatalog(
+    directory=config.DATA_DIR,
+    path=config.DATA_CATALOG_PATH,
+    rescan_seconds=config.DATA_CATALOG_RESCAN_SECONDS
+)
@@ -0,0 +1,215 @@
+import os
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+import pandas as pd
+from config import config
+from tools.data_ops import load_data
+
+def file_fingerprint(path: str) -> Tuple[str, int, int]:
+    """
+    Identifies a file version by absolute path, modification time and size.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        Tuple[str, int, int]: (absolute path, mtime in ns, size in bytes).
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+class DatasetCache:
+    """
+    Process-wide cache of parsed DataFrames keyed by file fingerprint.
+    A file is parsed once and shared by every stage until it changes on disk;
+    entries are evicted least-recently-used once the total in-memory size exceeds the budget.
+    A dataset larger than the whole budget is still kept, alone: the one being worked on
+    must never be re-parsed by every stage.
+    """
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the DatasetCache.
+
+        Args:
+            max_bytes (int): Total in-memory size budget for cached DataFrames.
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # fingerprint -> (DataFrame, nbytes)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, path: str) -> pd.DataFrame:
+        """
+        Returns the parsed DataFrame for a file, loading it on a miss.
+        The returned object is shared: callers that mutate it must copy it first.
+
+        Args:
+            path (str): The path to the dataset file.
+
+        Returns:
+            pd.DataFrame: The parsed dataset.
+        """
+        key = file_fingerprint(path)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread parses a given file version; the others wait for it.
+        with load_lock:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is not None:
+                    return cached
+                self.misses += 1
+            df = load_data(path)
+            self._insert(key, df)
+        with self._lock:
+            self._load_locks.pop(key, None)
+        return df
+
+    def peek(self, path: str) -> Optional[pd.DataFrame]:
+        """
+        Returns the cached DataFrame for a file without loading it.
+
+        Args:
+            path (str): The path to the dataset file.
+
+        Returns:
+            Optional[pd.DataFrame]: The cached dataset, or None if it is not cached.
+        """
+        try:
+            key = file_fingerprint(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def invalidate(self, path: str = None):
+        """
+        Drops cached versions of a file, or everything if no path is given.
+
+        Args:
+            path (str, optional): The path to the dataset file.
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.current_bytes = 0
+                return
+            abs_path = os.path.abspath(path)
+            for key in [k for k in self._entries if k[0] == abs_path]:
+                _, nbytes = self._entries.pop(key)
+                self.current_bytes -= nbytes
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the cache's size and hit counters.
+
+        Returns:
+            dict: Entry count, memory in MB, hits and misses.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "mb": round(self.current_bytes / 1024 / 1024, 1),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _lookup(self, key) -> Optional[pd.DataFrame]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _insert(self, key, df: pd.DataFrame):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            # Older versions of the same file can never be hit again
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                self.current_bytes -= self._entries.pop(stale)[1]
+            self._entries[key] = (df, nbytes)
+            self.current_bytes += nbytes
+            # The newest entry always stays, even if it alone exceeds the budget
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+_snapshot_lock = threading.Lock()
+
+def ensure_snapshot(path: str) -> str:
+    """
+    Writes a dataset, parsed through the dataset cache, as an uncompressed Arrow IPC file,
+    once per file version. Code-execution workers memory-map it (see load_snapshot) instead of
+    parsing the file themselves or receiving a pickled DataFrame, so one parsed copy is shared
+    through the page cache. Older snapshots of the same file are removed, and the oldest
+    snapshots overall once DATASET_SNAPSHOT_MAX_MB is exceeded.
+
+    Args:
+        path (str): The path to the dataset file.
+
+    Returns:
+        str: The snapshot path.
+
+    Raises:
+        Exception: If the file cannot be parsed or its columns cannot be stored as Arrow.
+    """
+    import pyarrow as pa
+    abs_path, mtime_ns, size = file_fingerprint(path)
+    prefix = hashlib.sha256(abs_path.encode("utf-8")).hexdigest()[:24]
+    version = hashlib.sha256(f"{mtime_ns}:{size}".encode("utf-8")).hexdigest()[:16]
+    target = os.path.join(config.DATASET_SNAPSHOT_DIR, f"{prefix}_{version}.arrow")
+    with _snapshot_lock:
+        if os.path.exists(target):
+            return target
+        os.makedirs(config.DATASET_SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(dataset_cache.get(path))
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, target)
+
+        # Workers that still map a removed snapshot keep reading it until they are done
+        for stale in glob.glob(os.path.join(config.DATASET_SNAPSHOT_DIR, f"{prefix}_*.arrow")):
+            if stale != target:
+                os.remove(stale)
+        snapshots = sorted(glob.glob(os.path.join(config.DATASET_SNAPSHOT_DIR, "*.arrow")), key=os.path.getmtime)
+        total = sum(os.path.getsize(p) for p in snapshots)
+        for old in snapshots[:-1]:
+            if total <= config.DATASET_SNAPSHOT_MAX_MB * 1024 * 1024:
+                break
+            if old != target:
+                total -= os.path.getsize(old)
+                os.remove(old)
+    return target
+
+def load_snapshot(snapshot: str) -> pd.DataFrame:
+    """
+    Builds a private DataFrame from a snapshot written by ensure_snapshot.
+    The Arrow file is memory-mapped, so nothing is parsed and the only new memory is the frame itself.
+
+    Args:
+        snapshot (str): The snapshot path.
+
+    Returns:
+        pd.DataFrame: The dataset, free to mutate.
+    """
+    import pyarrow as pa
+    with pa.memory_map(snapshot, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+
+# Global instance (the orchestrator process; workers read snapshots instead)
+dataset_cache = DatasetCache(max_bytes=config.DATASET_CACHE_MAX_MB * 1024 * 1024)
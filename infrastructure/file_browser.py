@@ -1,5 +1,3 @@
-import tkinter as tk
-from tkinter import filedialog
 import os
 
 def browse_for_file(file_types=None):
@@ -13,6 +11,10 @@ def browse_for_file(file_types=None):
     Returns:
         str: The absolute path to the selected file, or None if cancelled.
     """
+    # Deferred: tkinter is only needed when the dialog is actually opened
+    import tkinter as tk
+    from tkinter import filedialog
+
     if file_types is None:
         file_types = [("CSV files", "*.csv"), ("All files", "*.*")]
         
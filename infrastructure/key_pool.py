@@ -0,0 +1,217 @@
+import re
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional, Set
+from config import config
+from infrastructure.stream_handler import get_stream_logger
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Checks whether an exception is a 429 / quota-exhausted error from the Gemini API.
+
+    Args:
+        error (Exception): The exception raised by the model call.
+
+    Returns:
+        bool: True if the key hit a rate limit or quota.
+    """
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    text = str(error)
+    return bool(re.search(r"\b429\b", text)) or "RESOURCE_EXHAUSTED" in text
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extracts the server-suggested retry delay (google.rpc.RetryInfo) from an error, if present.
+
+    Args:
+        error (Exception): The exception raised by the model call.
+
+    Returns:
+        Optional[float]: The delay in seconds, or None if the server gave none.
+    """
+    match = re.search(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    return float(match.group(1)) if match else None
+
+class _KeyState:
+    """
+    Token bucket, concurrency and health bookkeeping for one API key.
+    """
+    def __init__(self, key: Optional[str], rpm: float):
+        self.key = key
+        self.capacity = max(1.0, rpm)
+        self.tokens = self.capacity
+        self.refill_rate = rpm / 60.0
+        self.last_refill = time.monotonic()
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_limits = 0
+        self.requests = 0
+        self.rate_limited = 0
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+
+class KeyPool:
+    """
+    Hands each concurrent model request its own API key.
+    Each key has a token-bucket RPM limit and a concurrency cap; keys that hit
+    429/quota errors cool down (exponentially longer on repeats) while the rest keep serving.
+    """
+    def __init__(self, keys: List[str], rpm: float, max_concurrency: int, cooldown_seconds: float):
+        """
+        Initialize the KeyPool.
+
+        Args:
+            keys (List[str]): The API keys. An empty list means one ambient-credentials slot (key None).
+            rpm (float): Requests per minute allowed per key.
+            max_concurrency (int): In-flight requests allowed per key.
+            cooldown_seconds (float): Base cooldown after a rate-limit error.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.cooldown_seconds = cooldown_seconds
+        self._states = [_KeyState(key, rpm) for key in (keys or [None])]
+        self._lock = threading.Lock()
+        self.logger = get_stream_logger("KeyPool")
+
+    @property
+    def size(self) -> int:
+        return len(self._states)
+
+    def set_rpm(self, rpm: float):
+        """
+        Changes the per-key request budget, e.g. to lift it for offline benchmarks.
+
+        Args:
+            rpm (float): Requests per minute allowed per key.
+        """
+        with self._lock:
+            for state in self._states:
+                state.capacity = max(1.0, rpm)
+                state.tokens = state.capacity
+                state.refill_rate = rpm / 60.0
+
+    def _try_acquire(self, exclude: Set[Optional[str]]):
+        """
+        Picks the healthiest available key, or returns how long to wait for one.
+
+        Returns:
+            tuple: (_KeyState or None, seconds to wait before retrying).
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [s for s in self._states if s.key not in exclude] or self._states
+            wait = 1.0
+            best = None
+            for state in candidates:
+                state.refill(now)
+                if state.cooldown_until > now:
+                    wait = min(wait, state.cooldown_until - now)
+                    continue
+                if state.in_flight >= self.max_concurrency:
+                    wait = min(wait, 0.05)
+                    continue
+                if state.tokens < 1:
+                    wait = min(wait, (1 - state.tokens) / state.refill_rate if state.refill_rate else 1.0)
+                    continue
+                if best is None or (state.in_flight, -state.tokens) < (best.in_flight, -best.tokens):
+                    best = state
+            if best is None:
+                return None, max(wait, 0.01)
+            best.tokens -= 1
+            best.in_flight += 1
+            best.requests += 1
+            return best, 0.0
+
+    def _release(self, state: _KeyState):
+        with self._lock:
+            state.in_flight -= 1
+
+    def report_rate_limited(self, key: Optional[str], retry_after: float = None):
+        """
+        Puts a key into cooldown after a 429 / quota error.
+
+        Args:
+            key (Optional[str]): The key that was rate limited.
+            retry_after (float, optional): Server-suggested delay in seconds.
+        """
+        with self._lock:
+            for state in self._states:
+                if state.key == key:
+                    state.consecutive_limits += 1
+                    state.rate_limited += 1
+                    backoff = self.cooldown_seconds * (2 ** (state.consecutive_limits - 1))
+                    state.cooldown_until = time.monotonic() + max(backoff, retry_after or 0)
+                    state.tokens = 0
+                    self.logger.warning(f"Key ...{(key or 'default')[-4:]} rate limited; cooling down {max(backoff, retry_after or 0):.0f}s")
+
+    def report_success(self, key: Optional[str]):
+        """
+        Clears the rate-limit streak of a key after a successful call.
+
+        Args:
+            key (Optional[str]): The key that succeeded.
+        """
+        with self._lock:
+            for state in self._states:
+                if state.key == key:
+                    state.consecutive_limits = 0
+
+    @asynccontextmanager
+    async def lease(self, exclude: Set[Optional[str]] = None):
+        """
+        Async context manager that holds one key for the duration of a request.
+        Waits (without blocking the event loop) until a key has capacity.
+        Rate-limit errors raised inside the block put the key into cooldown.
+
+        Args:
+            exclude (Set[Optional[str]], optional): Keys to avoid if any other key exists.
+
+        Yields:
+            Optional[str]: The API key to use (None means ambient credentials).
+        """
+        exclude = exclude or set()
+        while True:
+            state, wait = self._try_acquire(exclude)
+            if state is not None:
+                break
+            await asyncio.sleep(wait)
+        try:
+            yield state.key
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.report_rate_limited(state.key, retry_after_seconds(e))
+            raise
+        else:
+            self.report_success(state.key)
+        finally:
+            self._release(state)
+
+    def status(self) -> List[dict]:
+        """
+        Returns a snapshot of every key's health.
+
+        Returns:
+            List[dict]: One entry per key (key suffix, in-flight, tokens, cooldown, counters).
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "key": f"...{state.key[-4:]}" if state.key else "default",
+                "in_flight": state.in_flight,
+                "tokens": round(state.tokens, 2),
+                "cooldown_s": round(max(0.0, state.cooldown_until - now), 1),
+                "requests": state.requests,
+                "rate_limited": state.rate_limited
+            } for state in self._states]
+
+# Global instance
+key_pool = KeyPool(
+    keys=config.API_KEYS,
+    rpm=config.KEY_RPM,
+    max_concurrency=config.KEY_MAX_CONCURRENCY,
+    cooldown_seconds=config.KEY_COOLDOWN_SECONDS
+)
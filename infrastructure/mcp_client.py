@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import signal
+import asyncio
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from config import config
+from infrastructure.stream_handler import get_stream_logger
+
+class _Connection:
+    """
+    One MCP server worker process and its client session (stdio transport).
+    The session multiplexes requests by JSON-RPC id, so many calls can be in flight on it at once.
+    """
+    def __init__(self, max_in_flight: int):
+        self.session = None
+        self.pid = None
+        self.in_flight = 0
+        self.error = None
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def _run(self):
+        # The transport and session are entered and exited in this one task, as anyio requires
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        params = StdioServerParameters(
+            command=sys.executable,
+            args=["-m", "infrastructure.mcp_server"],
+            env=dict(os.environ),
+            cwd=config.BASE_DIR
+        )
+        try:
+            async with stdio_client(params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.pid = _decode(await session.call_tool("worker_pid", {}))
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def start(self, timeout: float):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if self.session is None:
+            raise RuntimeError(f"MCP server process failed to start: {self.error}")
+
+    async def close(self):
+        self._stop.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def abandon(self, loop: asyncio.AbstractEventLoop):
+        """
+        Stops a connection from outside the event loop it was started on.
+        A loop that is still running closes it cleanly; otherwise the worker process is terminated.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The loop the connection was started on.
+        """
+        if loop.is_running():
+            try:
+                loop.call_soon_threadsafe(self._stop.set)
+                return
+            except RuntimeError:
+                pass # Closed in the meantime
+        if isinstance(self.pid, int):
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except OSError:
+                pass # Already exited
+
+def _decode(result) -> Any:
+    """
+    Converts a CallToolResult into the value the tool function returned.
+    """
+    text = "\n".join(getattr(item, "text", "") for item in result.content)
+    if result.isError:
+        return {"error": text or "MCP tool call failed"}
+    structured = result.structuredContent
+    if structured is not None:
+        # FastMCP wraps non-object return values as {"result": value}
+        if isinstance(structured, dict) and list(structured) == ["result"]:
+            return structured["result"]
+        return structured
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def _call_local(tool: str, arguments: Dict[str, Any]) -> Any:
+    from infrastructure import mcp_server
+    return getattr(mcp_server, tool)(**arguments)
+
+class MCPClientPool:
+    """
+    Client for the MCP file server (infrastructure/mcp_server.py) running in worker processes.
+    File parsing then happens outside the orchestrator process and across cores: requests go
+    to the least-busy process, and each process takes up to `max_in_flight` pipelined requests.
+    Processes are started on first use. With 0 processes, or if they cannot be started,
+    the tools are called in-process on a thread instead.
+    """
+    def __init__(self, processes: int = None, max_in_flight: int = None, timeout: float = None):
+        """
+        Initialize the MCPClientPool.
+
+        Args:
+            processes (int, optional): Server worker processes (0 = call the tools in-process).
+            max_in_flight (int, optional): Concurrent requests per process.
+            timeout (float, optional): Seconds to wait for one request (and for a process to start).
+        """
+        self.processes = config.MCP_SERVER_PROCESSES if processes is None else processes
+        self.max_in_flight = max_in_flight or config.MCP_MAX_IN_FLIGHT
+        self.timeout = timeout or config.MCP_REQUEST_TIMEOUT
+        self.logger = get_stream_logger("MCPClient")
+        self._connections: List[_Connection] = []
+        self._loop = None
+        self._lock = None
+        self._local = self.processes <= 0
+
+    async def _ensure_started(self) -> bool:
+        """
+        Starts the worker processes if needed.
+
+        Returns:
+            bool: True if requests go to worker processes, False for in-process calls.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions belong to the loop that created them (e.g. a new asyncio.run()); stop the old workers
+            for connection in self._connections:
+                connection.abandon(self._loop)
+            self._loop, self._lock, self._connections = loop, asyncio.Lock(), []
+        if self._local:
+            return False
+        if self._connections:
+            return True
+        async with self._lock:
+            if not self._connections and not self._local:
+                connections = [_Connection(self.max_in_flight) for _ in range(self.processes)]
+                results = await asyncio.gather(*[c.start(self.timeout) for c in connections], return_exceptions=True)
+                failed = [r for r in results if isinstance(r, BaseException)]
+                if failed:
+                    self.logger.warning(f"MCP server processes unavailable ({failed[0]}); calling file tools in-process.")
+                    await asyncio.gather(*[c.close() for c in connections])
+                    self._local = True
+                    return False
+                self._connections = connections
+        return not self._local
+
+    async def _restart(self, connection: _Connection):
+        """
+        Replaces a worker process whose session broke.
+        """
+        async with self._lock:
+            if connection not in self._connections:
+                return
+            self._connections.remove(connection)
+            await connection.close()
+            replacement = _Connection(self.max_in_flight)
+            try:
+                await replacement.start(self.timeout)
+                self._connections.append(replacement)
+            except Exception as e:
+                self.logger.error(f"Could not restart MCP server process: {e}")
+                if not self._connections:
+                    self._local = True
+
+    async def call(self, tool: str, **arguments) -> Any:
+        """
+        Calls an MCP tool and returns its result.
+
+        Args:
+            tool (str): The tool name, e.g. 'get_file_metadata'.
+            **arguments: The tool arguments.
+
+        Returns:
+            Any: What the tool returned ({'error': ...} if the call itself failed).
+        """
+        if not await self._ensure_started():
+            return await asyncio.to_thread(_call_local, tool, arguments)
+
+        from mcp.shared.exceptions import McpError
+        for attempt in range(2):
+            if not self._connections:
+                return await asyncio.to_thread(_call_local, tool, arguments)
+            connection = min(self._connections, key=lambda c: c.in_flight)
+            connection.in_flight += 1
+            try:
+                async with connection.slots:
+                    if connection.session is None:
+                        raise ConnectionError("MCP session closed")
+                    result = await connection.session.call_tool(tool, arguments, read_timeout_seconds=timedelta(seconds=self.timeout))
+                return _decode(result)
+            except Exception as e:
+                if isinstance(e, McpError) and connection.session is not None:
+                    # The server answered with an error (e.g. a timeout); the process is fine
+                    return {"error": str(e)}
+                reason = str(e) or type(e).__name__
+                if attempt:
+                    return {"error": f"MCP call failed: {reason}"}
+                self.logger.warning(f"MCP server process failed ({reason}); restarting it.")
+                await self._restart(connection)
+            finally:
+                connection.in_flight -= 1
+
+    async def list_files(self) -> List[str]:
+        """
+        List all available data files in the storage directory.
+        """
+        result = await self.call("list_files")
+        return result if isinstance(result, list) else []
+
+    async def get_file_metadata(self, filename: str) -> dict:
+        """
+        Get metadata for a specific file (columns, types, sample, and the row count when known).
+        """
+        return await self.call("get_file_metadata", filename=filename)
+
+    async def read_rows(self, filename: str, **kwargs) -> dict:
+        """
+        Read a slice of a dataset (see mcp_server.read_rows for the arguments).
+        """
+        return await self.call("read_rows", filename=filename, **kwargs)
+
+    async def count_rows(self, filename: str, filters: Optional[list] = None) -> dict:
+        """
+        Count the rows of a dataset that match `filters`.
+        """
+        return await self.call("count_rows", filename=filename, filters=filters)
+
+    async def close(self):
+        """
+        Stops the worker processes.
+        """
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*[c.close() for c in connections])
+
+# Global instance
+mcp_client = MCPClientPool()
@@ -1,15 +1,40 @@
 import os
-import pandas as pd
+import json
+import base64
+import functools
+from typing import Any, Optional
+import anyio
 from mcp.server.fastmcp import FastMCP
+from infrastructure.dataset_cache import dataset_cache
+from infrastructure.data_catalog import data_catalog
+from config import config
 
 # Initialize FastMCP server
-mcp = FastMCP("DataGuild-Server")
+mcp = FastMCP("DataGuild-Server", log_level="WARNING") # Per-request INFO lines would flood the worker stderr
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_storage")
+DATA_DIR = config.DATA_DIR
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
-@mcp.tool()
+def tool(fn):
+    """
+    Registers `fn` as an MCP tool that runs on a worker thread, so a server process keeps
+    reading requests while a file is parsed and pipelined requests overlap.
+    The plain function is returned, for callers that import it directly.
+
+    Args:
+        fn (Callable): The tool function.
+
+    Returns:
+        Callable: `fn` itself.
+    """
+    @functools.wraps(fn)
+    async def threaded(**kwargs):
+        return await anyio.to_thread.run_sync(functools.partial(fn, **kwargs))
+    mcp.add_tool(threaded)
+    return fn
+
+@tool
 def list_files() -> list[str]:
     """
     List all available data files in the storage directory.
@@ -17,14 +42,27 @@ def list_files() -> list[str]:
     Returns:
         list[str]: A list of filenames.
     """
-    if not os.path.exists(DATA_DIR):
-        return []
-    return os.listdir(DATA_DIR)
+    # Served from the directory index; only a changed directory is rescanned
+    return data_catalog.list_files()
+
+def _resolve(filename: str) -> str:
+    """
+    Maps a filename (or a path such as 'data_storage/x.csv') to its location inside DATA_DIR.
+    Only the base name is used, so no tool can reach outside the storage directory.
+
+    Args:
+        filename (str): The file name or path.
 
-@mcp.tool()
+    Returns:
+        str: The path inside DATA_DIR.
+    """
+    return os.path.join(DATA_DIR, os.path.basename(filename))
+
+@tool
 def get_file_metadata(filename: str) -> dict:
     """
-    Get metadata for a specific file (columns, types, sample).
+    Get metadata for a specific file (columns, types, sample, and the row count when known).
+    Supports CSV, Excel, Parquet and Feather files.
 
     Args:
         filename (str): The name of the file.
@@ -32,30 +70,20 @@ def get_file_metadata(filename: str) -> dict:
     Returns:
         dict: Metadata including columns, data types, and a sample.
     """
-    file_path = os.path.join(DATA_DIR, filename)
-    if not os.path.exists(file_path):
-        return {"error": "File not found"}
-    
     try:
-        if filename.endswith('.csv'):
-            df = pd.read_csv(file_path, nrows=5)
-        elif filename.endswith('.xlsx'):
-            df = pd.read_excel(file_path, nrows=5)
-        else:
-            return {"error": "Unsupported file format"}
-            
-        return {
-            "columns": list(df.columns),
-            "dtypes": {k: str(v) for k, v in df.dtypes.items()},
-            "sample": df.to_dict(orient='records')
-        }
+        # Read once per file version and served from the directory index afterwards
+        metadata = data_catalog.metadata(_resolve(filename))
     except Exception as e:
         return {"error": str(e)}
+    if metadata is None:
+        return {"error": "File not found"}
+    return metadata
 
-@mcp.tool()
+@tool
 def read_full_dataset(filename: str) -> str:
     """
-    Read the full dataset. CAUTION: Use with care for large files.
+    Read the full dataset. CAUTION: Use with care for large files; `read_rows` returns
+    only the rows and columns needed.
 
     Args:
         filename (str): The name of the file.
@@ -63,23 +91,235 @@ def read_full_dataset(filename: str) -> str:
     Returns:
         str: The full dataset as a JSON string, or an error message.
     """
-    file_path = os.path.join(DATA_DIR, filename)
+    file_path = _resolve(filename)
     if not os.path.exists(file_path):
         return "File not found"
     
     try:
-        if filename.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif filename.endswith('.xlsx'):
-            df = pd.read_excel(file_path)
-        else:
-            return "Unsupported file format"
-        
+        df = dataset_cache.get(file_path)
         return df.to_json(orient='records')
+    except ValueError:
+        return "Unsupported file format"
     except Exception as e:
         return str(e)
 
+_FILTER_OPS = ("==", "!=", "<", "<=", ">", ">=", "in", "not in", "is null", "not null")
+
+def _filter_expression(filters: Optional[list]):
+    """
+    Builds a pyarrow filter expression from [column, op, value] triples (all must hold).
+
+    Args:
+        filters (list, optional): E.g. [["region", "==", "North"], ["sales", ">", 100]].
+
+    Returns:
+        pyarrow.dataset.Expression: The combined predicate, or None without filters.
+
+    Raises:
+        ValueError: If a filter is malformed or uses an unknown operator.
+    """
+    import pyarrow.dataset as ds
+    expression = None
+    for item in filters or []:
+        if not isinstance(item, (list, tuple)) or len(item) not in (2, 3):
+            raise ValueError(f"Filter must be [column, op, value]: {item}")
+        column, op = item[0], str(item[1]).lower()
+        value = item[2] if len(item) == 3 else None
+        field = ds.field(column)
+        if op == "==": term = field == value
+        elif op == "!=": term = field != value
+        elif op == "<": term = field < value
+        elif op == "<=": term = field <= value
+        elif op == ">": term = field > value
+        elif op == ">=": term = field >= value
+        elif op == "in": term = field.isin(list(value))
+        elif op == "not in": term = ~field.isin(list(value))
+        elif op == "is null": term = field.is_null()
+        elif op == "not null": term = field.is_valid()
+        else:
+            raise ValueError(f"Unknown filter operator '{item[1]}'. Use one of: {', '.join(_FILTER_OPS)}")
+        expression = term if expression is None else expression & term
+    return expression
+
+def _open_dataset(file_path: str):
+    """
+    Opens a file as a pyarrow dataset, so projection and filters are applied while reading
+    (Parquet row groups whose statistics rule out the filter are skipped entirely).
+
+    Returns:
+        pyarrow.dataset.Dataset: The dataset.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    if file_path.endswith('.parquet'):
+        return ds.dataset(file_path, format="parquet")
+    if file_path.endswith(('.feather', '.arrow')):
+        return ds.dataset(file_path, format="ipc")
+    if file_path.endswith('.xlsx'):
+        # Excel cannot be scanned; workbooks are small enough to filter in memory
+        return ds.dataset(pa.Table.from_pandas(dataset_cache.get(file_path), preserve_index=False))
+    if file_path.endswith('.csv'):
+        return ds.dataset(file_path, format="csv")
+    raise ValueError("Unsupported file format")
+
+def _scan(file_path: str, columns: Optional[list], filters: Optional[list], offset: int, limit: int):
+    """
+    Reads rows [offset, offset + limit) of the filtered, projected dataset, streaming batch by batch.
+
+    Returns:
+        Tuple[pyarrow.Table, bool]: The rows, and whether more rows follow.
+    """
+    import pyarrow as pa
+    dataset = _open_dataset(file_path)
+    expression = _filter_expression(filters)
+    schema = dataset.schema
+    if columns:
+        missing = [c for c in columns if c not in schema.names]
+        if missing:
+            raise ValueError(f"Unknown columns: {missing}")
+        schema = pa.schema([schema.field(c) for c in columns])
+
+    sources = [dataset]
+    if expression is None and file_path.endswith('.parquet'):
+        # Without a filter, whole row groups before the offset are skipped using their row counts
+        sources = []
+        for fragment in dataset.get_fragments():
+            for row_group in fragment.split_by_row_group():
+                rows = row_group.row_groups[0].num_rows
+                if offset >= rows:
+                    offset -= rows
+                    continue
+                sources.append(row_group)
+
+    def batches_from(sources):
+        for source in sources:
+            yield from source.to_batches(columns=columns, filter=expression)
+
+    batches, collected, more = [], 0, False
+    for batch in batches_from(sources):
+        if offset >= batch.num_rows:
+            offset -= batch.num_rows
+            continue
+        batch = batch.slice(offset)
+        offset = 0
+        if collected >= limit:
+            # Page is full; only check whether any row follows
+            if batch.num_rows:
+                more = True
+                break
+            continue
+        take = min(batch.num_rows, limit - collected)
+        batches.append(batch.slice(0, take))
+        collected += take
+        if take < batch.num_rows:
+            more = True
+            break
+    table = pa.Table.from_batches(batches) if batches else schema.empty_table()
+    return table, more
+
+def _encode_cursor(file_path: str, offset: int) -> str:
+    stamp = data_catalog.fingerprint(file_path)
+    payload = json.dumps({"offset": offset, "mtime": stamp[1], "size": stamp[2]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_cursor(file_path: str, cursor: str) -> int:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    stamp = data_catalog.fingerprint(file_path)
+    if (payload.get("mtime"), payload.get("size")) != (stamp[1], stamp[2]):
+        raise ValueError("Cursor is stale: the file changed since it was issued")
+    return int(payload["offset"])
+
+@tool
+def read_rows(filename: str, offset: int = 0, limit: int = None, columns: Optional[list[str]] = None,
+              filters: Optional[list[list[Any]]] = None, format: str = "records", cursor: Optional[str] = None) -> dict:
+    """
+    Read a slice of a dataset: a row range of the rows matching `filters`, restricted to `columns`.
+    Only the requested slice is read and returned, so large files can be paged through.
+    Supports CSV, Excel, Parquet and Feather files.
+
+    Args:
+        filename (str): The name of the file.
+        offset (int): First matching row to return (ignored when `cursor` is given).
+        limit (int, optional): Rows to return (default MCP_READ_DEFAULT_ROWS, at most MCP_READ_MAX_ROWS).
+        columns (list[str], optional): Columns to return (default all).
+        filters (list, optional): [column, op, value] conditions that must all hold; op is one of
+            ==, !=, <, <=, >, >=, in, not in, is null, not null (the last two take no value).
+        format (str): 'records' (list of row objects), 'csv' (CSV text with header) or
+            'arrow' (base64 Arrow IPC stream, the most compact).
+        cursor (str, optional): `next_cursor` from a previous call, to continue where it stopped.
+
+    Returns:
+        dict: 'columns', 'offset', 'rows', 'format', 'data' and 'next_cursor' (None after the last page),
+        or 'error'.
+    """
+    file_path = _resolve(filename)
+    if not os.path.exists(file_path):
+        return {"error": "File not found"}
+    if format not in ("records", "csv", "arrow"):
+        return {"error": f"Unsupported format: {format}. Use 'records', 'csv' or 'arrow'."}
+    limit = max(1, min(limit or config.MCP_READ_DEFAULT_ROWS, config.MCP_READ_MAX_ROWS))
+
+    try:
+        if cursor:
+            offset = _decode_cursor(file_path, cursor)
+        offset = max(0, int(offset))
+        table, more = _scan(file_path, columns, filters, offset, limit)
+        if format == "arrow":
+            import pyarrow as pa
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            data = base64.b64encode(sink.getvalue().to_pybytes()).decode()
+        else:
+            df = table.to_pandas()
+            if format == "csv":
+                data = df.to_csv(index=False)
+            else:
+                data = json.loads(df.to_json(orient='records', date_format='iso'))
+        return {
+            "columns": table.schema.names,
+            "offset": offset,
+            "rows": table.num_rows,
+            "format": format,
+            "data": data,
+            "next_cursor": _encode_cursor(file_path, offset + table.num_rows) if more else None
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+@tool
+def count_rows(filename: str, filters: Optional[list[list[Any]]] = None) -> dict:
+    """
+    Count the rows of a dataset that match `filters` (see read_rows), without returning them.
+
+    Args:
+        filename (str): The name of the file.
+        filters (list, optional): [column, op, value] conditions that must all hold.
+
+    Returns:
+        dict: {'rows': count}, or 'error'.
+    """
+    file_path = _resolve(filename)
+    if not os.path.exists(file_path):
+        return {"error": "File not found"}
+    try:
+        return {"rows": _open_dataset(file_path).count_rows(filter=_filter_expression(filters))}
+    except Exception as e:
+        return {"error": str(e)}
+
+@tool
+def worker_pid() -> int:
+    """
+    The process ID of this server, so mcp_client can stop a worker it can no longer close cleanly.
+
+    Returns:
+        int: The process ID.
+    """
+    return os.getpid()
+
 if __name__ == "__main__":
-    # In a real scenario, this would run as a separate process
-    # For this demo, we might just import the functions directly or run it in background
+    # Worker process for infrastructure/mcp_client.py (stdio transport)
     mcp.run()
@@ -1,10 +1,72 @@
 from opentelemetry import trace, metrics
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace import TracerProvider, SpanProcessor
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter, BatchSpanProcessor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+from contextvars import ContextVar
+from collections import defaultdict
+import threading
 import os
+from config import config
+
+# Session that the current task is working for; inherited by asyncio tasks and to_thread calls
+current_session_id: ContextVar[str] = ContextVar("current_session_id", default="default")
+
+class RotatingFileSink:
+    """
+    Thread-safe text sink shared by the span and metric exporters.
+    The background export threads write through it, so the target file can be
+    swapped per session without racing a write in progress.
+    """
+    def __init__(self, path: str = os.devnull):
+        """
+        Initialize the RotatingFileSink.
+
+        Args:
+            path (str): The initial file to append to.
+        """
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, text: str):
+        with self._lock:
+            self._file.write(text)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def rotate(self, path: str):
+        """
+        Switches output to a new file and closes the previous one.
+
+        Args:
+            path (str): The file to append to from now on.
+        """
+        new_file = open(path, "a", encoding="utf-8")
+        with self._lock:
+            old_file, self._file = self._file, new_file
+        try:
+            old_file.close()
+        except Exception:
+            pass # Ignore errors if already closed
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def _jsonl(record) -> str:
+    return record.to_json(indent=None) + os.linesep
+
+class SessionTagProcessor(SpanProcessor):
+    """
+    Stamps every span with the `session.id` it was started for (see current_session_id).
+    A telemetry file can hold several sessions (the server and batch runs share one file),
+    so this attribute is what tells their spans apart.
+    """
+    def on_start(self, span, parent_context=None):
+        span.set_attribute("session.id", current_session_id.get())
 
 class TraceLogger:
     """
@@ -23,18 +85,26 @@ class TraceLogger:
         
         # Tracing
         self.trace_provider = TracerProvider(resource=resource)
+        self.trace_provider.add_span_processor(SessionTagProcessor())
         
-        # Redirect traces to a file to keep CLI clean
-        self.log_file = open(os.devnull, "w") 
-        self.console_exporter = ConsoleSpanExporter(out=self.log_file)
-        span_processor = SimpleSpanProcessor(self.console_exporter)
-        self.trace_provider.add_span_processor(span_processor)
+        # Spans are queued and written as JSON lines by a background thread,
+        # so ending a span never blocks on serialization or file I/O.
+        self.sink = RotatingFileSink()
+        self.console_exporter = ConsoleSpanExporter(out=self.sink, formatter=_jsonl)
+        self.span_processor = BatchSpanProcessor(
+            self.console_exporter,
+            max_queue_size=config.TELEMETRY_MAX_QUEUE_SIZE,
+            max_export_batch_size=config.TELEMETRY_BATCH_SIZE,
+            schedule_delay_millis=config.TELEMETRY_FLUSH_INTERVAL_MS
+        )
+        self.trace_provider.add_span_processor(self.span_processor)
         trace.set_tracer_provider(self.trace_provider)
         self.tracer = trace.get_tracer(service_name)
 
         # Metrics
-        # Redirect metrics to the same file
-        self.metric_exporter = ConsoleMetricExporter(out=self.log_file)
+        # Redirect metrics to the same sink. Metrics are process-wide aggregates by agent and model;
+        # per-session totals come from usage_summary() (a session attribute would grow them without bound)
+        self.metric_exporter = ConsoleMetricExporter(out=self.sink, formatter=_jsonl)
         metric_reader = PeriodicExportingMetricReader(self.metric_exporter)
         self.meter_provider = MeterProvider(resource=resource, metric_readers=[metric_reader])
         metrics.set_meter_provider(self.meter_provider)
@@ -51,44 +121,94 @@ class TraceLogger:
             unit="ms"
         )
 
+        # Per-session, per-agent aggregates for the `usage` summary
+        self._usage = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+        self._usage_lock = threading.Lock()
+
     def get_tracer(self):
         """
         Returns the configured tracer.
         """
         return self.tracer
 
+    def record_generation(self, agent: str, model: str, prompt_tokens: int, response_tokens: int,
+                          latency_ms: float, retries: int = 0, cache_hit: bool = False):
+        """
+        Records one model generation to the OpenTelemetry meters and the session aggregates.
+
+        Args:
+            agent (str): The name of the agent.
+            model (str): The model name.
+            prompt_tokens (int): Prompt tokens reported by the model.
+            response_tokens (int): Response (candidate) tokens reported by the model.
+            latency_ms (float): Wall-clock latency of the call in milliseconds.
+            retries (int): Number of retries before the call succeeded.
+            cache_hit (bool): True if the response came from the response cache.
+        """
+        attributes = {"agent": agent, "model": model, "cache_hit": cache_hit}
+        self.token_counter.add(prompt_tokens, {**attributes, "token_type": "prompt"})
+        self.token_counter.add(response_tokens, {**attributes, "token_type": "response"})
+        self.latency_histogram.record(latency_ms, attributes)
+
+        input_price, output_price = config.MODEL_PRICING.get(model, (0.0, 0.0))
+        with self._usage_lock:
+            stats = self._usage[current_session_id.get()][agent]
+            stats["calls"] += 1
+            stats["cache_hits"] += int(cache_hit)
+            stats["retries"] += retries
+            stats["prompt_tokens"] += prompt_tokens
+            stats["response_tokens"] += response_tokens
+            stats["latency_ms"] += latency_ms
+            stats["cost_usd"] += (prompt_tokens * input_price + response_tokens * output_price) / 1_000_000
+
+    def usage_summary(self, session_id: str = None) -> dict:
+        """
+        Returns per-agent token, latency and cost totals for a session.
+
+        Args:
+            session_id (str, optional): The session ID (defaults to the current session).
+
+        Returns:
+            dict: Mapping of agent name to its aggregated statistics.
+        """
+        session_id = session_id or current_session_id.get()
+        with self._usage_lock:
+            return {agent: dict(stats) for agent, stats in self._usage.get(session_id, {}).items()}
+
+    def pop_usage(self, session_id: str) -> dict:
+        """
+        Returns a session's usage summary and drops its aggregates.
+        Call it when a session ends, so long-running processes do not keep every session's totals.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            dict: Mapping of agent name to its aggregated statistics.
+        """
+        with self._usage_lock:
+            return {agent: dict(stats) for agent, stats in self._usage.pop(session_id, {}).items()}
+
     def configure_logging(self, session_id: str):
         """
         Switch telemetry logging to a session-specific file.
+        Processes hosting several sessions at once (server, batch) pass a shared name instead;
+        their spans are told apart by the `session.id` attribute.
 
         Args:
             session_id (str): The ID of the current session.
         """
-        import os
         log_dir = "logs/telemetry_logs"
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
             
-        log_file_path = os.path.join(log_dir, f"{session_id}.log")
-        
-        # Open new file
-        new_log_file = open(log_file_path, "a", encoding="utf-8")
+        log_file_path = os.path.join(log_dir, f"{session_id}.jsonl")
         
-        # Update exporters to use the new file
-        # ConsoleSpanExporter and ConsoleMetricExporter store the stream in 'out'
-        # We update the stream reference so future writes go to the new file
-        self.console_exporter.out = new_log_file
-        self.metric_exporter.out = new_log_file
-        
-        # Close the old file
-        # We do this AFTER updating the exporters to minimize race conditions
-        if hasattr(self, 'log_file') and self.log_file:
-            try:
-                self.log_file.close()
-            except Exception:
-                pass # Ignore errors if already closed
-            
-        self.log_file = new_log_file
+        # Drain queued spans and metrics into the previous file before switching,
+        # so each session's file only holds that session's telemetry
+        self.trace_provider.force_flush()
+        self.meter_provider.force_flush()
+        self.sink.rotate(log_file_path)
 
 # Global instance
 trace_logger = TraceLogger()
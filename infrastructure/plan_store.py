@@ -0,0 +1,166 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+import pandas as pd
+from config import config
+
+class PlanStore:
+    """
+    On-disk store of validated cleaning plans (SQLite), keyed by schema fingerprint.
+    A recurring feed with the same columns and dtypes is cleaned by replaying the stored
+    code instead of asking the model again. Each plan also records the columns and dtype kinds
+    its output had; a replay that fails, or whose output differs from that, drops the plan.
+    """
+    def __init__(self, path: str):
+        """
+        Initialize the PlanStore. The database is opened on first use.
+
+        Args:
+            path (str): The path to the SQLite database file.
+        """
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def schema_fingerprint(df: pd.DataFrame, variant: str = "") -> str:
+        """
+        Fingerprints a raw dataset by its column names, order and parsed dtypes.
+
+        Args:
+            df (pd.DataFrame): The raw dataset (or its first chunk).
+            variant (str): Kind of plan, so e.g. chunk-wise plans never replace whole-frame ones.
+
+        Returns:
+            str: A SHA-256 hex digest.
+        """
+        payload = json.dumps([variant, [[str(col), str(dtype)] for col, dtype in df.dtypes.items()]], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def output_signature(df: pd.DataFrame) -> list:
+        """
+        Describes cleaned output by its column names and dtype kinds. Kinds rather than exact dtypes,
+        so a chunk or file that happens to hold missing values (int64 -> float64) still matches; a column
+        without any values has no meaningful dtype and is described as 'empty'.
+
+        Args:
+            df (pd.DataFrame): The cleaned dataset (or a cleaned chunk).
+
+        Returns:
+            list: [[column, kind], ...] with kind 'number', 'bool', 'datetime', 'timedelta', 'category', 'text' or 'empty'.
+        """
+        def kind(dtype) -> str:
+            if pd.api.types.is_bool_dtype(dtype):
+                return "bool"
+            if pd.api.types.is_numeric_dtype(dtype):
+                return "number"
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                return "datetime"
+            if pd.api.types.is_timedelta64_dtype(dtype):
+                return "timedelta"
+            if isinstance(dtype, pd.CategoricalDtype):
+                return "category"
+            return "text"
+        has_values = df.notna().any(axis=0).tolist()
+        return [[str(col), kind(dtype) if filled else "empty"] for (col, dtype), filled in zip(df.dtypes.items(), has_values)]
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "fingerprint TEXT PRIMARY KEY, explanation TEXT NOT NULL, code TEXT NOT NULL, "
+                "source TEXT, created REAL NOT NULL, last_used REAL NOT NULL, uses INTEGER NOT NULL DEFAULT 0, "
+                "output_signature TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(plans)")}
+            if "output_signature" not in columns:
+                # Stores created before output signatures; get() treats those plans as absent until they are replaced
+                self._conn.execute("ALTER TABLE plans ADD COLUMN output_signature TEXT")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, fingerprint: str) -> Optional[dict]:
+        """
+        Looks up the plan stored for a schema.
+
+        Args:
+            fingerprint (str): The schema fingerprint (see schema_fingerprint).
+
+        Returns:
+            Optional[dict]: {'explanation', 'code', 'source', 'uses', 'output_signature'}, or None if the schema
+            is new. A plan stored before output signatures were recorded cannot be checked and counts as absent.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT explanation, code, source, uses, output_signature FROM plans WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        if row is None or not row[4]:
+            return None
+        return {"explanation": row[0], "code": row[1], "source": row[2], "uses": row[3], "output_signature": json.loads(row[4])}
+
+    def put(self, fingerprint: str, explanation: str, code: str, source: str = None, output_signature: list = None):
+        """
+        Stores a plan that cleaned a dataset successfully.
+
+        Args:
+            fingerprint (str): The schema fingerprint.
+            explanation (str): The plan summary.
+            code (str): The validated cleaning code.
+            source (str, optional): The dataset the plan was generated for.
+            output_signature (list): The output_signature() of what the plan produced.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (fingerprint, explanation, code, source, created, last_used, uses, output_signature) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                (fingerprint, explanation, code, source, now, now, json.dumps(output_signature) if output_signature else None)
+            )
+            conn.commit()
+
+    def mark_used(self, fingerprint: str):
+        """
+        Records a successful replay of a stored plan.
+
+        Args:
+            fingerprint (str): The schema fingerprint.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE plans SET uses = uses + 1, last_used = ? WHERE fingerprint = ?", (time.time(), fingerprint))
+            conn.commit()
+
+    def discard(self, fingerprint: str):
+        """
+        Drops a plan that no longer works, so the next file with this schema gets a fresh one.
+
+        Args:
+            fingerprint (str): The schema fingerprint.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM plans WHERE fingerprint = ?", (fingerprint,))
+            conn.commit()
+
+    def clear(self):
+        """
+        Removes every stored plan.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM plans")
+            conn.commit()
+
+# Global instance
+plan_store = PlanStore(path=config.PLAN_STORE_PATH)
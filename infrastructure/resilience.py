@@ -0,0 +1,280 @@
+import re
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from config import config
+from infrastructure.stream_handler import get_stream_logger
+from infrastructure.key_pool import is_rate_limit_error, retry_after_seconds
+
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+_TRANSIENT_CODES = {408, 500, 502, 503, 504}
+_TRANSIENT_STATUSES = ("UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "ABORTED")
+
+def classify_error(error: Exception) -> str:
+    """
+    Classifies a model-call failure to decide whether it is worth retrying.
+
+    Args:
+        error (Exception): The exception raised by the model call.
+
+    Returns:
+        str: RATE_LIMIT (retry on another key), TRANSIENT (retry with backoff) or PERMANENT (fail fast).
+    """
+    if is_rate_limit_error(error):
+        return RATE_LIMIT
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return TRANSIENT
+    # httpx/aiohttp transport failures (connection reset, read timeout) do not share a base class
+    if type(error).__name__ in ("ConnectError", "ReadTimeout", "ReadError", "RemoteProtocolError", "ServerDisconnectedError"):
+        return TRANSIENT
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in _TRANSIENT_CODES:
+        return TRANSIENT
+    text = str(error)
+    if any(re.search(rf"\b{c}\b", text) for c in _TRANSIENT_CODES) or any(s in text for s in _TRANSIENT_STATUSES):
+        return TRANSIENT
+    return PERMANENT
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+    """
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        """
+        Initialize the RetryPolicy.
+
+        Args:
+            max_retries (int): Retries allowed after the first attempt.
+            base_delay (float): Delay before the first retry, in seconds.
+            max_delay (float): Upper bound on any single delay, in seconds.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry: int, retry_after: float = None) -> float:
+        """
+        Returns how long to sleep before a retry.
+
+        Args:
+            retry (int): The retry number (1 for the first retry).
+            retry_after (float, optional): Server-suggested minimum delay.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return max(random.uniform(0, ceiling), retry_after or 0)
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the model while the circuit breaker is open.
+    """
+    pass
+
+class CircuitBreaker:
+    """
+    Shared breaker for the model service.
+    After `failure_threshold` consecutive transient failures the circuit opens and calls
+    fail fast; after `reset_timeout` one trial call is let through (half-open) to probe recovery.
+    admit() hands every call a ticket; only the ticket of the current trial can settle or free it,
+    so a late result from a call admitted earlier cannot end someone else's trial.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds the circuit stays open before a trial call.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trials = 0 # number of the last trial handed out; tickets of normal calls are 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.logger = get_stream_logger("CircuitBreaker")
+
+    def admit(self) -> Optional[int]:
+        """
+        Checks whether a call may go through and, in the half-open state, claims the trial for it.
+
+        Returns:
+            Optional[int]: None while the circuit is open (or a half-open trial is already running);
+            otherwise the call's ticket: 0 for a normal call, or a positive trial number.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return 0
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trials += 1
+                return self._trials
+            return None
+
+    def _is_trial(self, ticket: int) -> bool:
+        return bool(ticket) and ticket == self._trials and self._trial_in_flight
+
+    def record_success(self, ticket: int = 0):
+        """
+        Closes the circuit after a successful call.
+
+        Args:
+            ticket (int): The ticket admit() returned for the call.
+        """
+        with self._lock:
+            if self.state != "closed":
+                self.logger.info("Model service recovered, circuit closed.")
+            self.state = "closed"
+            self.failures = 0
+            if self._is_trial(ticket):
+                self._trial_in_flight = False
+
+    def release(self, ticket: int):
+        """
+        Frees the half-open trial slot without judging the service, e.g. when the trial call was
+        cancelled. The next call becomes the trial. Tickets other than the current trial's are ignored.
+
+        Args:
+            ticket (int): The ticket admit() returned for the call.
+        """
+        with self._lock:
+            if self._is_trial(ticket):
+                self._trial_in_flight = False
+
+    def record_failure(self, ticket: int = 0):
+        """
+        Counts a transient failure, opening the circuit at the threshold or on a failed trial.
+
+        Args:
+            ticket (int): The ticket admit() returned for the call.
+        """
+        with self._lock:
+            self.failures += 1
+            trial = self._is_trial(ticket)
+            if trial:
+                self._trial_in_flight = False
+            if trial or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.logger.warning(f"Model service failing ({self.failures} consecutive errors), circuit open for {self.reset_timeout:g}s.")
+
+async def hedged(call: Callable[[], Awaitable[Any]], hedge_after: float) -> Any:
+    """
+    Runs a call and, if it has not finished within `hedge_after` seconds, races a duplicate.
+    The first successful result wins and the other attempt is cancelled.
+
+    Args:
+        call (Callable): Factory returning a fresh awaitable for each attempt.
+        hedge_after (float): Seconds to wait before sending the duplicate (0 disables hedging).
+
+    Returns:
+        Any: The result of the first attempt to succeed.
+
+    Raises:
+        Exception: The last error if every attempt failed.
+    """
+    if not hedge_after or hedge_after <= 0:
+        return await call()
+
+    pending = {asyncio.ensure_future(call())}
+    done, _ = await asyncio.wait(pending, timeout=hedge_after)
+    if not done:
+        pending.add(asyncio.ensure_future(call()))
+
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    timeout: float = None,
+    hedge_after: float = 0,
+    on_retry: Callable[[int, str, Exception, float], None] = None
+) -> Tuple[Any, int]:
+    """
+    Calls the model with classified retries, jittered backoff, hedging and the shared circuit breaker.
+
+    Args:
+        call (Callable): Factory returning a fresh awaitable for each attempt.
+        policy (RetryPolicy): Retry budget and backoff.
+        breaker (CircuitBreaker): The shared circuit breaker.
+        timeout (float, optional): Per-attempt time limit in seconds.
+        hedge_after (float): Seconds before a hedged duplicate is sent (0 disables).
+        on_retry (Callable, optional): Called with (retry number, error kind, error, delay) before each retry.
+
+    Returns:
+        Tuple[Any, int]: The result and the number of retries it took.
+
+    Raises:
+        CircuitOpenError: If the circuit is open.
+        Exception: The last error once it is permanent or the retry budget is spent.
+    """
+    async def attempt():
+        if timeout:
+            return await asyncio.wait_for(hedged(call, hedge_after), timeout)
+        return await hedged(call, hedge_after)
+
+    retries = 0
+    while True:
+        ticket = breaker.admit()
+        if ticket is None:
+            raise CircuitOpenError("Model service unavailable (circuit open), try again shortly.")
+        try:
+            result = await attempt()
+        except asyncio.CancelledError:
+            # A cancelled trial must not leave the breaker waiting for it forever (stuck half-open)
+            breaker.release(ticket)
+            raise
+        except Exception as e:
+            kind = classify_error(e)
+            if kind == TRANSIENT:
+                breaker.record_failure(ticket)
+            else:
+                # The service answered: rate limits and bad requests say nothing about its health
+                breaker.record_success(ticket)
+            if kind == PERMANENT or retries >= policy.max_retries:
+                raise
+            retries += 1
+            # The key pool already holds the rate-limited key in cooldown; the next lease picks a healthy one
+            delay = 0.0 if kind == RATE_LIMIT else policy.delay(retries, retry_after_seconds(e))
+            if on_retry:
+                on_retry(retries, kind, e, delay)
+            if delay:
+                await asyncio.sleep(delay)
+            continue
+        breaker.record_success(ticket)
+        return result, retries
+
+# Global instances
+retry_policy = RetryPolicy(
+    max_retries=config.LLM_MAX_RETRIES,
+    base_delay=config.LLM_BACKOFF_BASE_SECONDS,
+    max_delay=config.LLM_BACKOFF_MAX_SECONDS
+)
+circuit_breaker = CircuitBreaker(
+    failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=config.CIRCUIT_RESET_SECONDS
+)
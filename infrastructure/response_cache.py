@@ -0,0 +1,180 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional
+from config import config
+
+class ResponseCache:
+    """
+    Content-addressed, on-disk cache of model responses (SQLite).
+    Entries expire after a TTL and the least recently used ones are evicted
+    once the stored text exceeds the size budget. Access times are kept in memory
+    and written in batches, so a hit does not commit.
+    Calls block on SQLite; async callers run them with asyncio.to_thread.
+    """
+    # Pending access-time updates written in one commit once this many accumulate (or on put)
+    TOUCH_BATCH = 64
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        """
+        Initialize the ResponseCache. The database is opened on first use.
+
+        Args:
+            path (str): The path to the SQLite database file.
+            ttl_seconds (float): How long an entry stays valid.
+            max_bytes (int): Size budget for stored responses.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._total_bytes = 0
+        self._touched = {} # key -> access time not yet written
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, instruction: str, tools: List[str], prompt: str) -> str:
+        """
+        Builds the cache key for one generation request.
+
+        Args:
+            model_name (str): The model name.
+            instruction (str): The agent's system instruction.
+            tools (List[str]): Names of the tools available to the agent.
+            prompt (str): The user prompt.
+
+        Returns:
+            str: A SHA-256 hex digest.
+        """
+        payload = json.dumps([model_name, instruction or "", sorted(tools or []), prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Looks up a cached response.
+
+        Args:
+            key (str): The cache key (see make_key).
+
+        Returns:
+            Optional[str]: The cached response text, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, size, created = row
+            if now - created > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= size
+                self._touched.pop(key, None)
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._write_touches(conn)
+                conn.commit()
+            return value
+
+    def _write_touches(self, conn: sqlite3.Connection):
+        """
+        Writes the pending access times (the caller holds the lock and commits).
+        """
+        if self._touched:
+            conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()])
+            self._touched = {}
+
+    def put(self, key: str, value: str):
+        """
+        Stores a response, evicting least recently used entries if over budget.
+
+        Args:
+            key (str): The cache key (see make_key).
+            value (str): The response text.
+        """
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._touched.pop(key, None)
+            self._write_touches(conn) # Eviction below orders by access time
+            while self._total_bytes > self.max_bytes:
+                # Only as many of the oldest entries as it takes to fit, never the one just stored
+                rows = conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY accessed ASC LIMIT 64", (key,)
+                ).fetchall()
+                if not rows:
+                    break
+                victims = []
+                for victim, victim_size in rows:
+                    victims.append(victim)
+                    self._total_bytes -= victim_size
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in victims])
+            conn.commit()
+
+    def delete(self, key: str):
+        """
+        Removes one cached response, e.g. after the caller rejected it, so the next call asks the model again.
+
+        Args:
+            key (str): The cache key (see make_key).
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+            self._total_bytes -= row[0]
+            self._touched.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._total_bytes = 0
+            self._touched = {}
+
+# Global instance
+response_cache = ResponseCache(
+    path=config.RESPONSE_CACHE_PATH,
+    ttl_seconds=config.RESPONSE_CACHE_TTL_HOURS * 3600,
+    max_bytes=config.RESPONSE_CACHE_MAX_MB * 1024 * 1024
+)
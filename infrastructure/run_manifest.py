@@ -0,0 +1,197 @@
+import io
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from pydantic import BaseModel, Field
+from config import config
+
+UNCHANGED = "unchanged"
+APPENDED = "appended"
+REWRITTEN = "rewritten"
+
+class RunManifest(BaseModel):
+    """
+    Record of the last full or incremental pipeline run on a source dataset.
+    """
+    source_path: str = Field(..., description="Absolute path of the raw input.")
+    source_size: int = Field(..., description="Input size in bytes at the time of the run.")
+    source_hash: str = Field(..., description="SHA-256 of the input content at the time of the run.")
+    columns: List[str] = Field(..., description="Raw column names, used to parse appended rows.")
+    cleaned_path: str = Field(..., description="The cleaned dataset the analysis ran on.")
+    cleaning_code: str = Field(..., description="The validated cleaning code that produced it.")
+    stats: Dict[str, Any] = Field(..., description="RunningStats of the cleaned data (see tools/running_stats.py).")
+    analysis_baselines: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="RunningStats when each Phase-1 analyst last ran.")
+    insights: Dict[str, Any] = Field(default_factory=dict, description="The Analyst Squad knowledge graph.")
+    report: str = Field("", description="The final Critic report.")
+    updated_at: str = Field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+def _manifest_path(source_path: str) -> str:
+    key = hashlib.sha256(os.path.abspath(source_path).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(config.RUN_MANIFEST_DIR, f"{key}.json")
+
+def hash_file(path: str, length: int = None) -> str:
+    """
+    Hashes a file, or only its first `length` bytes, in 1 MB blocks.
+
+    Args:
+        path (str): The file path.
+        length (int, optional): Number of leading bytes to hash (default: the whole file).
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    remaining = os.path.getsize(path) if length is None else length
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+def csv_record_offset(path: str, rows: int) -> Optional[int]:
+    """
+    Finds the byte offset just past the header and the first `rows` records of a CSV file.
+    Newlines inside quoted fields do not end a record, and blank lines are not records
+    (pandas skips them too).
+
+    Args:
+        path (str): The CSV path.
+        rows (int): Number of data records.
+
+    Returns:
+        Optional[int]: The offset, or None if the file has fewer complete records.
+    """
+    wanted = rows + 1 # the header line
+    offset = 0
+    in_quotes = False
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return None # a record still being written
+            offset += len(line)
+            blank = not in_quotes and not line.strip()
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if in_quotes or blank:
+                continue
+            wanted -= 1
+            if wanted == 0:
+                return offset
+    return None
+
+def fingerprint_source(path: str, rows: int = None) -> Dict[str, Any]:
+    """
+    Captures what a run read from its input, so a later refresh can tell appends from rewrites.
+
+    Args:
+        path (str): The raw dataset path.
+        rows (int, optional): The number of data rows the run actually read. For a CSV file that is
+            still being appended to, only the bytes up to the end of those rows are fingerprinted.
+
+    Returns:
+        Dict[str, Any]: The absolute path, size, content hash and (for CSV) the header columns.
+
+    Raises:
+        ValueError: If the CSV file no longer holds `rows` complete records.
+    """
+    columns = []
+    size = os.path.getsize(path)
+    if path.lower().endswith(".csv"):
+        columns = [str(c) for c in pd.read_csv(path, nrows=0).columns]
+        if rows is not None:
+            size = csv_record_offset(path, rows)
+            if size is None:
+                raise ValueError(f"{path} has fewer than the {rows} rows that were read.")
+    # Hash exactly the bytes counted, even if rows are being appended meanwhile
+    return {
+        "source_path": os.path.abspath(path),
+        "source_size": size,
+        "source_hash": hash_file(path, size),
+        "columns": columns
+    }
+
+def load_manifest(source_path: str) -> Optional[RunManifest]:
+    """
+    Loads the manifest of the last run on a dataset.
+
+    Args:
+        source_path (str): The raw dataset path.
+
+    Returns:
+        Optional[RunManifest]: The manifest, or None if the dataset was never run (or the record is unreadable).
+    """
+    path = _manifest_path(source_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return RunManifest.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(manifest: RunManifest):
+    """
+    Writes a manifest atomically (temp file + rename).
+
+    Args:
+        manifest (RunManifest): The manifest to persist.
+    """
+    path = _manifest_path(manifest.source_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    manifest.updated_at = datetime.now().isoformat(timespec="seconds")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(manifest.model_dump(), default=str))
+    os.replace(tmp_path, path)
+
+def detect_change(source_path: str, manifest: RunManifest) -> str:
+    """
+    Classifies how a dataset changed since its last run.
+    Only CSV files can be detected as append-only: the old content must be an exact
+    byte prefix of the new file and end on a line boundary.
+
+    Args:
+        source_path (str): The raw dataset path.
+        manifest (RunManifest): The manifest of the last run.
+
+    Returns:
+        str: UNCHANGED, APPENDED or REWRITTEN.
+    """
+    size = os.path.getsize(source_path)
+    if size == manifest.source_size:
+        return UNCHANGED if hash_file(source_path) == manifest.source_hash else REWRITTEN
+    if size < manifest.source_size or not source_path.lower().endswith(".csv"):
+        return REWRITTEN
+    with open(source_path, "rb") as f:
+        f.seek(manifest.source_size - 1)
+        if f.read(1) != b"\n":
+            return REWRITTEN
+    return APPENDED if hash_file(source_path, manifest.source_size) == manifest.source_hash else REWRITTEN
+
+def read_appended_rows(source_path: str, manifest: RunManifest) -> Tuple[pd.DataFrame, int]:
+    """
+    Parses only the rows appended to a CSV since the last run.
+    Reading stops after the last complete line, so a row still being written is left for the next refresh.
+
+    Args:
+        source_path (str): The raw dataset path.
+        manifest (RunManifest): The manifest of the last run.
+
+    Returns:
+        Tuple[pd.DataFrame, int]: The new rows (with the original column names) and the byte offset
+            read up to, which is the source_size to record for this refresh.
+    """
+    with open(source_path, "rb") as f:
+        f.seek(manifest.source_size)
+        tail = f.read()
+    tail = tail[:tail.rfind(b"\n") + 1]
+    end = manifest.source_size + len(tail)
+    if not tail.strip():
+        return pd.DataFrame(columns=manifest.columns), end
+    return pd.read_csv(io.BytesIO(tail), header=None, names=manifest.columns, low_memory=False), end
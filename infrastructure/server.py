@@ -0,0 +1,298 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field
+from config import config
+from agents.orchestrator import Orchestrator
+from agents.analyst_squad import plot_dir_for
+from memory.memory_bank import MemoryBank
+from memory.session_manager import SessionManager
+from infrastructure.a2a_registry import agent_pool
+from infrastructure.dataset_cache import dataset_cache
+from infrastructure.key_pool import key_pool
+from infrastructure.mcp_client import mcp_client
+from infrastructure.observability import trace_logger, current_session_id
+from infrastructure.stream_handler import get_stream_logger, subscribe, unsubscribe
+
+class MessageRequest(BaseModel):
+    """
+    One user turn sent to a session.
+    """
+    text: str = Field(..., description="The user input, exactly as it would be typed in the CLI.")
+
+class CreateSessionRequest(BaseModel):
+    """
+    Options for opening a session.
+    """
+    resume_session_id: Optional[str] = Field(None, description="A saved session to resume instead of starting fresh.")
+
+class HostedSession:
+    """
+    One tenant: its own SessionManager and Orchestrator state.
+    Turns are serialized per session; different sessions run concurrently.
+    Charts are written to the session's own directory (static/plots/<session_id>), and files
+    are only looked up by name inside DATA_DIR (a sandboxed Orchestrator).
+    """
+    def __init__(self, session_manager: SessionManager):
+        self.session_manager = session_manager
+        self.orchestrator = Orchestrator(session_manager, sandboxed=True)
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+
+    @property
+    def session_id(self) -> str:
+        return self.session_manager.current_session_id
+
+    def describe(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "name": self.session_manager.session_name,
+            "state": self.session_manager.state,
+            "current_file": self.orchestrator.current_file,
+            "plot_dir": plot_dir_for(self.session_id),
+            "busy": self.lock.locked()
+        }
+
+class SessionHost:
+    """
+    Hosts many concurrent sessions in one process.
+    Every session shares the agent pool, dataset cache, key pool and response cache,
+    so the models, parsed datasets and warm workers are paid for once per box, not once per analyst.
+    """
+    def __init__(self, max_sessions: int = None, idle_timeout: float = None, evict_interval: float = None):
+        """
+        Initialize the SessionHost.
+
+        Args:
+            max_sessions (int, optional): Sessions held in memory at once.
+            idle_timeout (float, optional): Seconds after which an idle session is saved and evicted.
+            evict_interval (float, optional): Seconds between idle checks while the server runs.
+        """
+        self.max_sessions = max_sessions or config.SERVER_MAX_SESSIONS
+        self.idle_timeout = idle_timeout or config.SERVER_SESSION_IDLE_MINUTES * 60
+        self.evict_interval = evict_interval or config.SERVER_EVICT_INTERVAL_SECONDS
+        self.memory_bank = MemoryBank()
+        self.sessions: Dict[str, HostedSession] = {}
+        self.logger = get_stream_logger("SessionHost")
+
+    async def open(self, resume_session_id: str = None) -> HostedSession:
+        """
+        Creates a new session, or resumes a saved one.
+
+        Args:
+            resume_session_id (str, optional): The saved session to load.
+
+        Returns:
+            HostedSession: The hosted session.
+        """
+        if resume_session_id and resume_session_id in self.sessions:
+            return self.sessions[resume_session_id]
+        await self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPException(status_code=503, detail="Session limit reached, try again later.")
+
+        session_manager = SessionManager(self.memory_bank)
+        if resume_session_id and not await asyncio.to_thread(session_manager.load_state, resume_session_id):
+            raise HTTPException(status_code=404, detail="Saved session not found.")
+        hosted = HostedSession(session_manager)
+        self.sessions[hosted.session_id] = hosted
+        self.logger.info(f"Opened session {hosted.session_id[:8]} ({len(self.sessions)} active)")
+        return hosted
+
+    def get(self, session_id: str) -> HostedSession:
+        """
+        Looks up an active session.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            HostedSession: The hosted session.
+
+        Raises:
+            HTTPException: 404 if the session is not active.
+        """
+        hosted = self.sessions.get(session_id)
+        if hosted is None:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        return hosted
+
+    async def close(self, session_id: str):
+        """
+        Drops a session from memory and saves it to disk.
+        Saving flushes queued memory writes, so it runs on a thread, off the event loop.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        hosted = self.sessions.pop(session_id, None)
+        if hosted is not None:
+            trace_logger.pop_usage(session_id)
+            await asyncio.to_thread(hosted.session_manager.save_state)
+
+    async def evict_idle(self):
+        """
+        Saves and drops sessions that have been idle longer than the timeout.
+        """
+        now = time.monotonic()
+        idle = [
+            session_id for session_id, hosted in self.sessions.items()
+            if not hosted.lock.locked() and now - hosted.last_active > self.idle_timeout
+        ]
+        for session_id in idle:
+            self.logger.info(f"Evicting idle session {session_id[:8]}")
+        await asyncio.gather(*[self.close(session_id) for session_id in idle])
+
+    async def evict_idle_periodically(self):
+        """
+        Runs evict_idle every `evict_interval` seconds until cancelled, so idle sessions are
+        saved and released even when no new session is opened.
+        """
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                self.logger.error(f"Evicting idle sessions failed: {e}")
+
+    async def handle(self, hosted: HostedSession, text: str) -> dict:
+        """
+        Runs one user turn through the session's Orchestrator.
+
+        Args:
+            hosted (HostedSession): The session.
+            text (str): The user input.
+
+        Returns:
+            dict: The response text and the resulting session state.
+        """
+        async with hosted.lock:
+            # Routes this turn's logs and token usage to the session
+            current_session_id.set(hosted.session_id)
+            hosted.last_active = time.monotonic()
+            hosted.session_manager.add_message("user", text)
+            response = await hosted.orchestrator.route_request(text)
+            hosted.session_manager.add_message("system", response)
+            hosted.last_active = time.monotonic()
+        return {"response": response, "state": hosted.session_manager.state}
+
+def create_app(host: SessionHost = None) -> FastAPI:
+    """
+    Builds the HTTP/WebSocket API around a SessionHost.
+
+    Args:
+        host (SessionHost, optional): The session host (a new one by default).
+
+    Returns:
+        FastAPI: The application.
+    """
+    host = host or SessionHost()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        evictor = asyncio.create_task(host.evict_idle_periodically())
+        yield
+        evictor.cancel()
+        # Persist every open session on shutdown
+        await asyncio.gather(*[host.close(session_id) for session_id in list(host.sessions)])
+        await mcp_client.close()
+        await asyncio.to_thread(host.memory_bank.close)
+
+    app = FastAPI(title="DataGuild", lifespan=lifespan)
+    app.state.host = host
+
+    @app.get("/health")
+    async def health():
+        return {
+            "sessions": len(host.sessions),
+            "agents_loaded": agent_pool.loaded(),
+            "dataset_cache": dataset_cache.stats(),
+            "keys": key_pool.status()
+        }
+
+    @app.post("/sessions")
+    async def open_session(request: Optional[CreateSessionRequest] = None):
+        return (await host.open(request.resume_session_id if request else None)).describe()
+
+    @app.get("/sessions")
+    async def list_sessions():
+        return [hosted.describe() for hosted in host.sessions.values()]
+
+    @app.get("/sessions/{session_id}")
+    async def get_session(session_id: str):
+        return host.get(session_id).describe()
+
+    @app.post("/sessions/{session_id}/messages")
+    async def send_message(session_id: str, request: MessageRequest):
+        return await host.handle(host.get(session_id), request.text)
+
+    @app.get("/sessions/{session_id}/usage")
+    async def usage(session_id: str):
+        host.get(session_id)
+        return trace_logger.usage_summary(session_id)
+
+    @app.delete("/sessions/{session_id}")
+    async def close_session(session_id: str):
+        host.get(session_id)
+        await host.close(session_id)
+        return {"closed": session_id}
+
+    @app.websocket("/sessions/{session_id}/ws")
+    async def session_socket(websocket: WebSocket, session_id: str):
+        """
+        Send {"text": ...} to run a turn; receives {"type": "log", ...} progress events
+        while it runs, then {"type": "response", "response": ..., "state": ...}.
+        """
+        hosted = host.sessions.get(session_id)
+        if hosted is None:
+            await websocket.close(code=4404)
+            return
+        await websocket.accept()
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        def listener(event: dict):
+            # Log events can come from worker threads (asyncio.to_thread); those hop back onto the loop
+            try:
+                on_loop = asyncio.get_running_loop() is loop
+            except RuntimeError:
+                on_loop = False
+            if on_loop:
+                events.put_nowait(event)
+            else:
+                loop.call_soon_threadsafe(events.put_nowait, event)
+        subscribe(session_id, listener)
+
+        async def forward_events():
+            while True:
+                await websocket.send_json(await events.get())
+
+        forwarder = asyncio.create_task(forward_events())
+        try:
+            while True:
+                message = await websocket.receive_json()
+                text = str(message.get("text", "")).strip()
+                if not text:
+                    continue
+                result = await host.handle(hosted, text)
+                events.put_nowait({"type": "response", **result})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            unsubscribe(session_id, listener)
+            forwarder.cancel()
+
+    return app
+
+def serve(host: str = None, port: int = None):
+    """
+    Runs the server with uvicorn (single process; sessions share this process's caches and pools).
+
+    Args:
+        host (str, optional): Interface to bind.
+        port (int, optional): Port to listen on.
+    """
+    import uvicorn
+    uvicorn.run(create_app(), host=host or config.SERVER_HOST, port=port or config.SERVER_PORT)
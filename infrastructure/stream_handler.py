@@ -1,6 +1,9 @@
 import logging
 import sys
+import threading
 from datetime import datetime
+from typing import Callable, Dict, List
+from infrastructure.observability import current_session_id
 
 # ANSI color codes
 class Colors:
@@ -18,10 +21,63 @@ class Colors:
     UNDERLINE = '\033[4m'
     GREY = '\033[90m'
 
+# Per-session listeners for log events (e.g. WebSocket clients of the HTTP server)
+_subscribers: Dict[str, List[Callable[[dict], None]]] = {}
+_subscribers_lock = threading.Lock()
+
+def subscribe(session_id: str, callback: Callable[[dict], None]):
+    """
+    Registers a callback for the log events emitted while a session is active.
+    Events are routed by the `current_session_id` context var of the code that logged them.
+    The callback may be invoked from worker threads and must not block.
+
+    Args:
+        session_id (str): The session to listen to.
+        callback (Callable[[dict], None]): Receives {"type", "agent", "level", "message", "timestamp"}.
+    """
+    with _subscribers_lock:
+        _subscribers.setdefault(session_id, []).append(callback)
+
+def unsubscribe(session_id: str, callback: Callable[[dict], None]):
+    """
+    Removes a callback registered with subscribe().
+
+    Args:
+        session_id (str): The session the callback listens to.
+        callback (Callable[[dict], None]): The callback to remove.
+    """
+    with _subscribers_lock:
+        callbacks = _subscribers.get(session_id, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            _subscribers.pop(session_id, None)
+
+def _publish(record: logging.LogRecord, msg: str):
+    if not _subscribers:
+        return
+    with _subscribers_lock:
+        callbacks = list(_subscribers.get(current_session_id.get(), ()))
+    if not callbacks:
+        return
+    event = {
+        "type": "log",
+        "agent": record.name,
+        "level": record.levelname,
+        "message": msg,
+        "timestamp": datetime.now().isoformat(timespec="seconds")
+    }
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception:
+            pass # A broken listener must never break the agent that is logging
+
 class StreamHandler(logging.Handler):
     """
     Custom logging handler to stream agent thoughts and actions to the console
-    with color coding and formatting.
+    with color coding and formatting. Events are also published to the subscribers
+    of the session that emitted them.
     """
     def __init__(self):
         """
@@ -69,6 +125,7 @@ class StreamHandler(logging.Handler):
             
             print(final_msg)
             sys.stdout.flush()
+            _publish(record, msg)
             
         except Exception:
             self.handleError(record)
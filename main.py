@@ -1,16 +1,19 @@
 import os
 import asyncio
+import argparse
 from agents.orchestrator import Orchestrator
 from memory.session_manager import SessionManager
 from memory.memory_bank import MemoryBank
-from infrastructure.observability import trace_logger, configure_telemetry
+from infrastructure.observability import trace_logger, configure_telemetry, current_session_id
 from infrastructure.stream_handler import configure_file_logging
 import logging
 import warnings
-import glob
 from datetime import datetime
 import shutil
 from infrastructure.file_browser import browse_for_file
+from infrastructure.code_executor import code_executor
+from infrastructure.mcp_client import mcp_client
+from config import config
 warnings.simplefilter(action='ignore', category=FutureWarning) 
 
 logging.getLogger("google_genai").setLevel(logging.WARNING)
@@ -95,18 +98,13 @@ def print_prompt(text):
 
 def list_available_datasets():
     """
-    Lists all CSV files in the data_storage directory.
+    Lists all CSV files in the data_storage directory, from the directory index.
 
     Returns:
-        list: A list of paths to available CSV files.
+        list: Catalog entries ('name', 'path', 'size', 'mtime', 'row_count') of the available CSV files.
     """
-    data_dir = "data_storage"
-    if not os.path.exists(data_dir):
-        return []
-    
-    csv_files = glob.glob(os.path.join(data_dir, "*.csv"))
-    csv_files = [f for f in csv_files if not os.path.basename(f).startswith("cleaned_")]
-    return csv_files
+    from infrastructure.data_catalog import data_catalog
+    return [entry for entry in data_catalog.entries(('.csv',)) if not entry["name"].startswith("cleaned_")]
 
 def select_dataset():
     """
@@ -156,10 +154,10 @@ def select_dataset():
     
     print_info("Available datasets:")
     for i, dataset in enumerate(datasets, 1):
-        file_size = os.path.getsize(dataset)
-        size_kb = file_size / 1024
-        mod_time = datetime.fromtimestamp(os.path.getmtime(dataset)).strftime("%Y-%m-%d %H:%M")
-        print(f"  {Colors.BOLD}[{i}]{Colors.ENDC} {os.path.basename(dataset):<30} ({size_kb:.1f} KB, modified: {mod_time})")
+        size_kb = dataset["size"] / 1024
+        mod_time = datetime.fromtimestamp(dataset["mtime"]).strftime("%Y-%m-%d %H:%M")
+        rows = f", {dataset['row_count']:,} rows" if dataset["row_count"] is not None else ""
+        print(f"  {Colors.BOLD}[{i}]{Colors.ENDC} {dataset['name']:<30} ({size_kb:.1f} KB{rows}, modified: {mod_time})")
     
     print(f"  {Colors.BOLD}[B]{Colors.ENDC} Browse System")
     print(f"  {Colors.BOLD}[0]{Colors.ENDC} Enter custom path")
@@ -206,7 +204,7 @@ def select_dataset():
             
             idx = int(choice) - 1
             if 0 <= idx < len(datasets):
-                return datasets[idx]
+                return os.path.join("data_storage", datasets[idx]["name"])
             else:
                 print_error(f"Please enter a number between 1 and {len(datasets)}")
         except ValueError:
@@ -293,15 +291,41 @@ def print_help():
         ("clean", "Proceed to data cleaning (after ingestion)"),
         ("analyze", "Proceed to analysis (after cleaning)"),
         ("report", "Generate final report (after analysis)"),
+        ("refresh <file>", "Update a previous analysis from rows appended to <file>"),
         ("reset", "Reset workflow to IDLE state"),
         ("save", "Save current session"),
         ("status", "Show current workflow state"),
+        ("usage", "Show token, latency and cost per agent"),
+        ("approx on / off", "Analyze very large datasets on a sample with confidence intervals"),
         ("help", "Show this help message"),
         ("exit / quit", "Exit the application")
     ]
     for cmd, desc in commands:
         print(f"  {Colors.BOLD}{cmd:<25}{Colors.ENDC} {desc}")
 
+def print_usage(summary: dict):
+    """
+    Prints the per-agent token, latency and cost summary of a session.
+
+    Args:
+        summary (dict): Output of trace_logger.usage_summary().
+    """
+    if not summary:
+        print_info("No model calls recorded in this session yet.")
+        return
+    print_info("Model usage this session:")
+    print(f"  {Colors.BOLD}{'Agent':<16}{'Calls':>6}{'Cached':>8}{'Retries':>8}{'Prompt tok':>12}{'Resp tok':>10}{'Avg ms':>9}{'Cost $':>9}{Colors.ENDC}")
+    totals = {"calls": 0, "cache_hits": 0, "retries": 0, "prompt_tokens": 0, "response_tokens": 0, "latency_ms": 0, "cost_usd": 0}
+    for agent, stats in sorted(summary.items(), key=lambda item: -item[1]["latency_ms"]):
+        avg_ms = stats["latency_ms"] / stats["calls"] if stats["calls"] else 0
+        print(f"  {agent:<16}{int(stats['calls']):>6}{int(stats['cache_hits']):>8}{int(stats['retries']):>8}"
+              f"{int(stats['prompt_tokens']):>12}{int(stats['response_tokens']):>10}{avg_ms:>9.0f}{stats['cost_usd']:>9.4f}")
+        for key in totals:
+            totals[key] += stats[key]
+    avg_ms = totals["latency_ms"] / totals["calls"] if totals["calls"] else 0
+    print(f"  {Colors.BOLD}{'TOTAL':<16}{int(totals['calls']):>6}{int(totals['cache_hits']):>8}{int(totals['retries']):>8}"
+          f"{int(totals['prompt_tokens']):>12}{int(totals['response_tokens']):>10}{avg_ms:>9.0f}{totals['cost_usd']:>9.4f}{Colors.ENDC}")
+
 async def main():
     """
     Main entry point for the application.
@@ -343,6 +367,7 @@ async def main():
         configure_file_logging(session_manager.current_session_id)
         print_info(f"Logs: logs/agent_logs/{session_manager.current_session_id}.log")
     
+    current_session_id.set(session_manager.current_session_id)
     print_info(f"Session ID: {Colors.BOLD}{session_manager.current_session_id[:8]}...{Colors.ENDC}")
     print_help()
     print()
@@ -388,6 +413,19 @@ async def main():
                     print_info(f"Current File: {Colors.BOLD}{orchestrator.current_file}{Colors.ENDC}")
                 continue
             
+            elif user_input.lower() == 'usage':
+                print_usage(trace_logger.usage_summary())
+                continue
+
+            elif user_input.lower() in ('approx on', 'approx off'):
+                config.APPROX_ENABLED = user_input.lower() == 'approx on'
+                if config.APPROX_ENABLED:
+                    print_success(f"Approximate mode on for datasets of {config.APPROX_MIN_ROWS:,}+ rows "
+                                  f"(target error {config.APPROX_TARGET_ERROR} sd, {config.APPROX_CONFIDENCE:.0%} confidence)")
+                else:
+                    print_success("Approximate mode off: analyses use the full data")
+                continue
+            
             elif user_input.lower() == 'select' or user_input.lower() == 'dataset':
                 if session_manager.state == "IDLE":
                     dataset = select_dataset()
@@ -424,10 +462,89 @@ async def main():
         except Exception as e:
             print_error(f"Error: {e}")
     
+    code_executor.shutdown()
+    await mcp_client.close()
+    await asyncio.to_thread(memory_bank.close)
     print(f"\n{Colors.GREEN}Thank you for using DataGuild!{Colors.ENDC}\n")
 
+async def run_batch(target: str, concurrency: int = None, llm_concurrency: int = None, incremental: bool = False):
+    """
+    Runs the full pipeline over every dataset matching a directory or glob, without the REPL.
+
+    Args:
+        target (str): A directory or glob pattern of datasets.
+        concurrency (int, optional): Datasets processed at the same time.
+        llm_concurrency (int, optional): Global limit on in-flight model calls.
+        incremental (bool): Refresh previously analyzed datasets from their appended rows.
+    """
+    from infrastructure.batch_runner import BatchRunner, discover_datasets
+
+    print_header("DataGuild - Batch Mode")
+    datasets = discover_datasets(target)
+    if not datasets:
+        print_error(f"No datasets found for: {target}")
+        return
+
+    runner = BatchRunner(max_concurrent_datasets=concurrency, llm_concurrency=llm_concurrency, incremental=incremental)
+    configure_telemetry(runner.batch_id)
+    configure_file_logging(runner.batch_id)
+    print_info(f"{len(datasets)} dataset(s), {runner.max_concurrent_datasets} at a time, "
+               f"{runner.llm_concurrency} concurrent model calls")
+    print_info(f"Reports: {runner.output_dir}")
+
+    try:
+        results = await runner.run(datasets)
+    finally:
+        code_executor.shutdown()
+        await mcp_client.close()
+        await asyncio.to_thread(runner.memory_bank.close)
+
+    print(f"\n{Colors.BOLD}{'Dataset':<36}{'Status':>10}{'Stage':>12}{'Time(s)':>9}{'Tokens':>10}{'Cost($)':>9}{Colors.ENDC}")
+    for result in results:
+        status_color = Colors.GREEN if result.status == "completed" else Colors.RED
+        print(f"  {result.dataset[:34]:<34}{status_color}{result.status:>10}{Colors.ENDC}{result.stage:>12}"
+              f"{result.seconds:>9.1f}{result.prompt_tokens + result.response_tokens:>10}{result.cost_usd:>9.4f}")
+        if result.error:
+            print(f"    {Colors.RED}{result.error[:200]}{Colors.ENDC}")
+
+    summary = runner.summary
+    print()
+    print_success(f"{summary['completed']}/{summary['datasets']} completed in {summary['elapsed_seconds']:.1f}s")
+    print_info(f"Throughput: {summary['datasets_per_hour']:.1f} completed datasets/hour "
+               f"({summary['processed_per_hour']:.1f} processed), "
+               f"{summary['tokens_per_dataset']} tokens/dataset, ${summary['total_cost_usd']:.4f} total")
+
+def parse_args():
+    """
+    Parses command-line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments (command is None for the interactive REPL).
+    """
+    parser = argparse.ArgumentParser(description="DataGuild - Autonomous Data Intelligence System")
+    subparsers = parser.add_subparsers(dest="command")
+    batch = subparsers.add_parser("batch", help="Run the full pipeline over many datasets without the REPL")
+    batch.add_argument("target", help="Directory or glob of datasets, e.g. 'incoming/*.csv'")
+    batch.add_argument("--concurrency", type=int, default=None, help="Datasets processed at the same time")
+    batch.add_argument("--llm-concurrency", type=int, default=None, help="Global limit on in-flight model calls")
+    batch.add_argument("--incremental", action="store_true", help="Refresh datasets that only had rows appended since their last run")
+    serve = subparsers.add_parser("serve", help="Host many concurrent sessions over HTTP/WebSocket")
+    serve.add_argument("--host", default=None, help="Interface to bind (default SERVER_HOST)")
+    serve.add_argument("--port", type=int, default=None, help="Port to listen on (default SERVER_PORT)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        if args.command == "batch":
+            asyncio.run(run_batch(args.target, args.concurrency, args.llm_concurrency, args.incremental))
+        elif args.command == "serve":
+            from infrastructure.server import serve
+            configure_telemetry("server")
+            configure_file_logging("server")
+            serve(args.host, args.port)
+            code_executor.shutdown()
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Goodbye!{Colors.ENDC}\n")
@@ -0,0 +1,301 @@
+import os
+import re
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from config import config
+from infrastructure.stream_handler import get_stream_logger
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+HASHING_MODEL = "hashing"
+
+class EmbeddingCache:
+    """
+    Bounded, persistent cache of embeddings keyed by a hash of (model, text).
+    A small in-memory LRU sits in front of a SQLite table. Once the table holds more than
+    `max_entries` vectors, the least recently used tenth is evicted.
+    """
+    def __init__(self, path: str, max_entries: int = 100000, memory_entries: int = 4096):
+        """
+        Initialize the EmbeddingCache. The database is opened on first use.
+
+        Args:
+            path (str): The path to the SQLite database file.
+            max_entries (int): Most vectors kept on disk.
+            memory_entries (int): Most vectors kept in memory.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._count = None
+        self._memory = OrderedDict() # key -> float32 vector
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL") # A lost write only costs a recomputed embedding
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._conn.commit()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._conn
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """
+        The cache key of a text embedded by a model.
+        """
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up cached vectors.
+
+        Args:
+            keys (List[str]): Cache keys (see key()).
+
+        Returns:
+            Dict[str, np.ndarray]: The vectors found, by key.
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing:
+                conn = self._connect()
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, found[key])
+                disk_hits = [key for key in missing if key in found]
+                if disk_hits:
+                    now = time.time_ns()
+                    conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in disk_hits])
+                    conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """
+        Stores vectors, evicting the least recently used ones if the cache is full.
+
+        Args:
+            vectors (Dict[str, np.ndarray]): Vectors by cache key.
+        """
+        if not vectors:
+            return
+        now = time.time_ns()
+        with self._lock:
+            conn = self._connect()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()]
+            )
+            self._count += conn.total_changes - before
+            if self._count > self.max_entries:
+                evict = self._count - self.max_entries + self.max_entries // 10
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (evict,)
+                )
+                self._count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            conn.commit()
+            for key, vector in vectors.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and sizes.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory), "disk_entries": self._count}
+
+    def clear_memory(self):
+        """
+        Drops the in-memory vectors (the disk cache is kept).
+        """
+        with self._lock:
+            self._memory.clear()
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Dependency-free embedding: signed feature hashing of words and word pairs, L2-normalized.
+    Much weaker than a neural model, but needs no download (offline or air-gapped setups).
+    """
+    _TOKEN = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            words = self._TOKEN.findall(text.lower())
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                code = zlib.crc32(feature.encode("utf-8"))
+                vector[code % self.dimensions] += 1.0 if code & 0x80000000 else -1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "dataguild_hashing"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(**config)
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function that serves repeated texts from an EmbeddingCache and embeds only
+    the misses, in one batch. It reports the wrapped function's name and config to Chroma, so
+    collections stay compatible with the uncached function.
+    """
+    def __init__(self, base: EmbeddingFunction, model: str, cache: EmbeddingCache):
+        """
+        Initialize the CachedEmbeddingFunction.
+
+        Args:
+            base (EmbeddingFunction): The embedding function to cache.
+            model (str): The model name (part of the cache key).
+            cache (EmbeddingCache): The cache.
+        """
+        self.base = base
+        self.model = model
+        self.cache = cache
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [self.cache.key(self.model, text) for text in input]
+        found = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, input) if key not in found}
+        if missing:
+            vectors = self.base(list(missing.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+            self.cache.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def name(self) -> str:
+        return self.base.name()
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.base.get_config()
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> EmbeddingFunction:
+        return get_embedding_function()
+
+class _SharedMiniLM(EmbeddingFunction[Documents]):
+    """
+    Chroma's default model (ONNX all-MiniLM-L6-v2) with one loaded session.
+    Chroma's DefaultEmbeddingFunction builds a new model, and so reloads the ONNX session, on every call.
+    Reported to Chroma as 'default', since the vectors are the same.
+    """
+    def __init__(self):
+        from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+        self.model = ONNXMiniLM_L6_V2()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.model(input)
+
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "_SharedMiniLM":
+        return _SharedMiniLM()
+
+def load_model(model: str) -> EmbeddingFunction:
+    """
+    Builds the embedding function for a model name.
+
+    Args:
+        model (str): 'all-MiniLM-L6-v2' (Chroma's ONNX model), 'hashing', or a sentence-transformers model name.
+
+    Returns:
+        EmbeddingFunction: The (uncached) embedding function.
+
+    Raises:
+        ImportError: If a sentence-transformers model is requested and the package is not installed.
+    """
+    if model == DEFAULT_MODEL:
+        return _SharedMiniLM()
+    if model == HASHING_MODEL:
+        return HashingEmbeddingFunction()
+    from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+    return SentenceTransformerEmbeddingFunction(model_name=model)
+
+_embedding_functions: Dict[str, EmbeddingFunction] = {}
+_embedding_lock = threading.Lock()
+
+def get_embedding_function(model: Optional[str] = None) -> EmbeddingFunction:
+    """
+    The process-wide embedding function for a model, built once and shared by every collection,
+    behind the embedding cache unless EMBEDDING_CACHE_ENABLED is off.
+
+    Args:
+        model (str, optional): The model name (defaults to config.MEMORY_EMBEDDING_MODEL).
+
+    Returns:
+        EmbeddingFunction: The embedding function.
+    """
+    requested = model or config.MEMORY_EMBEDDING_MODEL
+    with _embedding_lock:
+        if requested not in _embedding_functions:
+            model = requested
+            try:
+                function = load_model(model)
+            except ImportError as e:
+                get_stream_logger("MemoryBank").warning(f"Embedding model '{model}' unavailable ({e}); using {DEFAULT_MODEL}.")
+                model, function = DEFAULT_MODEL, load_model(DEFAULT_MODEL)
+            if config.EMBEDDING_CACHE_ENABLED:
+                function = CachedEmbeddingFunction(function, model, embedding_cache)
+            _embedding_functions[requested] = function
+        return _embedding_functions[requested]
+
+# Global instance
+embedding_cache = EmbeddingCache(
+    path=config.EMBEDDING_CACHE_PATH,
+    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+    memory_entries=config.EMBEDDING_CACHE_MEMORY_ENTRIES
+)
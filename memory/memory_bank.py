@@ -1,45 +1,213 @@
-import chromadb
-from chromadb.config import Settings
 import os
+import time
+import atexit
 import uuid
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
+from config import config
+from infrastructure.stream_handler import get_stream_logger
 
 class MemoryBank:
     """
     Manages long-term memory using ChromaDB.
     Stores insights, user preferences, and session summaries.
+    ChromaDB is imported and the client opened on first access, keeping CLI startup fast.
+
+    Writes are write-behind: `store_*` queues the document and returns at once, and a
+    background thread embeds and adds queued documents in bulk, one `add` per collection
+    per batch. Reads and `flush()` wait for queued writes, so they always see them.
     """
-    def __init__(self, persistence_path: str = "chroma_db"):
+    def __init__(self, persistence_path: str = "chroma_db", write_behind: bool = None,
+                 batch_size: int = None, flush_seconds: float = None, embedding_function=None):
         """
         Initialize the MemoryBank.
 
         Args:
             persistence_path (str): The path to the ChromaDB persistence directory.
+            write_behind (bool, optional): Queue writes for the background writer (False = write inline).
+            batch_size (int, optional): Queued documents that trigger a bulk write.
+            flush_seconds (float, optional): Longest time a queued document waits for its batch to fill.
+            embedding_function (EmbeddingFunction, optional): Defaults to the shared, cached model
+                from memory/embedding_cache.py (config.MEMORY_EMBEDDING_MODEL).
+        """
+        self.persistence_path = persistence_path
+        self.write_behind = config.MEMORY_WRITE_BEHIND if write_behind is None else write_behind
+        self.batch_size = batch_size or config.MEMORY_WRITE_BATCH_SIZE
+        self.flush_seconds = config.MEMORY_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.logger = get_stream_logger("MemoryBank")
+        self._embedding_function = embedding_function
+        self._client = None
+        self._collections = {}
+        self._lock = threading.Lock() # Guards client and collection creation
+        self._pending = [] # (collection name, id, document, metadata)
+        self._queued = 0 # Documents ever queued / written (or dropped), for flush()
+        self._written = 0
+        self._flush_waiters = 0
+        self._flush_target = 0 # Write at least this many without waiting for the batch to fill (request_flush)
+        self._closing = False
+        self._writer = None
+        self._cond = threading.Condition()
+
+    @property
+    def client(self):
+        """
+        The ChromaDB PersistentClient, opened on first use.
+        """
+        with self._lock:
+            if self._client is None:
+                import chromadb
+                self._client = chromadb.PersistentClient(path=self.persistence_path)
+        return self._client
+
+    def _collection(self, name: str):
+        if name not in self._collections:
+            client = self.client
+            with self._lock:
+                if self._embedding_function is None:
+                    from memory.embedding_cache import get_embedding_function
+                    self._embedding_function = get_embedding_function()
+                if name not in self._collections:
+                    self._collections[name] = client.get_or_create_collection(name=name, embedding_function=self._embedding_function)
+        return self._collections[name]
+
+    def _add(self, name: str, ids: List[str], documents: List[str], metadatas: List[Optional[Dict[str, Any]]]):
+        """
+        One bulk `add` (the documents are embedded here).
+        """
+        self._collection(name).add(
+            documents=documents,
+            metadatas=metadatas if any(metadatas) else None,
+            ids=ids
+        )
+
+    def _enqueue(self, name: str, document: str, metadata: Optional[Dict[str, Any]]) -> str:
+        """
+        Queues a document for the background writer (or writes it now if write-behind is off or the bank is closed).
+
+        Returns:
+            str: The document ID.
+        """
+        doc_id = str(uuid.uuid4())
+        with self._cond:
+            queue = self.write_behind and not self._closing
+            if queue:
+                self._pending.append((name, doc_id, document, metadata))
+                self._queued += 1
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="MemoryBankWriter", daemon=True)
+                    self._writer.start()
+                    # The writer is a daemon thread; don't lose its queue if close() is never called
+                    atexit.register(self.close)
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify_all()
+        if not queue:
+            self._add(name, [doc_id], [document], [metadata])
+        return doc_id
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                # Let the batch fill unless someone is waiting for it
+                deadline = time.monotonic() + self.flush_seconds
+                while (len(self._pending) < self.batch_size and not self._flush_waiters and not self._closing
+                       and self._written >= self._flush_target and time.monotonic() < deadline):
+                    self._cond.wait(deadline - time.monotonic())
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                if not batch:
+                    return # Closing with nothing left
+
+            by_collection = {}
+            for name, doc_id, document, metadata in batch:
+                by_collection.setdefault(name, []).append((doc_id, document, metadata))
+            for name, items in by_collection.items():
+                try:
+                    self._add(name, *[list(column) for column in zip(*items)])
+                except Exception as e:
+                    self.logger.error(f"Could not store {len(items)} document(s) in '{name}': {e}")
+
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
         """
-        self.client = chromadb.PersistentClient(path=persistence_path)
-        
-        # Collection for Insights (Analysis results)
-        self.insights_collection = self.client.get_or_create_collection(name="insights")
-        
-        # Collection for User Preferences
-        self.preferences_collection = self.client.get_or_create_collection(name="user_preferences")
-        
-        # Collection for Session Summaries (Context Compaction)
-        self.summaries_collection = self.client.get_or_create_collection(name="session_summaries")
+        Waits until every queued document is written.
+
+        Args:
+            timeout (float, optional): Longest time to wait, in seconds.
+
+        Returns:
+            bool: True if the queue was drained, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._queued
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._written < target:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+    def request_flush(self):
+        """
+        Asks the background writer to write everything queued so far now, without waiting for it.
+        """
+        with self._cond:
+            self._flush_target = self._queued
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        """
+        The number of documents queued but not yet written.
+        """
+        with self._cond:
+            return self._queued - self._written
+
+    def close(self):
+        """
+        Writes every queued document and stops the background writer.
+        """
+        self.flush()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.join()
+            atexit.unregister(self.close)
+
+    @property
+    def insights_collection(self):
+        """Collection for Insights (Analysis results)."""
+        return self._collection("insights")
+
+    @property
+    def preferences_collection(self):
+        """Collection for User Preferences."""
+        return self._collection("user_preferences")
+
+    @property
+    def summaries_collection(self):
+        """Collection for Session Summaries (Context Compaction)."""
+        return self._collection("session_summaries")
 
     def store_insight(self, content: str, metadata: Dict[str, Any] = None):
         """
-        Store an analytical insight.
+        Store an analytical insight (queued; written in the background).
 
         Args:
             content (str): The insight text.
             metadata (Dict[str, Any], optional): Metadata associated with the insight.
         """
-        self.insights_collection.add(
-            documents=[content],
-            metadatas=[metadata] if metadata else None,
-            ids=[str(uuid.uuid4())]
-        )
+        self._enqueue("insights", content, metadata)
 
     def retrieve_insights(self, query: str, n_results: int = 5) -> List[str]:
         """
@@ -52,6 +220,7 @@ class MemoryBank:
         Returns:
             List[str]: A list of relevant insights.
         """
+        self.flush()
         results = self.insights_collection.query(
             query_texts=[query],
             n_results=n_results
@@ -60,15 +229,12 @@ class MemoryBank:
 
     def store_preference(self, preference: str):
         """
-        Store a user preference.
+        Store a user preference (queued; written in the background).
 
         Args:
             preference (str): The user preference text.
         """
-        self.preferences_collection.add(
-            documents=[preference],
-            ids=[str(uuid.uuid4())]
-        )
+        self._enqueue("user_preferences", preference, None)
 
     def get_all_preferences(self) -> List[str]:
         """
@@ -79,6 +245,7 @@ class MemoryBank:
         """
         # Chroma doesn't have a 'get_all' easily without ID, so we query with a generic term or scan
         # For simplicity, we'll just query with "preference"
+        self.flush()
         results = self.preferences_collection.query(
             query_texts=["preference"],
             n_results=100 
@@ -87,17 +254,13 @@ class MemoryBank:
 
     def store_summary(self, summary: str, session_id: str):
         """
-        Store a session summary (Context Compaction).
+        Store a session summary (Context Compaction; queued, written in the background).
 
         Args:
             summary (str): The summary text.
             session_id (str): The ID of the session.
         """
-        self.summaries_collection.add(
-            documents=[summary],
-            metadatas=[{"session_id": session_id}],
-            ids=[str(uuid.uuid4())]
-        )
+        self._enqueue("session_summaries", summary, {"session_id": session_id})
 
     def get_session_summary(self, session_id: str) -> str:
         """
@@ -109,6 +272,7 @@ class MemoryBank:
         Returns:
             str: The session summary, or an empty string if not found.
         """
+        self.flush()
         results = self.summaries_collection.get(
             where={"session_id": session_id}
         )
@@ -67,6 +67,9 @@ class SessionManager:
             "name": getattr(self, "session_name", "Untitled Session")
         }
         self.session_service._save_session(self.current_session)
+        # Queued memory writes belong to the saved session too; the background writer sends them
+        # now, and close() on exit waits for them, so saving never blocks on embedding
+        self.memory_bank.request_flush()
         print(f"Session saved: {self.current_session.id}")
 
     def load_state(self, session_id: str = None):
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+# Tests import the packages the way main.py does, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dirs(tmp_path, monkeypatch):
+    """
+    Keeps file caches that are located through config at call time out of the working tree.
+    """
+    for name in ("DATASET_SNAPSHOT_DIR", "PROFILE_CACHE_DIR", "SAMPLE_CACHE_DIR", "RUN_MANIFEST_DIR"):
+        monkeypatch.setattr(config, name, str(tmp_path / "cache" / name.lower()))
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from agents.refinery import find_aggregates
+from tools.data_ops import ChunkedWriter
+
+@pytest.mark.parametrize("code,expected", [
+    ("df['a'] = df['a'].fillna(df['a'].median())", ["median"]),
+    ("df['a'] = df['a'].fillna(np.median(df['a']))", ["median"]),
+    ("col = df['a']\ndf['a'] = col.fillna(col.mean())", ["mean"]),
+    ("df = df.drop_duplicates().sort_values('a')", ["drop_duplicates", "sort_values"]),
+    ("df['a'] = df['a'].fillna(stats['a']['approx_median'])", []),
+    ("mid = np.mean([stats['a']['min'], stats['a']['max']])\ndf['a'] = df['a'].fillna(mid)", []),
+])
+def test_find_aggregates_only_counts_calls_on_the_frame(code, expected):
+    assert find_aggregates(code) == expected
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_chunked_writer_widens_the_schema(tmp_path, file_format):
+    writer = ChunkedWriter(str(tmp_path / "out"), file_format)
+    writer.write(pd.DataFrame({"count": [1, 2], "note": [None, None], "label": ["a", "b"]}))
+    writer.write(pd.DataFrame({"label": ["c", None], "count": [3.0, np.nan], "note": [None, None]}))
+    writer.write(pd.DataFrame({"count": [4.5, 5.0], "note": [1.5, 2.0], "label": ["d", "e"]}))
+    path = writer.close()
+
+    df = pd.read_parquet(path) if file_format == "parquet" else pd.read_feather(path)
+    assert writer.rows == len(df) == 6
+    assert df["count"].tolist()[:3] == [1.0, 2.0, 3.0] and df["count"].tolist()[4:] == [4.5, 5.0]
+    assert df["note"].dtype == np.float64
+    assert df["label"].tolist()[4:] == ["d", "e"]
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+def test_chunked_writer_rejects_incompatible_chunks(tmp_path):
+    writer = ChunkedWriter(str(tmp_path / "out"), "parquet")
+    writer.write(pd.DataFrame({"count": [1, 2]}))
+    with pytest.raises(Exception):
+        writer.write(pd.DataFrame({"count": ["many"]}))
+    writer.abort()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,59 @@
+import time
+import asyncio
+import pytest
+from infrastructure.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retries
+
+def trip(breaker: CircuitBreaker):
+    breaker.record_failure(breaker.admit())
+    breaker.record_failure(breaker.admit())
+    assert breaker.state == "open" and breaker.admit() is None
+    time.sleep(0.02)
+
+@pytest.fixture
+def breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.01)
+    trip(breaker)
+    return breaker
+
+def test_only_one_caller_gets_the_trial(breaker):
+    trial = breaker.admit()
+    assert trial > 0
+    assert breaker.admit() is None
+
+def test_a_late_normal_call_does_not_end_the_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.01)
+    early = breaker.admit()
+    trip(breaker)
+    trial = breaker.admit()
+    # A call admitted before the circuit opened fails or is cancelled while the trial runs
+    breaker.record_failure(early)
+    breaker.release(early)
+    assert breaker.state == "half_open" and breaker.admit() is None
+
+    breaker.record_failure(trial)
+    assert breaker.state == "open"
+
+def test_stale_trial_ticket_is_ignored(breaker):
+    stale = breaker.admit()
+    breaker.record_success(0) # a late normal call proves the service is back
+    trip(breaker)
+    trial = breaker.admit()
+    breaker.release(stale)
+    assert trial != stale and breaker.admit() is None
+    breaker.record_success(trial)
+    assert breaker.state == "closed" and breaker.admit() == 0
+
+def test_cancelled_trial_frees_the_slot(breaker):
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        task = asyncio.create_task(call_with_retries(hang, RetryPolicy(0, 0, 0), breaker))
+        await asyncio.sleep(0.01)
+        with pytest.raises(CircuitOpenError):
+            await call_with_retries(hang, RetryPolicy(0, 0, 0), breaker)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert breaker.admit() > 0
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from infrastructure.dataset_cache import DatasetCache
+
+def test_dataset_cache_hits_until_the_file_changes(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"a": range(100)}).to_csv(path, index=False)
+    cache = DatasetCache(max_bytes=1 << 20)
+    assert cache.get(str(path)) is cache.get(str(path))
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+    pd.DataFrame({"a": range(50)}).to_csv(path, index=False)
+    assert len(cache.get(str(path))) == 50
+    assert cache.stats()["entries"] == 1 and cache.stats()["misses"] == 2
+
+def test_dataset_cache_evicts_least_recently_used(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        paths.append(str(tmp_path / f"{name}.csv"))
+        pd.DataFrame({"x": np.arange(1000, dtype=float)}).to_csv(paths[-1], index=False)
+    one = int(pd.read_csv(paths[0]).memory_usage(deep=True).sum())
+    cache = DatasetCache(max_bytes=2 * one)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+    assert cache.peek(paths[1]) is None
+    assert cache.peek(paths[0]) is not None and cache.peek(paths[2]) is not None
+
+    big = DatasetCache(max_bytes=1)
+    assert big.get(paths[0]) is big.peek(paths[0]) # kept alone even above the budget
@@ -0,0 +1,23 @@
+import numpy as np
+from memory.embedding_cache import CachedEmbeddingFunction, EmbeddingCache, HashingEmbeddingFunction
+
+def test_embedding_cache_serves_repeats_and_evicts(tmp_path):
+    calls = []
+    base = HashingEmbeddingFunction(dimensions=16)
+    def counting(texts):
+        calls.append(list(texts))
+        return base(texts)
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=10, memory_entries=2)
+    embed = CachedEmbeddingFunction(counting, "hashing", cache)
+
+    first = embed(["a", "b", "a"])
+    second = embed(["b", "c"])
+    assert calls == [["a", "b"], ["c"]]
+    np.testing.assert_array_equal(first[1], second[0])
+    assert cache.stats()["hits"] == 1 and cache.stats()["memory_entries"] == 2
+
+    cache.clear_memory()
+    embed(["a"]) # served from disk
+    assert len(calls) == 2
+    embed([f"text {i}" for i in range(12)])
+    assert cache.stats()["disk_entries"] <= 10
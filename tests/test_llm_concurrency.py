@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+import agents.base_agent as base_agent
+from agents.base_agent import BaseAgent, set_llm_concurrency
+from benchmarks.fake_llm import use_fake_model
+from config import config
+from infrastructure.key_pool import KeyPool
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = KeyPool(["key-a", "key-b"], rpm=1e9, max_concurrency=1, cooldown_seconds=1.0)
+    monkeypatch.setattr(base_agent, "key_pool", pool)
+    set_llm_concurrency(1)
+    yield pool
+    set_llm_concurrency(config.MAX_CONCURRENT_LLM_CALLS)
+
+def test_waiting_for_a_key_does_not_hold_a_slot(pool):
+    waiting = use_fake_model(BaseAgent("Waiting"), latency=0, reply="late")
+    ready = use_fake_model(BaseAgent("Ready"), latency=0, reply="now")
+    pool.report_rate_limited("key-a")
+
+    async def scenario():
+        usage = {"prompt_tokens": 0, "response_tokens": 0}
+        # Only key-a is acceptable to the first call, and it is cooling down
+        blocked = asyncio.create_task(waiting._run_model("q", dict(usage), {"key-b"}))
+        await asyncio.sleep(0.05)
+        answer = await ready._run_model("q", dict(usage), set())
+        # With the slot held while waiting for key-a, this call could only finish after the blocked one
+        finished_first = not blocked.done()
+        return answer, finished_first, await blocked
+
+    answer, finished_first, late = asyncio.run(scenario())
+    assert (answer, late) == ("now", "late")
+    assert finished_first
@@ -0,0 +1,66 @@
+import os
+import time
+import base64
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import infrastructure.mcp_server as mcp_server
+from infrastructure.data_catalog import DataCatalog
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "data_storage"
+    directory.mkdir()
+    monkeypatch.setattr(mcp_server, "DATA_DIR", str(directory))
+    monkeypatch.setattr(mcp_server, "data_catalog", DataCatalog(str(directory), str(tmp_path / "catalog.sqlite3")))
+    return directory
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet"])
+def test_cursor_pages_through_matching_rows(data_dir, suffix):
+    df = pd.DataFrame({"id": np.arange(250), "group": np.arange(250) % 3, "value": np.arange(250) * 0.5})
+    path = data_dir / f"rows.{suffix}"
+    df.to_csv(path, index=False) if suffix == "csv" else df.to_parquet(path, index=False)
+
+    pages, cursor = [], None
+    while True:
+        page = mcp_server.read_rows(f"rows.{suffix}", limit=40, columns=["id", "value"], filters=[["group", "==", 1]], cursor=cursor)
+        assert "error" not in page, page
+        assert page["columns"] == ["id", "value"] and page["rows"] <= 40
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    ids = [row["id"] for page in pages for row in page["data"]]
+    assert ids == df.loc[df["group"] == 1, "id"].tolist()
+    assert [page["offset"] for page in pages] == [0, 40, 80]
+
+def test_offset_and_formats(data_dir):
+    pd.DataFrame({"id": range(10), "name": list("abcdefghij")}).to_csv(data_dir / "small.csv", index=False)
+    page = mcp_server.read_rows("small.csv", offset=8, limit=5, format="csv")
+    assert page["data"] == "id,name\n8,i\n9,j\n" and page["next_cursor"] is None
+
+    import pyarrow as pa
+    page = mcp_server.read_rows("small.csv", limit=3, format="arrow")
+    table = pa.ipc.open_stream(base64.b64decode(page["data"])).read_all()
+    assert table.column("name").to_pylist() == ["a", "b", "c"] and page["next_cursor"]
+
+def test_stale_and_invalid_cursors_are_rejected(data_dir):
+    path = data_dir / "feed.csv"
+    pd.DataFrame({"id": range(10)}).to_csv(path, index=False)
+    cursor = mcp_server.read_rows("feed.csv", limit=4)["next_cursor"]
+    assert mcp_server.read_rows("feed.csv", limit=4, cursor=cursor)["offset"] == 4
+
+    with open(path, "a") as f:
+        f.write("10\n")
+    stamp = time.time() + 5
+    os.utime(path, (stamp, stamp))
+    assert "stale" in mcp_server.read_rows("feed.csv", limit=4, cursor=cursor)["error"]
+    assert mcp_server.read_rows("feed.csv", cursor="not-a-cursor")["error"] == "Invalid cursor"
+    forged = base64.urlsafe_b64encode(json.dumps({"offset": 0}).encode()).decode()
+    assert "stale" in mcp_server.read_rows("feed.csv", cursor=forged)["error"]
+
+def test_missing_file_and_bad_format(data_dir):
+    assert mcp_server.read_rows("absent.csv") == {"error": "File not found"}
+    pd.DataFrame({"id": [1]}).to_csv(data_dir / "one.csv", index=False)
+    assert "Unsupported format" in mcp_server.read_rows("one.csv", format="xml")["error"]
@@ -0,0 +1,20 @@
+import time
+from memory.memory_bank import MemoryBank
+
+def test_request_flush_writes_queued_documents_without_waiting(monkeypatch):
+    bank = MemoryBank(write_behind=True, batch_size=100, flush_seconds=30)
+    written = []
+    monkeypatch.setattr(bank, "_add", lambda name, ids, documents, metadatas: written.append((name, documents)))
+    bank.store_summary("first", "s1")
+    bank.store_preference("short answers")
+
+    start = time.perf_counter()
+    bank.request_flush()
+    assert time.perf_counter() - start < 0.1
+    for _ in range(100):
+        if not bank.pending():
+            break
+        time.sleep(0.01)
+    assert bank.pending() == 0
+    assert sorted(written) == [("session_summaries", ["first"]), ("user_preferences", ["short answers"])]
+    bank.close()
@@ -0,0 +1,38 @@
+import sqlite3
+import pandas as pd
+from agents.refinery import output_mismatch
+from infrastructure.plan_store import PlanStore
+
+def test_output_signature_uses_dtype_kinds():
+    df = pd.DataFrame({"n": [1, 2], "x": [1.5, None], "flag": [True, False], "when": pd.to_datetime(["2024-01-01", None]), "name": ["a", "b"], "note": [None, None]})
+    assert PlanStore.output_signature(df) == [["n", "number"], ["x", "number"], ["flag", "bool"], ["when", "datetime"], ["name", "text"], ["note", "empty"]]
+
+def test_output_mismatch():
+    expected = PlanStore.output_signature(pd.DataFrame({"n": [1, 2], "name": ["a", "b"], "note": [None, None]}))
+    assert output_mismatch(pd.DataFrame({"name": ["c"], "n": [3.5], "note": [1.0]}), expected) == ""
+    assert output_mismatch(pd.DataFrame({"n": [None], "name": [None], "note": [None]}), expected) == ""
+    assert "missing ['note']" in output_mismatch(pd.DataFrame({"n": [1], "name": ["c"]}), expected)
+    assert "unexpected ['extra']" in output_mismatch(pd.DataFrame({"n": [1], "name": ["c"], "note": [None], "extra": [0]}), expected)
+    assert "n: text instead of number" in output_mismatch(pd.DataFrame({"n": ["1"], "name": ["c"], "note": [None]}), expected)
+
+def test_put_get_round_trip(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.db"))
+    store.put("fp", "Drop nulls", "df = df.dropna()", "feed.csv", [["a", "number"]])
+    assert store.get("fp") == {"explanation": "Drop nulls", "code": "df = df.dropna()", "source": "feed.csv", "uses": 0, "output_signature": [["a", "number"]]}
+    assert store.get("other") is None
+
+def test_legacy_store_is_migrated_and_its_plans_regenerated(tmp_path):
+    path = str(tmp_path / "plans.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE plans (fingerprint TEXT PRIMARY KEY, explanation TEXT NOT NULL, code TEXT NOT NULL, "
+        "source TEXT, created REAL NOT NULL, last_used REAL NOT NULL, uses INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute("INSERT INTO plans VALUES ('fp', 'old', 'df = df', NULL, 0, 0, 3)")
+    conn.commit()
+    conn.close()
+
+    store = PlanStore(path)
+    assert store.get("fp") is None
+    store.put("fp", "new", "df = df", None, [["a", "text"]])
+    assert store.get("fp")["explanation"] == "new"
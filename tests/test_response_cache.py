@@ -0,0 +1,30 @@
+import time
+from infrastructure.response_cache import ResponseCache
+
+def test_response_cache_hit_miss_and_expiry(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl_seconds=0.2, max_bytes=1 << 20)
+    key = ResponseCache.make_key("model", "instruction", ["b", "a"], "prompt")
+    assert key == ResponseCache.make_key("model", "instruction", ["a", "b"], "prompt")
+    assert key != ResponseCache.make_key("model", "instruction", ["a", "b"], "other prompt")
+    assert cache.get(key) is None
+    cache.put(key, "answer")
+    assert cache.get(key) == "answer"
+    cache.delete(key)
+    assert cache.get(key) is None
+
+    cache.put(key, "answer")
+    time.sleep(0.25)
+    assert cache.get(key) is None
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl_seconds=3600, max_bytes=30)
+    cache.put("old", "x" * 10)
+    cache.put("used", "y" * 10)
+    cache.put("new", "z" * 10)
+    time.sleep(0.01)
+    assert cache.get("old") == "x" * 10 # now more recently used than 'used'
+    cache.put("newest", "w" * 10)
+    assert cache.get("used") is None
+    assert [cache.get(k) is not None for k in ("old", "new", "newest")] == [True, True, True]
+    cache.put("huge", "h" * 31)
+    assert cache.get("huge") is None
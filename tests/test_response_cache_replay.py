@@ -0,0 +1,51 @@
+import json
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+import agents.base_agent as base_agent
+from agents.analyst_squad import Analyst, LeadAnalyst
+from benchmarks.fake_llm import use_fake_model
+from infrastructure.code_executor import code_executor
+from infrastructure.observability import trace_logger, current_session_id
+from infrastructure.response_cache import ResponseCache
+
+# Parses both as CodeGeneration and as AnalysisInsight
+REPLY = json.dumps({
+    "thought_process": "Describe the column.",
+    "code": "print(df['sales'].describe())\nfig = plt.figure()\nplt.hist(df['sales'])\nplt.savefig(plot_path)\nplt.close()",
+    "key_finding": "Sales are spread evenly.",
+    "detailed_interpretation": "Mean and median agree.",
+    "visual_pattern": "Flat histogram."
+})
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl_seconds=3600, max_bytes=1 << 24)
+    monkeypatch.setattr(base_agent, "response_cache", cache)
+    yield cache
+    code_executor.shutdown()
+
+def model_calls(session_id: str) -> int:
+    return int(sum(s["calls"] - s["cache_hits"] for s in trace_logger.pop_usage(session_id).values()))
+
+def test_second_session_replays_without_model_calls(tmp_path, cache):
+    data = tmp_path / "sales.csv"
+    pd.DataFrame({"sales": np.arange(200) % 17}).to_csv(data, index=False)
+    analyst = use_fake_model(Analyst("UnivariateAgent", "Univariate"), latency=0, reply=REPLY)
+    lead = use_fake_model(LeadAnalyst(), latency=0, reply=json.dumps({"is_complete": True, "reasoning": "Done."}))
+
+    async def run(session: str):
+        current_session_id.set(session)
+        plot_dir = str(tmp_path / session)
+        finding = await analyst.execute_task(str(data), {"sales": "int"}, "Describe sales.", "chart_1234.png", plot_dir=plot_dir)
+        await lead.review_and_plan({"findings": {"Univariate": finding}}, {"sales": "int"}, 0)
+        return finding
+
+    first = asyncio.run(run("first-session"))
+    assert model_calls("first-session") == 3 # code, insight, plan
+    second = asyncio.run(run("second-session"))
+    assert model_calls("second-session") == 0
+    # The replayed code still ran and wrote the chart into the new session's directory
+    assert second["plot"].endswith("second-session/chart_1234.png")
+    assert first["insight"] == second["insight"]
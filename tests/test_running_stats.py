@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from infrastructure.run_manifest import csv_record_offset, fingerprint_source
+from tools.running_stats import RunningStats, drifted_analyses
+
+@pytest.fixture
+def sparse_frame():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.normal(size=(1000, 3)) * [1, 5, 10] + [0, 100, 1e6], columns=["a", "b", "c"])
+    df.loc[rng.random(1000) < 0.2, "a"] = np.nan
+    df.loc[rng.random(1000) < 0.3, "b"] = np.nan
+    df["empty"] = np.nan
+    df["count"] = pd.array(rng.integers(0, 9, 1000), dtype="Int64")
+    df.loc[::7, "count"] = pd.NA
+    df["label"] = "x"
+    return df
+
+def assert_matches_pandas(stats: RunningStats, df: pd.DataFrame):
+    numeric = df.select_dtypes(include="number").astype(float)
+    assert stats.columns == list(numeric.columns)
+    assert stats.rows == len(df)
+    np.testing.assert_array_equal(stats.n, numeric.notna().sum().to_numpy())
+    np.testing.assert_allclose(stats.mean, numeric.mean().to_numpy())
+    np.testing.assert_allclose(stats.std, numeric.std(ddof=0).fillna(0).to_numpy())
+    np.testing.assert_allclose(stats.correlation(), numeric.corr().to_numpy())
+    np.testing.assert_allclose(stats.min, numeric.min().to_numpy())
+    np.testing.assert_allclose(stats.max, numeric.max().to_numpy())
+
+def test_from_frame_skips_missing_values_per_column(sparse_frame):
+    assert_matches_pandas(RunningStats.from_frame(sparse_frame), sparse_frame)
+
+def test_merged_chunks_equal_whole_frame(sparse_frame):
+    parts = [RunningStats.from_frame(sparse_frame.iloc[i:i + 137]) for i in range(0, len(sparse_frame), 137)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merge(part)
+    assert_matches_pandas(merged, sparse_frame)
+    assert_matches_pandas(RunningStats.from_dict(merged.to_dict()), sparse_frame)
+
+def test_from_file_matches_pandas(sparse_frame, tmp_path):
+    path = tmp_path / "data.csv"
+    sparse_frame.to_csv(path, index=False)
+    assert_matches_pandas(RunningStats.from_file(str(path), 250), pd.read_csv(path))
+
+def test_merge_rejects_different_columns():
+    with pytest.raises(ValueError):
+        RunningStats.from_frame(pd.DataFrame({"a": [1.0]})).merge(RunningStats.from_frame(pd.DataFrame({"b": [1.0]})))
+
+def test_legacy_dict_is_expanded():
+    legacy = {"columns": ["a", "b"], "rows": 3, "n": 3, "mean": [1.0, 2.0],
+              "comoment": [[2.0, 1.0], [1.0, 2.0]], "min": [0.0, None], "max": [2.0, None]}
+    stats = RunningStats.from_dict(legacy)
+    np.testing.assert_allclose(stats.mean, [1.0, 2.0])
+    np.testing.assert_allclose(stats.correlation(), [[1.0, 0.5], [0.5, 1.0]])
+
+def test_drift_detection():
+    rng = np.random.default_rng(1)
+    base = pd.DataFrame({"a": rng.normal(size=500), "b": rng.normal(size=500)})
+    baseline = RunningStats.from_frame(base)
+    assert drifted_analyses(baseline, baseline, 0.05) == []
+    shifted = baseline.merge(RunningStats.from_frame(base + 10))
+    assert drifted_analyses(baseline, shifted, 0.05) == ["Univariate", "Bivariate", "Trend"]
+
+def test_csv_record_offset_counts_records_not_lines(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_bytes(b'a,b\n1,"x\ny"\n\n2,z\r\n3,w\n4,par')
+    assert [csv_record_offset(str(path), rows) for rows in range(5)] == [4, 12, 18, 22, None]
+
+    source = fingerprint_source(str(path), rows=2)
+    assert source["source_size"] == 18
+    assert source["columns"] == ["a", "b"]
+    with pytest.raises(ValueError):
+        fingerprint_source(str(path), rows=4)
@@ -0,0 +1,47 @@
+import os
+import asyncio
+import pytest
+from config import config
+from infrastructure.server import SessionHost
+
+@pytest.fixture
+def host(tmp_path, monkeypatch):
+    # Sessions and charts are stored relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "DATA_DIR", str(tmp_path / "data_storage"))
+    os.makedirs(config.DATA_DIR)
+    return SessionHost(max_sessions=4, idle_timeout=0.05, evict_interval=0.05)
+
+def test_describe_has_no_side_effects(host, tmp_path):
+    async def scenario():
+        hosted = await host.open()
+        return hosted.describe()
+    described = asyncio.run(scenario())
+    assert described["plot_dir"].endswith(described["session_id"])
+    assert not (tmp_path / "static").exists()
+
+def test_tenant_files_resolve_inside_data_dir(host):
+    async def scenario():
+        hosted = await host.open()
+        orchestrator = hosted.orchestrator
+        assert orchestrator._resolve_input("/etc/secrets/payroll.csv") == os.path.join(config.DATA_DIR, "payroll.csv")
+        assert orchestrator._resolve_input("../../payroll.csv") == os.path.join(config.DATA_DIR, "payroll.csv")
+        return await orchestrator.refresh_dataset(__file__), orchestrator.last_error
+    response, last_error = asyncio.run(scenario())
+    assert response == last_error == f"Error: {__file__} not found."
+
+def test_idle_sessions_are_evicted_without_new_opens(host):
+    async def scenario():
+        hosted = await host.open()
+        evictor = asyncio.create_task(host.evict_idle_periodically())
+        try:
+            for _ in range(50):
+                if hosted.session_id not in host.sessions:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            evictor.cancel()
+        return hosted.session_id
+    session_id = asyncio.run(scenario())
+    assert session_id not in host.sessions
+    assert any(session_id in name for name in os.listdir("session_storage"))
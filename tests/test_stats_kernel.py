@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from tools.correlation import correlate
+from tools.stats_kernel import bivariate_stats, phase1_stats, univariate_stats, _numeric_matrix
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(rng.normal(size=(3000, 5)) + [0, 1e6, 0, 5, -5], columns=["a", "b", "c", "d", "e"])
+    df["f"] = 2 * df["a"] + rng.normal(size=3000) * 0.1
+    df["g"] = df["b"] - 1e6 + df["c"]
+    df.loc[rng.random(3000) < 0.15, "c"] = np.nan
+    df.loc[rng.random(3000) < 0.05, "d"] = np.nan
+    df["flag"] = rng.random(3000) < 0.5
+    df["name"] = "x"
+    return df
+
+def test_univariate_matches_pandas(frame):
+    columns, X = _numeric_matrix(frame)
+    stats = univariate_stats(columns, X)
+    numeric = frame[columns]
+    for col in columns:
+        assert stats[col]["count"] == numeric[col].count()
+        assert stats[col]["mean"] == pytest.approx(numeric[col].mean())
+        assert stats[col]["std"] == pytest.approx(numeric[col].std())
+        assert stats[col]["median"] == pytest.approx(numeric[col].median())
+        assert stats[col]["skew"] == pytest.approx(numeric[col].skew())
+        assert stats[col]["kurtosis"] == pytest.approx(numeric[col].kurt())
+
+@pytest.mark.parametrize("block_size,workers", [(64, 1), (2, 1), (3, 4)])
+def test_pearson_matrix_matches_pandas(frame, block_size, workers):
+    result = correlate(frame, output="array", block_size=block_size, workers=workers)
+    expected = frame.select_dtypes(include="number", exclude="bool").corr()
+    assert result["columns"] == list(expected.columns)
+    assert result["matrix"].dtype == np.float32
+    np.testing.assert_allclose(result["matrix"], expected.to_numpy(), atol=1e-5)
+
+def kendall_tau_b(x: np.ndarray, y: np.ndarray) -> float:
+    i, j = np.triu_indices(len(x), k=1)
+    dx, dy = np.sign(x[i] - x[j]), np.sign(y[i] - y[j])
+    return (dx * dy).sum() / np.sqrt((dx * dx).sum() * (dy * dy).sum())
+
+def test_spearman_matches_pearson_of_ranks(frame):
+    complete = frame.drop(columns=["c", "d"])
+    result = correlate(complete, method="spearman", output="array", sample_rows=0)
+    expected = complete.select_dtypes(include="number", exclude="bool").rank().corr()
+    np.testing.assert_allclose(result["matrix"], expected.to_numpy(), atol=1e-5)
+
+def test_kendall_tau_b_with_ties(frame):
+    sample = frame[["a", "e", "f"]].head(200).round(1)
+    result = correlate(sample, method="kendall", output="array", sample_rows=0)
+    values = sample.to_numpy()
+    for i in range(3):
+        for j in range(3):
+            assert result["matrix"][i, j] == pytest.approx(kendall_tau_b(values[:, i], values[:, j]), abs=1e-5)
+
+def test_top_k_and_edges(frame):
+    expected = frame.select_dtypes(include="number", exclude="bool").corr()
+    top = correlate(frame, output="top_k", top_k=2)
+    assert [(p["x"], p["y"]) for p in top["pairs"]] == [("a", "f"), ("c", "g")]
+    assert top["pairs"][0]["r"] == pytest.approx(expected.loc["a", "f"], abs=1e-4)
+    assert top["pairs"][1]["n"] == frame["c"].count()
+    assert top["pairs_tested"] == 21
+
+    edges = correlate(frame, output="edges", threshold=0.5)
+    assert {(p["x"], p["y"]) for p in edges["pairs"]} == {("a", "f"), ("c", "g"), ("b", "g")}
+    assert not edges["truncated"]
+
+def test_bivariate_reports_covariance_and_p_values(frame):
+    columns, X = _numeric_matrix(frame)
+    stats = bivariate_stats(columns, X, top_k=3)
+    numeric = frame[columns]
+    assert stats["pairs_tested"] == 21
+    for pair in stats["top_pairs"]:
+        assert pair["pearson_r"] == pytest.approx(numeric[pair["x"]].corr(numeric[pair["y"]]), abs=1e-4)
+        assert pair["covariance"] == pytest.approx(numeric[pair["x"]].cov(numeric[pair["y"]]))
+        assert pair["p_value"] < 1e-6
+
+def test_phase1_skips_bivariate_for_one_column():
+    stats = phase1_stats(pd.DataFrame({"a": [1.0, 2.0, 3.0], "label": ["x", "y", "z"]}))
+    assert stats["Bivariate"] is None
+    assert stats["Univariate"]["numeric_columns"] == 1
@@ -0,0 +1,226 @@
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from config import config
+
+METHODS = ("pearson", "spearman", "kendall")
+OUTPUTS = ("top_k", "edges", "array")
+
+def _prepare(numeric: pd.DataFrame, block_size: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Centers (and, without missing values, normalizes) the columns into one float32 matrix.
+    Columns are converted one block at a time: each block is centered in float64, which keeps
+    the precision of large offsets, and only the float32 result is kept for the whole frame.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: The transformed matrix and the presence mask
+        (None when nothing is missing, so a block is a single matrix product).
+    """
+    rows, width = numeric.shape
+    Z = np.empty((rows, width), dtype=np.float32)
+    M = None
+    norms = np.empty(width, dtype=np.float64)
+    for start in range(0, width, block_size):
+        stop = min(start + block_size, width)
+        X = numeric.iloc[:, start:stop].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(X)
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning) # All-NaN columns
+            centered = np.where(present, X - np.nanmean(X, axis=0), 0.0)
+        norms[start:stop] = np.linalg.norm(centered, axis=0)
+        Z[:, start:stop] = centered
+        if not present.all():
+            if M is None:
+                M = np.ones((rows, width), dtype=np.float32)
+            M[:, start:stop] = present
+    if M is None:
+        # Unit-norm columns: the correlation block is just Za.T @ Zb
+        with np.errstate(invalid="ignore", divide="ignore"):
+            Z /= norms.astype(np.float32)
+    return Z, M
+
+def _pairwise_signs(X: np.ndarray, rows: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Signs of every row-pair difference, per column: Kendall's tau-b is the cosine of these vectors.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: The sign matrix (row pairs x columns, 0 for ties and
+        missing values) and the mask of row pairs present in a column (None when nothing is missing).
+    """
+    X = X.astype(np.float32)
+    D = X[rows[0]]
+    D -= X[rows[1]]
+    valid = ~np.isnan(D)
+    S = np.sign(D)
+    if valid.all():
+        return S, None
+    return np.nan_to_num(S, copy=False), valid.astype(np.float32)
+
+def _block(Za: np.ndarray, Ma: Optional[np.ndarray], Zb: np.ndarray, Mb: Optional[np.ndarray],
+           n_rows: int, centered: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Correlations between two column blocks over pairwise-complete rows.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (coefficients, pair counts), each block_a x block_b.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if Ma is None and Mb is None:
+            if centered:
+                # Columns are already unit-norm
+                r = Za.T @ Zb
+            else:
+                r = (Za.T @ Zb) / np.sqrt(np.outer((Za * Za).sum(axis=0), (Zb * Zb).sum(axis=0)))
+            return r, np.full(r.shape, n_rows, dtype=np.float32)
+
+        Ma = np.ones_like(Za) if Ma is None else Ma
+        Mb = np.ones_like(Zb) if Mb is None else Mb
+        n = Ma.T @ Mb
+        co = Za.T @ Zb
+        var_a = (Za * Za).T @ Mb
+        var_b = Ma.T @ (Zb * Zb)
+        if centered:
+            # Means of the pairwise-complete rows differ from the column means
+            sum_a = Za.T @ Mb
+            sum_b = Ma.T @ Zb
+            co = co - sum_a * sum_b / n
+            var_a = var_a - sum_a ** 2 / n
+            var_b = var_b - sum_b ** 2 / n
+        r = co / np.sqrt(var_a * var_b)
+        if not centered:
+            # Kendall counts row pairs; c complete rows form c(c-1)/2 of them
+            n = (1 + np.sqrt(1 + 8 * n)) / 2
+    return r, n
+
+def _select(r: np.ndarray, n: np.ndarray, offset_a: int, offset_b: int, diagonal: bool,
+            output: str, top_k: int, threshold: float, min_periods: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Keeps the entries of one block that can appear in the result (upper triangle only).
+
+    Returns:
+        Tuple[np.ndarray, ..., int]: (column a indices, column b indices, coefficients, pair counts,
+        number of pairs with a coefficient in the block).
+    """
+    keep = np.isfinite(r) & (n >= min_periods)
+    if diagonal:
+        keep &= np.triu(np.ones(r.shape, dtype=bool), k=1)
+    tested = int(keep.sum())
+    if output == "edges":
+        keep &= np.abs(r) >= threshold
+    ia, ib = np.nonzero(keep)
+    values = r[ia, ib]
+    if output == "top_k" and len(values) > top_k:
+        best = np.argpartition(-np.abs(values), top_k - 1)[:top_k]
+        ia, ib, values = ia[best], ib[best], values[best]
+    return ia + offset_a, ib + offset_b, values, n[ia, ib], tested
+
+def _sample(df: pd.DataFrame, rows: int, random_state: int) -> pd.DataFrame:
+    if rows and len(df) > rows:
+        return df.sample(n=rows, random_state=random_state)
+    return df
+
+def correlate(df: pd.DataFrame, method: str = "pearson", output: str = "top_k", top_k: int = 20,
+              threshold: float = 0.5, min_periods: int = 3, block_size: int = None, workers: int = None,
+              sample_rows: int = None, random_state: int = 0) -> Dict[str, Any]:
+    """
+    Correlates the numeric columns of a DataFrame in float32 column blocks, optionally on several
+    threads, without ever building the dense nested dict of `DataFrame.corr().to_dict()`.
+    Missing values are handled pairwise, like pandas.
+
+    Pearson uses every row. Spearman ranks a random sample of `sample_rows` rows
+    (config.CORRELATION_SAMPLE_ROWS) and Kendall (tau-b) a smaller one (config.CORRELATION_KENDALL_ROWS),
+    since it compares every pair of sampled rows.
+
+    Args:
+        df (pd.DataFrame): The DataFrame; non-numeric and boolean columns are ignored.
+        method (str): 'pearson', 'spearman' or 'kendall'.
+        output (str): 'top_k' (strongest pairs by |r|), 'edges' (every pair with |r| >= threshold,
+            at most config.CORRELATION_MAX_EDGES, strongest first) or 'array' (float32 matrix).
+        top_k (int): Pairs to return for 'top_k'.
+        threshold (float): Minimum |r| for 'edges'.
+        min_periods (int): Minimum pairwise-complete rows for a pair to be reported.
+        block_size (int, optional): Columns per block (default config.CORRELATION_BLOCK_SIZE).
+        workers (int, optional): Threads computing blocks (default config.CORRELATION_WORKERS; 1 = serial).
+        sample_rows (int, optional): Rows to sample for Spearman/Kendall (0 = use all rows).
+        random_state (int): Seed of the row sample.
+
+    Returns:
+        Dict[str, Any]: 'method', 'rows' (rows used), 'sampled', 'numeric_columns' and either
+        'pairs' ([{'x', 'y', 'r', 'n'}], 'pairs_tested', plus 'truncated' for edges) or 'columns' and 'matrix'.
+
+    Raises:
+        ValueError: If the method or output is not supported.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unsupported correlation method: {method}")
+    if output not in OUTPUTS:
+        raise ValueError(f"Unsupported correlation output: {output}")
+
+    numeric = df.select_dtypes(include="number", exclude="bool")
+    total_rows = len(numeric)
+    if method == "spearman":
+        numeric = _sample(numeric, config.CORRELATION_SAMPLE_ROWS if sample_rows is None else sample_rows, random_state)
+        numeric = numeric.rank()
+    elif method == "kendall":
+        numeric = _sample(numeric, config.CORRELATION_KENDALL_ROWS if sample_rows is None else sample_rows, random_state)
+    columns = [str(c) for c in numeric.columns]
+    rows = len(numeric)
+    result = {"method": method, "rows": rows, "sampled": rows < total_rows, "numeric_columns": len(columns)}
+
+    block_size = block_size or config.CORRELATION_BLOCK_SIZE
+    if method == "kendall":
+        # Row pairs x block columns must stay small; this keeps each sign matrix around 32 MB at 500 rows
+        block_size = min(block_size, 64)
+        X = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        row_pairs = np.triu_indices(rows, k=1)
+        blocks = [
+            (start, lambda start=start: _pairwise_signs(X[:, start:start + block_size], row_pairs))
+            for start in range(0, len(columns), block_size)
+        ]
+    else:
+        Z, M = _prepare(numeric, block_size)
+        blocks = [
+            (start, lambda start=start: (Z[:, start:start + block_size], None if M is None else M[:, start:start + block_size]))
+            for start in range(0, len(columns), block_size)
+        ]
+    matrix = np.full((len(columns), len(columns)), np.nan, dtype=np.float32) if output == "array" else None
+
+    def run(i: int, j: int):
+        (start_a, load_a), (start_b, load_b) = blocks[i], blocks[j]
+        Za, Ma = load_a()
+        Zb, Mb = (Za, Ma) if i == j else load_b()
+        r, n = _block(Za, Ma, Zb, Mb, rows, centered=method != "kendall")
+        r = np.clip(r, -1.0, 1.0)
+        if matrix is not None:
+            r = np.where(n >= min_periods, r, np.nan)
+            matrix[start_a:start_a + r.shape[0], start_b:start_b + r.shape[1]] = r
+            matrix[start_b:start_b + r.shape[1], start_a:start_a + r.shape[0]] = r.T
+            return None
+        return _select(r, n, start_a, start_b, i == j, output, top_k, threshold, min_periods)
+
+    tasks = [(i, j) for i in range(len(blocks)) for j in range(i, len(blocks))]
+    workers = workers or config.CORRELATION_WORKERS
+    if workers > 1 and len(tasks) > 1:
+        # NumPy releases the GIL inside matrix products, so blocks run truly in parallel
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(lambda task: run(*task), tasks))
+    else:
+        parts = [run(i, j) for i, j in tasks]
+
+    if matrix is not None:
+        result.update({"columns": columns, "matrix": matrix})
+        return result
+
+    ia, ib, values, counts = (np.concatenate(part) for part in list(zip(*parts))[:4]) if parts else ([],) * 4
+    result["pairs_tested"] = sum(part[4] for part in parts)
+    order = np.argsort(-np.abs(values), kind="stable")
+    limit = top_k if output == "top_k" else config.CORRELATION_MAX_EDGES
+    if output == "edges":
+        result["truncated"] = len(order) > limit
+    result["pairs"] = [
+        {"x": columns[ia[k]], "y": columns[ib[k]], "r": round(float(values[k]), 4), "n": int(counts[k])}
+        for k in order[:limit]
+    ]
+    return result
@@ -1,8 +1,10 @@
+import os
 import pandas as pd
 
 def load_data(filepath: str) -> pd.DataFrame:
     """
-    Loads data from a CSV or Excel file.
+    Loads data from a CSV, Excel, Parquet or Feather (Arrow IPC) file.
+    Columnar formats are memory-mapped and keep the dtypes they were written with.
 
     Args:
         filepath (str): The path to the file.
@@ -17,9 +19,243 @@ def load_data(filepath: str) -> pd.DataFrame:
         return pd.read_csv(filepath)
     elif filepath.endswith('.xlsx'):
         return pd.read_excel(filepath)
+    elif filepath.endswith('.parquet'):
+        return pd.read_parquet(filepath, memory_map=True)
+    elif filepath.endswith(('.feather', '.arrow')):
+        from pyarrow import feather
+        return feather.read_table(filepath, memory_map=True).to_pandas()
     else:
         raise ValueError("Unsupported file type")
 
+def read_head(filepath: str, nrows: int):
+    """
+    Reads the first rows of a supported file without loading the rest.
+
+    Args:
+        filepath (str): The path to the file.
+        nrows (int): The number of rows to read.
+
+    Returns:
+        pd.DataFrame: The leading rows, or None if the format is unsupported.
+    """
+    if filepath.endswith('.csv'):
+        return pd.read_csv(filepath, nrows=nrows)
+    elif filepath.endswith('.xlsx'):
+        return pd.read_excel(filepath, nrows=nrows)
+    elif filepath.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(filepath, memory_map=True)
+        batch = next(parquet_file.iter_batches(batch_size=nrows), None)
+        return batch.to_pandas() if batch is not None else parquet_file.schema_arrow.empty_table().to_pandas()
+    elif filepath.endswith(('.feather', '.arrow')):
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(filepath))
+        if reader.num_record_batches == 0:
+            return reader.schema.empty_table().to_pandas()
+        return reader.get_batch(0).slice(0, nrows).to_pandas()
+    return None
+
+def metadata_row_count(filepath: str):
+    """
+    Reads the row count of a columnar file from its metadata, without scanning the data.
+
+    Args:
+        filepath (str): The path to the file.
+
+    Returns:
+        Optional[int]: The row count, or None for formats without one (CSV, Excel).
+    """
+    if filepath.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(filepath).metadata.num_rows
+    elif filepath.endswith(('.feather', '.arrow')):
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(filepath))
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return None
+
+def _arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts object columns holding mixed Python types to strings so Arrow can store them.
+
+    Args:
+        df (pd.DataFrame): The DataFrame.
+
+    Returns:
+        pd.DataFrame: The DataFrame, with mixed columns stringified (nulls kept).
+    """
+    mixed = [
+        col for col in df.select_dtypes(include=['object']).columns
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed')
+    ]
+    if not mixed:
+        return df
+    df = df.copy()
+    for col in mixed:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def save_data(df: pd.DataFrame, base_path: str, file_format: str = "parquet") -> str:
+    """
+    Saves a DataFrame in the given working format.
+    Parquet and Feather preserve dtypes (datetimes, categories); falls back to CSV if pyarrow is unavailable.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to save.
+        base_path (str): The output path without extension.
+        file_format (str): One of 'parquet', 'feather' or 'csv'.
+
+    Returns:
+        str: The path of the written file.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if file_format in ("parquet", "feather"):
+        try:
+            import pyarrow
+        except ImportError:
+            file_format = "csv"
+
+    if file_format == "parquet":
+        path = f"{base_path}.parquet"
+        _arrow_compatible(df).to_parquet(path, index=False)
+    elif file_format == "feather":
+        path = f"{base_path}.feather"
+        _arrow_compatible(df).reset_index(drop=True).to_feather(path)
+    elif file_format == "csv":
+        path = f"{base_path}.csv"
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {file_format}")
+    return path
+
+class ChunkedWriter:
+    """
+    Writes a dataset chunk by chunk, so output never has to be held in memory at once.
+    The file is written under a temporary name and only moved into place by close(),
+    so a failed run never leaves a truncated dataset behind.
+    The first chunk sets the Arrow schema and later chunks are cast to it. When a chunk does not
+    fit (an int column that now holds fractions, a column that was empty so far), the schema is
+    widened and the rows written so far are rewritten once with it.
+    """
+    def __init__(self, base_path: str, file_format: str = "parquet"):
+        """
+        Initialize the ChunkedWriter.
+
+        Args:
+            base_path (str): The output path without extension.
+            file_format (str): One of 'parquet', 'feather' or 'csv' (falls back to CSV without pyarrow).
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        if file_format in ("parquet", "feather"):
+            try:
+                import pyarrow
+            except ImportError:
+                file_format = "csv"
+        if file_format not in ("parquet", "feather", "csv"):
+            raise ValueError(f"Unsupported output format: {file_format}")
+        self.file_format = file_format
+        self.path = f"{base_path}.{file_format}"
+        self.rows = 0
+        self._tmp_path = f"{self.path}.partial"
+        self._schema = None
+        self._writer = None
+        self._untyped = set() # columns that have only held nulls so far
+
+    def write(self, df: pd.DataFrame):
+        """
+        Appends one chunk.
+
+        Args:
+            df (pd.DataFrame): The rows to write.
+        """
+        if self.file_format == "csv":
+            df.to_csv(self._tmp_path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+            self.rows += len(df)
+            return
+
+        import pyarrow as pa
+        table = pa.Table.from_pandas(_arrow_compatible(df), preserve_index=False)
+        if self._schema is None:
+            # A column that is empty in the first chunk has no type yet; store it as text until one arrives
+            self._untyped = {field.name for field in table.schema if pa.types.is_null(field.type)}
+            self._open(pa.schema([
+                field.with_type(pa.string()) if field.name in self._untyped else field for field in table.schema
+            ], metadata=table.schema.metadata))
+        else:
+            table = table.select(self._schema.names)
+            typed = {field.name: field for field in table.schema if field.name in self._untyped and not pa.types.is_null(field.type)}
+            if typed:
+                self._untyped -= set(typed)
+                self._rewrite(pa.schema([typed.get(field.name, field) for field in self._schema], metadata=self._schema.metadata))
+        try:
+            table = table.cast(self._schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Raises if the types cannot be reconciled (e.g. text in a numeric column)
+            self._rewrite(pa.unify_schemas([self._schema, table.schema], promote_options="permissive"))
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def _open(self, schema):
+        import pyarrow as pa
+        self._schema = schema
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self._tmp_path, schema)
+        else:
+            self._writer = pa.ipc.new_file(self._tmp_path, schema)
+
+    def _rewrite(self, schema):
+        """
+        Re-writes the rows written so far with a wider schema and continues with it.
+        """
+        import pyarrow as pa
+        self._writer.close()
+        old_path = f"{self._tmp_path}.old"
+        os.replace(self._tmp_path, old_path)
+        try:
+            self._open(schema)
+            if self.file_format == "parquet":
+                import pyarrow.parquet as pq
+                batches = pq.ParquetFile(old_path).iter_batches()
+            else:
+                reader = pa.ipc.open_file(pa.memory_map(old_path))
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            for batch in batches:
+                self._writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        finally:
+            os.remove(old_path)
+
+    def close(self) -> str:
+        """
+        Finishes the file and moves it into place.
+
+        Returns:
+            str: The path of the written file.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        elif not os.path.exists(self._tmp_path):
+            # Nothing was written: still produce a valid (empty) file
+            return save_data(pd.DataFrame(), os.path.splitext(self.path)[0], self.file_format)
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        """
+        Discards a partially written file.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
 def get_summary_stats(df: pd.DataFrame) -> dict:
     """
     Generates summary statistics for the DataFrame.
@@ -32,16 +268,20 @@ def get_summary_stats(df: pd.DataFrame) -> dict:
     """
     return df.describe().to_dict()
 
-def get_correlation_matrix(df: pd.DataFrame) -> dict:
+def get_correlation_matrix(df: pd.DataFrame, method: str = "pearson", output: str = "top_k", **kwargs) -> dict:
     """
-    Calculates the correlation matrix for numeric columns.
+    Calculates correlations between the numeric columns with the blockwise engine in tools/correlation.py.
+    Returns the strongest pairs by default rather than the full nested matrix, which grows
+    quadratically with the column count.
 
     Args:
         df (pd.DataFrame): The DataFrame.
+        method (str): 'pearson', 'spearman' or 'kendall' (the last two on a row sample).
+        output (str): 'top_k', 'edges' (pairs above a threshold) or 'array' (float32 matrix).
+        **kwargs: Passed to tools.correlation.correlate (top_k, threshold, workers, ...).
 
     Returns:
-        dict: The correlation matrix.
+        dict: The correlation result.
     """
-    # Select only numeric columns
-    numeric_df = df.select_dtypes(include=['number'])
-    return numeric_df.corr().to_dict()
+    from tools.correlation import correlate
+    return correlate(df, method=method, output=output, **kwargs)
@@ -0,0 +1,292 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterator
+from config import config
+from infrastructure.dataset_cache import file_fingerprint
+
+def iter_chunks(filepath: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Streams a dataset as DataFrame chunks of bounded size.
+
+    Args:
+        filepath (str): The path to the file (CSV, Parquet, Feather or Excel).
+        chunk_rows (int): The maximum number of rows per chunk.
+
+    Yields:
+        pd.DataFrame: Consecutive row chunks.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    if filepath.endswith('.csv'):
+        with pd.read_csv(filepath, chunksize=chunk_rows, low_memory=False) as reader:
+            yield from reader
+    elif filepath.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(filepath, memory_map=True).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif filepath.endswith(('.feather', '.arrow')):
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(filepath))
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows).to_pandas()
+    elif filepath.endswith('.xlsx'):
+        # Excel cannot be streamed; workbooks are small enough to read at once
+        yield pd.read_excel(filepath)
+    else:
+        raise ValueError("Unsupported file type")
+
+class _HyperLogLog:
+    """
+    Fixed-memory approximate distinct counter (about 1.6% standard error at p=12).
+    """
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray):
+        if hashes.size == 0:
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining (64 - p) bits
+        with np.errstate(divide='ignore'):
+            bit_length = np.where(rest > 0, np.floor(np.log2(rest.astype(np.float64))) + 1, 0)
+        rank = (64 - self.p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            return int(round(self.m * np.log(self.m / zeros))) # Linear counting for small cardinalities
+        return int(round(raw))
+
+class _ColumnStats:
+    """
+    Mergeable single-pass accumulator for one column.
+    """
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.kinds = set()
+        self.min = None
+        self.max = None
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared deviations from the mean
+        self.distinct = _HyperLogLog()
+
+    def update(self, series: pd.Series):
+        non_null = series.dropna()
+        self.nulls += len(series) - len(non_null)
+        self.count += len(non_null)
+        if non_null.empty:
+            return
+
+        if pd.api.types.is_bool_dtype(series):
+            self.kinds.add("boolean")
+        elif pd.api.types.is_numeric_dtype(series):
+            self.kinds.add("integer" if pd.api.types.is_integer_dtype(series) else "float")
+            values = non_null.to_numpy(dtype=np.float64)
+            self._merge_moments(values)
+            self._update_range(values.min(), values.max())
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            self.kinds.add("datetime")
+            self._update_range(non_null.min(), non_null.max())
+        else:
+            self.kinds.add("text")
+
+        self.distinct.add(pd.util.hash_pandas_object(non_null, index=False).to_numpy())
+
+    def _merge_moments(self, values: np.ndarray):
+        # Chan et al. pairwise update: stable mean/variance across chunks
+        n_b = len(values)
+        mean_b = float(values.mean())
+        m2_b = float(np.square(values - mean_b).sum())
+        n_a = self.numeric_count
+        total = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / total
+        self.m2 += m2_b + delta * delta * n_a * n_b / total
+        self.numeric_count = total
+
+    def _update_range(self, low, high):
+        # A column can change type between chunks (e.g. numbers, then text)
+        try:
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        except TypeError:
+            self.min, self.max = None, None
+
+class StreamingProfiler:
+    """
+    Single-pass, bounded-memory dataset profiler.
+    Streams the file in chunks and computes row count, null counts, min/max/mean/std,
+    approximate distinct counts (HyperLogLog), a uniform reservoir sample, sample-based
+    median/mode estimates and inferred types.
+    """
+    def __init__(self, chunk_rows: int = None, sample_size: int = None, seed: int = 0):
+        """
+        Initialize the StreamingProfiler.
+
+        Args:
+            chunk_rows (int, optional): Rows read per chunk.
+            sample_size (int, optional): Size of the reservoir sample.
+            seed (int): Random seed for the reservoir sample.
+        """
+        self.chunk_rows = chunk_rows or config.PROFILE_CHUNK_ROWS
+        self.sample_size = sample_size or config.PROFILE_SAMPLE_SIZE
+        self.seed = seed
+
+    def profile(self, filepath: str) -> Dict[str, Any]:
+        """
+        Profiles a dataset in one streaming pass.
+
+        Args:
+            filepath (str): The path to the dataset file.
+
+        Returns:
+            Dict[str, Any]: The profile (row_count, per-column statistics, sample rows).
+        """
+        rng = np.random.default_rng(self.seed)
+        stats: Dict[str, _ColumnStats] = {}
+        dtypes: Dict[str, str] = {}
+        reservoir = []
+        rows_seen = 0
+
+        for chunk in iter_chunks(filepath, self.chunk_rows):
+            for col in chunk.columns:
+                stats.setdefault(col, _ColumnStats()).update(chunk[col])
+                dtypes.setdefault(col, str(chunk[col].dtype))
+
+            # Reservoir sampling (Algorithm R), vectorized per chunk
+            n = len(chunk)
+            fill = min(max(self.sample_size - rows_seen, 0), n)
+            if fill:
+                reservoir.extend(chunk.iloc[:fill].to_dict(orient='records'))
+            if fill < n:
+                positions = np.arange(rows_seen + fill, rows_seen + n)
+                slots = rng.integers(0, positions + 1)
+                for offset, slot in zip(np.nonzero(slots < self.sample_size)[0], slots[slots < self.sample_size]):
+                    reservoir[slot] = chunk.iloc[fill + offset].to_dict()
+            rows_seen += n
+
+        sample = pd.DataFrame(reservoir, columns=list(stats.keys()))
+        columns = {}
+        for col, col_stats in stats.items():
+            mean = std = None
+            if col_stats.numeric_count:
+                mean = col_stats.mean
+                std = float(np.sqrt(col_stats.m2 / col_stats.numeric_count))
+            inferred_type = self._infer_type(col_stats, sample[col])
+            low, high = col_stats.min, col_stats.max
+            if inferred_type == "integer" and low is not None:
+                low, high = int(low), int(high)
+            approx_median = approx_mode = None
+            values = sample[col].dropna()
+            if not values.empty:
+                if col_stats.numeric_count and pd.api.types.is_numeric_dtype(values):
+                    approx_median = float(values.median())
+                approx_mode = values.mode().iloc[0]
+            columns[col] = {
+                "dtype": dtypes[col],
+                "inferred_type": inferred_type,
+                "null_count": int(col_stats.nulls),
+                "null_pct": round(100.0 * col_stats.nulls / rows_seen, 2) if rows_seen else 0.0,
+                "approx_distinct": min(col_stats.distinct.estimate(), col_stats.count),
+                "min": _json_scalar(low),
+                "max": _json_scalar(high),
+                "mean": mean,
+                "std": std,
+                "approx_median": approx_median,
+                "approx_mode": _json_scalar(approx_mode)
+            }
+
+        return {
+            "file": os.path.basename(filepath),
+            "row_count": rows_seen,
+            "column_count": len(columns),
+            "columns": columns,
+            "sample": json.loads(sample.to_json(orient='records', date_format='iso'))
+        }
+
+    def _infer_type(self, col_stats: _ColumnStats, sample: pd.Series) -> str:
+        kinds = col_stats.kinds
+        if not kinds:
+            return "empty"
+        if kinds == {"integer"}:
+            return "integer"
+        if kinds <= {"integer", "float"}:
+            return "float"
+        if len(kinds) == 1 and kinds != {"text"}:
+            return next(iter(kinds))
+
+        # Text (or mixed) columns: look at the sample for values stored as strings
+        values = sample.dropna().astype(str)
+        if values.empty:
+            return "text"
+        if pd.to_numeric(values, errors='coerce').notna().mean() >= 0.95:
+            return "numeric_as_text"
+        parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+        if parsed.notna().mean() >= 0.95:
+            return "datetime_as_text"
+        if col_stats.distinct.estimate() <= max(20, 0.05 * col_stats.count):
+            return "categorical"
+        return "text"
+
+def _json_scalar(value):
+    if value is None:
+        return None
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+_profile_cache: Dict[str, Dict[str, Any]] = {}
+_profile_lock = threading.Lock()
+
+def profile_dataset(filepath: str) -> Dict[str, Any]:
+    """
+    Returns the streaming profile of a dataset, cached by file fingerprint in memory and on disk.
+
+    Args:
+        filepath (str): The path to the dataset file.
+
+    Returns:
+        Dict[str, Any]: The dataset profile (see StreamingProfiler.profile).
+    """
+    key = hashlib.sha256(repr(file_fingerprint(filepath)).encode()).hexdigest()
+    with _profile_lock:
+        if key in _profile_cache:
+            return _profile_cache[key]
+
+    cache_path = os.path.join(config.PROFILE_CACHE_DIR, f"{key}.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            profile = None
+        if profile:
+            with _profile_lock:
+                _profile_cache[key] = profile
+            return profile
+
+    profile = StreamingProfiler().profile(filepath)
+    if not os.path.exists(config.PROFILE_CACHE_DIR):
+        os.makedirs(config.PROFILE_CACHE_DIR, exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, default=str)
+    with _profile_lock:
+        _profile_cache[key] = profile
+    return profile
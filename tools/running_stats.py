@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List
+
+class RunningStats:
+    """
+    Mergeable summary of the numeric columns of a dataset: row count, means, min/max and the
+    co-moment matrix (so variances and Pearson correlations can be derived).
+    Two summaries of disjoint row sets merge exactly (Chan et al.), which lets an
+    append-only refresh update the statistics from the new rows alone.
+    Missing values are skipped like pandas does: each column's moments use the values present
+    in it, and each pair's co-moment uses the rows where both columns are present. The
+    per-pair counts and means are kept (k x k) so that pairwise statistics also merge exactly.
+    """
+    def __init__(self, columns: List[str], rows: int, count, mean, comoment, sumsq, minimum, maximum):
+        k = len(columns)
+        self.columns = list(columns)
+        self.rows = int(rows)
+        # [i, j]: rows where columns i and j are both present, and the mean / sum of squared
+        # deviations of column i over them; the diagonals are the per-column statistics
+        self.count = np.asarray(count, dtype=np.float64).reshape(k, k)
+        self.pair_mean = np.asarray(mean, dtype=np.float64).reshape(k, k)
+        self.comoment = np.asarray(comoment, dtype=np.float64).reshape(k, k)
+        self.sumsq = np.asarray(sumsq, dtype=np.float64).reshape(k, k)
+        self.min = np.asarray(minimum, dtype=np.float64)
+        self.max = np.asarray(maximum, dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "RunningStats":
+        """
+        Summarizes the numeric columns of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The data.
+
+        Returns:
+            RunningStats: The summary.
+        """
+        numeric = df.select_dtypes(include="number", exclude="bool")
+        columns = list(numeric.columns)
+        values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        mask = present.astype(np.float64)
+        count = mask.T @ mask
+        column_count = np.diag(count)
+
+        # Shift by the column means first so the raw sums below do not lose precision
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = np.where(column_count > 0, np.where(present, values, 0.0).sum(axis=0) / column_count, 0.0)
+            x = np.where(present, values - shift, 0.0)
+            pair_mean = np.where(count > 0, (x.T @ mask) / count, 0.0)
+        comoment = x.T @ x - count * pair_mean * pair_mean.T
+        sumsq = np.maximum((x * x).T @ mask - count * pair_mean ** 2, 0.0)
+        return cls(columns, len(df), count, pair_mean + shift[:, None], comoment, sumsq,
+                   numeric.min().to_numpy(dtype=np.float64, na_value=np.nan),
+                   numeric.max().to_numpy(dtype=np.float64, na_value=np.nan))
+
+    @classmethod
+    def from_file(cls, path: str, chunk_rows: int) -> "RunningStats":
+        """
+        Summarizes a dataset file chunk by chunk, without loading it at once.
+
+        Args:
+            path (str): The dataset path.
+            chunk_rows (int): Rows read per chunk.
+
+        Returns:
+            RunningStats: The summary.
+        """
+        from tools.profiler import iter_chunks
+        stats = None
+        for chunk in iter_chunks(path, chunk_rows):
+            chunk_stats = cls.from_frame(chunk)
+            stats = chunk_stats if stats is None else stats.merge(chunk_stats)
+        return stats if stats is not None else cls.from_frame(pd.DataFrame())
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """
+        Combines the summaries of two disjoint row sets with the same numeric columns.
+
+        Args:
+            other (RunningStats): The summary of the additional rows.
+
+        Returns:
+            RunningStats: The summary of both row sets.
+
+        Raises:
+            ValueError: If the numeric columns differ.
+        """
+        if self.columns != other.columns:
+            raise ValueError("Cannot merge statistics of different numeric columns.")
+        count = self.count + other.count
+        delta = other.pair_mean - self.pair_mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(count > 0, self.count * other.count / count, 0.0)
+            mean = self.pair_mean + np.where(count > 0, delta * other.count / count, 0.0)
+        comoment = self.comoment + other.comoment + delta * delta.T * weight
+        sumsq = self.sumsq + other.sumsq + delta ** 2 * weight
+        return RunningStats(self.columns, self.rows + other.rows, count, mean, comoment, sumsq,
+                            np.fmin(self.min, other.min), np.fmax(self.max, other.max))
+
+    @property
+    def n(self) -> np.ndarray:
+        """Values present per column."""
+        return np.diag(self.count)
+
+    @property
+    def mean(self) -> np.ndarray:
+        """Per-column means (NaN for a column with no values)."""
+        return np.where(self.n > 0, np.diag(self.pair_mean), np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        n = self.n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(n > 0, np.sqrt(np.diag(self.comoment) / n), 0.0)
+
+    def correlation(self) -> np.ndarray:
+        """
+        Returns the Pearson correlation matrix over pairwise-complete rows (NaN where a column is constant).
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.comoment / np.sqrt(self.sumsq * self.sumsq.T)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable representation (see from_dict).
+        """
+        return {
+            "columns": self.columns,
+            "rows": self.rows,
+            "count": self.count.tolist(),
+            "mean": self.pair_mean.tolist(),
+            "comoment": self.comoment.tolist(),
+            "sumsq": self.sumsq.tolist(),
+            "min": [None if np.isnan(v) else v for v in self.min.tolist()],
+            "max": [None if np.isnan(v) else v for v in self.max.tolist()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningStats":
+        """
+        Rebuilds a summary from to_dict() output.
+        Summaries saved before pairwise counts were kept (complete rows only) are expanded.
+        """
+        as_float = lambda values: [np.nan if v is None else v for v in values]
+        if "count" not in data:
+            k = len(data["columns"])
+            comoment = np.asarray(data["comoment"], dtype=np.float64).reshape(k, k)
+            return cls(data["columns"], data["rows"], np.full((k, k), data["n"]),
+                       np.repeat(np.asarray(data["mean"], dtype=np.float64)[:, None], k, axis=1), comoment,
+                       np.repeat(np.diag(comoment)[:, None], k, axis=1),
+                       as_float(data["min"]), as_float(data["max"]))
+        return cls(data["columns"], data["rows"], data["count"], data["mean"], data["comoment"], data["sumsq"],
+                   as_float(data["min"]), as_float(data["max"]))
+
+def drifted_analyses(baseline: RunningStats, current: RunningStats, threshold: float) -> List[str]:
+    """
+    Decides which Phase-1 analyses are stale after the data changed.
+
+    - Univariate: a column's mean moved by more than `threshold` standard deviations,
+      or its standard deviation changed by more than `threshold` (relative).
+    - Bivariate: any pairwise correlation moved by more than `threshold` (absolute).
+    - Trend: the row count grew by more than `threshold` (relative).
+
+    Args:
+        baseline (RunningStats): Statistics when the analysis last ran.
+        current (RunningStats): Statistics now.
+        threshold (float): Drift tolerance (e.g. 0.05).
+
+    Returns:
+        List[str]: The analyst specialties to re-run ("Univariate", "Bivariate", "Trend").
+    """
+    if baseline.columns != current.columns:
+        return ["Univariate", "Bivariate", "Trend"]
+
+    drifted = []
+    old_std, new_std = baseline.std, current.std
+    scale = np.where(old_std > 0, old_std, 1.0)
+    mean_shift = np.nan_to_num(np.abs(current.mean - baseline.mean) / scale)
+    std_change = np.nan_to_num(np.abs(new_std - old_std) / scale)
+    if len(scale) and (mean_shift.max() > threshold or std_change.max() > threshold):
+        drifted.append("Univariate")
+
+    if len(scale) > 1:
+        corr_change = np.nan_to_num(np.abs(current.correlation() - baseline.correlation()))
+        if corr_change.max() > threshold:
+            drifted.append("Bivariate")
+
+    if baseline.rows and (current.rows - baseline.rows) / baseline.rows > threshold:
+        drifted.append("Trend")
+    return drifted
@@ -0,0 +1,343 @@
+import os
+import re
+import math
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from functools import partial
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from config import config
+from infrastructure.dataset_cache import file_fingerprint
+from tools.data_ops import save_data, metadata_row_count
+from tools.profiler import iter_chunks
+
+# Questions whose answer a sample cannot estimate (extremes, exact counts, lookups) run on the full data
+_PRECISION_PATTERN = re.compile(
+    r"\b(exact(ly)?|precise(ly)?|total|sum|count|how many|number of|max(imum)?|min(imum)?|largest|smallest|"
+    r"highest|lowest|top \d+|bottom \d+|unique|distinct|duplicates?|ids?|which rows?|list all|every)\b",
+    re.IGNORECASE
+)
+
+class SampleInfo(BaseModel):
+    """
+    A row sample standing in for a large dataset, and how it was drawn.
+    """
+    source_path: str = Field(..., description="The full dataset.")
+    sample_path: str = Field(..., description="The sampled rows (Parquet, original row order).")
+    population: int = Field(..., description="Rows in the full dataset.")
+    rows: int = Field(..., description="Rows in the sample.")
+    stratify_by: Optional[str] = Field(None, description="Column the sample is stratified by (None = reservoir sample).")
+    strata: Dict[str, List[int]] = Field(default_factory=dict, description="Stratum -> [population rows, sampled rows].")
+    target_error: float = Field(..., description="Margin of error the sample size was chosen for.")
+    confidence: float = Field(..., description="Confidence level of the reported intervals.")
+
+    def describe(self) -> str:
+        """
+        One-line description for prompts and replies.
+        """
+        how = f"stratified by '{self.stratify_by}'" if self.stratify_by else "uniform reservoir"
+        return (f"Approximate: {how} sample of {self.rows:,} of {self.population:,} rows; "
+                f"intervals are {self.confidence:.0%} confidence intervals")
+
+def z_score(confidence: float) -> float:
+    """
+    Two-sided normal critical value, e.g. 1.96 for 0.95.
+    """
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def required_sample_size(population: int, target_error: float, confidence: float) -> int:
+    """
+    Rows needed so a mean is estimated within ±target_error standard deviations (and a
+    proportion within ±target_error/2 in the worst case), with the finite population correction.
+
+    Args:
+        population (int): Rows in the full dataset.
+        target_error (float): Margin of error, in standard deviations of the column.
+        confidence (float): Confidence level, e.g. 0.95.
+
+    Returns:
+        int: The sample size (never more than the population).
+    """
+    n0 = (z_score(confidence) / target_error) ** 2
+    n = n0 / (1 + (n0 - 1) / max(population, 1))
+    return min(population, math.ceil(n))
+
+_row_counts: Dict[tuple, int] = {}
+
+def count_rows(path: str) -> int:
+    """
+    Counts the rows of a dataset, from the file metadata for Parquet and Feather
+    (other formats are streamed once and the count is remembered until the file changes).
+    """
+    rows = metadata_row_count(path)
+    if rows is not None:
+        return rows
+    key = file_fingerprint(path)
+    if key not in _row_counts:
+        _row_counts[key] = sum(len(chunk) for chunk in iter_chunks(path, config.PROFILE_CHUNK_ROWS))
+    return _row_counts[key]
+
+def _strata_column(chunk: pd.DataFrame, max_strata: int) -> Optional[str]:
+    """
+    Picks a low-cardinality categorical column to stratify by, judged on the first chunk.
+    """
+    for col in chunk.select_dtypes(include=["object", "category", "string", "bool"]).columns:
+        values = chunk[col]
+        if values.isna().mean() < 0.5 and 2 <= values.nunique() <= max_strata:
+            return str(col)
+    return None
+
+def draw_sample(path: str, rows: int, stratify_by: Optional[str] = None, seed: int = 0) -> Tuple[pd.DataFrame, Dict[str, List[int]]]:
+    """
+    Draws a sample in one streaming pass with bounded memory. Every row gets a random key and
+    each stratum keeps its `rows` smallest keys (a mergeable reservoir); afterwards strata are
+    allocated proportionally, so the sample is self-weighting and plain estimates stay unbiased.
+
+    Args:
+        path (str): The dataset file.
+        rows (int): Sample size.
+        stratify_by (str, optional): Categorical column to stratify by (None = one uniform reservoir).
+        seed (int): Random seed.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, List[int]]]: The sample in original row order, and per
+        stratum [population rows, sampled rows] (empty without stratification).
+    """
+    rng = np.random.default_rng(seed)
+    kept: Dict[Any, pd.DataFrame] = {}
+    counts: Dict[Any, int] = {}
+    offset = 0
+    for chunk in iter_chunks(path, config.PROFILE_CHUNK_ROWS):
+        chunk = chunk.assign(_sample_key=rng.random(len(chunk)), _sample_row=np.arange(offset, offset + len(chunk)))
+        offset += len(chunk)
+        if stratify_by:
+            groups = chunk.groupby(chunk[stratify_by].astype(str).where(chunk[stratify_by].notna(), "<missing>"), sort=False)
+        else:
+            groups = [(None, chunk)]
+        for stratum, group in groups:
+            counts[stratum] = counts.get(stratum, 0) + len(group)
+            pool = group if stratum not in kept else pd.concat([kept[stratum], group])
+            kept[stratum] = pool.nsmallest(rows, "_sample_key") if len(pool) > rows else pool
+
+    population = sum(counts.values())
+    parts, strata = [], {}
+    for stratum, pool in kept.items():
+        share = counts[stratum] if stratify_by is None else max(1, round(rows * counts[stratum] / population))
+        part = pool.nsmallest(min(share, len(pool)), "_sample_key")
+        parts.append(part)
+        if stratify_by:
+            strata[str(stratum)] = [counts[stratum], len(part)]
+    if not parts:
+        return pd.DataFrame(), strata
+    sample = pd.concat(parts).sort_values("_sample_row")
+    return sample.drop(columns=["_sample_key", "_sample_row"]).reset_index(drop=True), strata
+
+_sample_lock = threading.Lock()
+
+def approximate_source(path: str, target_error: float = None, confidence: float = None) -> Optional[SampleInfo]:
+    """
+    Returns the sample an analysis should run on instead of the full dataset, or None when it
+    should use the full data: approximate mode is off (APPROX_ENABLED), the dataset is below
+    APPROX_MIN_ROWS, or the sample would not be much smaller than the data.
+    Samples are cached on disk by file fingerprint and reused until the file changes.
+
+    Args:
+        path (str): The dataset file.
+        target_error (float, optional): Margin of error in standard deviations (default APPROX_TARGET_ERROR).
+        confidence (float, optional): Confidence level (default APPROX_CONFIDENCE).
+
+    Returns:
+        Optional[SampleInfo]: The sample, or None to use the full data.
+    """
+    if not config.APPROX_ENABLED:
+        return None
+    target_error = target_error or config.APPROX_TARGET_ERROR
+    confidence = confidence or config.APPROX_CONFIDENCE
+    population = count_rows(path)
+    rows = required_sample_size(population, target_error, confidence)
+    if population < config.APPROX_MIN_ROWS or rows * 2 > population:
+        return None
+
+    key = hashlib.sha256(repr((file_fingerprint(path), rows, confidence)).encode()).hexdigest()
+    info_path = os.path.join(config.SAMPLE_CACHE_DIR, f"{key}.json")
+    with _sample_lock:
+        if os.path.exists(info_path):
+            try:
+                with open(info_path, 'r', encoding='utf-8') as f:
+                    info = SampleInfo.model_validate_json(f.read())
+                if os.path.exists(info.sample_path):
+                    return info
+            except (OSError, ValueError):
+                pass
+
+        stratify_by = None
+        if config.APPROX_STRATIFY:
+            first = next(iter_chunks(path, config.PROFILE_SAMPLE_SIZE), pd.DataFrame())
+            stratify_by = _strata_column(first, config.APPROX_MAX_STRATA)
+        sample, strata = draw_sample(path, rows, stratify_by)
+        if not os.path.exists(config.SAMPLE_CACHE_DIR):
+            os.makedirs(config.SAMPLE_CACHE_DIR, exist_ok=True)
+        sample_path = save_data(sample, os.path.join(config.SAMPLE_CACHE_DIR, key), "parquet")
+        info = SampleInfo(
+            source_path=os.path.abspath(path), sample_path=sample_path, population=population, rows=len(sample),
+            stratify_by=stratify_by, strata=strata, target_error=target_error, confidence=confidence
+        )
+        with open(info_path, 'w', encoding='utf-8') as f:
+            f.write(info.model_dump_json())
+    return info
+
+def needs_full_data(question: str) -> bool:
+    """
+    True if a question asks for something a sample cannot estimate: exact values, totals and counts,
+    extremes, distinct values or specific rows.
+    """
+    return bool(_PRECISION_PATTERN.search(question))
+
+# --- Confidence intervals ---
+
+def _fpc(n: float, population: int) -> float:
+    if not population or population <= 1:
+        return 1.0
+    return math.sqrt(max(population - n, 0) / (population - 1))
+
+def mean_interval(values, population: int, confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Estimate and confidence interval of a column mean from a sample.
+
+    Args:
+        values: The sampled values (Series or array; missing values are ignored).
+        population (int): Rows in the full dataset.
+        confidence (float): Confidence level.
+
+    Returns:
+        Tuple[float, float, float]: (estimate, low, high).
+    """
+    values = pd.Series(values, dtype="float64").dropna()
+    n = len(values)
+    if n < 2:
+        mean = float(values.mean()) if n else float("nan")
+        return mean, float("nan"), float("nan")
+    mean = float(values.mean())
+    half = z_score(confidence) * float(values.std()) / math.sqrt(n) * _fpc(n, population)
+    return mean, mean - half, mean + half
+
+def proportion_interval(mask, population: int, confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Estimate and Wilson confidence interval of a proportion from a sample.
+
+    Args:
+        mask: Boolean values, True where the condition holds (missing values are ignored).
+        population (int): Rows in the full dataset.
+        confidence (float): Confidence level.
+
+    Returns:
+        Tuple[float, float, float]: (estimate, low, high).
+    """
+    mask = pd.Series(mask).dropna().astype(bool)
+    n = len(mask)
+    if not n:
+        return float("nan"), float("nan"), float("nan")
+    p = float(mask.mean())
+    z = z_score(confidence) * _fpc(n, population)
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return p, max(0.0, center - half), min(1.0, center + half)
+
+def correlation_interval(r: float, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Confidence interval of a Pearson coefficient (Fisher z-transform).
+    """
+    if r is None or n is None or n <= 3 or not math.isfinite(r):
+        return float("nan"), float("nan")
+    z = math.atanh(max(min(r, 0.999999), -0.999999))
+    half = z_score(confidence) / math.sqrt(n - 3)
+    return math.tanh(z - half), math.tanh(z + half)
+
+def slope_interval(slope: float, r_squared: float, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    Confidence interval of an OLS slope, from the slope, R² and the number of points.
+    """
+    if slope is None or r_squared is None or n is None or n <= 2 or not r_squared > 0:
+        return float("nan"), float("nan")
+    se = abs(slope) * math.sqrt(max(1 - r_squared, 0.0) / (r_squared * (n - 2)))
+    half = z_score(confidence) * se
+    return slope - half, slope + half
+
+def code_helpers(info: SampleInfo) -> Dict[str, Any]:
+    """
+    Names injected into generated code that runs on a sample: the population size and
+    `ci_mean(values)` / `ci_proportion(mask)`, which return (estimate, low, high).
+    """
+    return {
+        "POPULATION_ROWS": info.population,
+        "ci_mean": partial(mean_interval, population=info.population, confidence=info.confidence),
+        "ci_proportion": partial(proportion_interval, population=info.population, confidence=info.confidence)
+    }
+
+def code_instructions(info: SampleInfo) -> str:
+    """
+    Prompt text telling generated code how to report estimates from a sample.
+    """
+    level = f"{info.confidence:.0%}"
+    return (
+        f"APPROXIMATE MODE: `df` is a random sample of {info.rows:,} of the {info.population:,} rows"
+        f"{f', stratified by {info.stratify_by!r}' if info.stratify_by else ''}. "
+        f"Print every estimate with its {level} confidence interval: `ci_mean(series)` and "
+        f"`ci_proportion(boolean_series)` return (estimate, low, high). Scale counts and sums by "
+        f"POPULATION_ROWS / len(df) and say they are estimates. Do not report minimum, maximum or exact counts as facts."
+    )
+
+def _sig(value: float) -> Optional[float]:
+    return float(f"{value:.4g}") if value is not None and math.isfinite(value) else None
+
+def _interval(bounds: Tuple[float, float]) -> List[Optional[float]]:
+    return [_sig(b) for b in bounds]
+
+def annotate_phase1(stats: Dict[str, Optional[Dict[str, Any]]], info: SampleInfo) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Adds confidence intervals next to the Phase-1 statistics computed on a sample
+    (see tools/stats_kernel.phase1_stats): column means, Pearson coefficients and trend slopes.
+
+    Args:
+        stats (dict): The Phase-1 statistics of the sample.
+        info (SampleInfo): The sample.
+
+    Returns:
+        dict: The statistics with a `sample` note and `*_ci` intervals.
+    """
+    key = f"ci{round(info.confidence * 100)}"
+    note = {"sample": info.describe()}
+    annotated = {}
+    for specialty, scan in stats.items():
+        if not scan:
+            annotated[specialty] = scan
+            continue
+        scan = json.loads(json.dumps(scan))
+        if specialty == "Univariate":
+            for col_stats in scan.get("columns", {}).values():
+                n, mean, std = col_stats.get("count"), col_stats.get("mean"), col_stats.get("std")
+                if n and n > 1 and mean is not None and std is not None:
+                    half = z_score(info.confidence) * std / math.sqrt(n) * _fpc(n, info.population)
+                    col_stats[f"mean_{key}"] = _interval((mean - half, mean + half))
+        elif specialty == "Bivariate":
+            for pair in scan.get("top_pairs", []):
+                pair[f"pearson_r_{key}"] = _interval(correlation_interval(pair.get("pearson_r"), pair.get("n"), info.confidence))
+        elif specialty == "Trend":
+            if scan.get("time_axis") == "row order":
+                # Sampled rows are further apart than dataset rows; rescale, but the positions
+                # are only known up to sampling noise, so no interval is claimed
+                scan["span"] = f"{info.population} rows"
+                for trend in scan.get("trends", {}).values():
+                    if trend.get("slope_per_row") is not None:
+                        trend["slope_per_row"] = _sig(trend["slope_per_row"] * info.rows / info.population)
+            else:
+                for trend in scan.get("trends", {}).values():
+                    slope_key = next((k for k in trend if k.startswith("slope_")), None)
+                    if slope_key:
+                        trend[f"{slope_key}_{key}"] = _interval(slope_interval(trend[slope_key], trend.get("r_squared"), info.rows, info.confidence))
+        annotated[specialty] = {**note, **scan}
+    return annotated
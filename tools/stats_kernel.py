@@ -0,0 +1,282 @@
+import math
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+from tools.correlation import correlate
+
+_TIME_HINTS = ("date", "time", "day", "month", "year", "period", "timestamp")
+
+def _numeric_matrix(df: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
+    """
+    Extracts the numeric (non-boolean) columns as one float64 matrix, NaN for missing values.
+    """
+    numeric = df.select_dtypes(include="number", exclude="bool")
+    return [str(c) for c in numeric.columns], numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _p_values(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Two-sided p-values for Pearson coefficients (Student t; normal approximation without scipy).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.abs(r) * np.sqrt((n - 2) / np.clip(1 - r * r, 1e-12, None))
+    try:
+        from scipy import stats
+        return 2 * stats.t.sf(t, np.clip(n - 2, 1, None))
+    except ImportError:
+        return np.vectorize(math.erfc)(t / math.sqrt(2))
+
+def _round(value: Any, digits: int = 4) -> Any:
+    if isinstance(value, dict):
+        return {k: _round(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round(v, digits) for v in value]
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if not math.isfinite(value):
+            return None
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+def univariate_stats(columns: List[str], X: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """
+    Distribution statistics for every column at once.
+    Skewness and excess kurtosis use the same bias-adjusted estimators as pandas.
+
+    Args:
+        columns (List[str]): Column names.
+        X (np.ndarray): Rows x columns, NaN for missing values.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Per column: count, mean, std, min, q1, median, q3, max, iqr, skew, kurtosis, outliers.
+    """
+    n = np.sum(~np.isnan(X), axis=0).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # All-NaN columns
+        mean = np.nanmean(X, axis=0)
+        d = X - mean
+        m2 = np.nanmean(d ** 2, axis=0)
+        m3 = np.nanmean(d ** 3, axis=0)
+        m4 = np.nanmean(d ** 4, axis=0)
+        g1 = m3 / m2 ** 1.5
+        g2 = m4 / m2 ** 2 - 3
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * g1
+        kurtosis = ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3))
+        std = np.sqrt(m2 * n / (n - 1))
+        q1, median, q3 = np.nanpercentile(X, [25, 50, 75], axis=0)
+        iqr = q3 - q1
+        outliers = np.sum((X < q1 - 1.5 * iqr) | (X > q3 + 1.5 * iqr), axis=0)
+        low, high = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+
+    return {
+        col: {
+            "count": int(n[i]), "mean": mean[i], "std": std[i], "min": low[i], "q1": q1[i], "median": median[i],
+            "q3": q3[i], "max": high[i], "iqr": iqr[i], "skew": skew[i], "kurtosis": kurtosis[i],
+            "outliers_1.5iqr": int(outliers[i])
+        }
+        for i, col in enumerate(columns)
+    }
+
+def bivariate_stats(columns: List[str], X: np.ndarray, top_k: int = 15) -> Dict[str, Any]:
+    """
+    The strongest pairwise linear relationships, found with the blocked float32 kernel of
+    tools/correlation.py; covariance and p-value are added for the reported pairs only.
+
+    Args:
+        columns (List[str]): Column names.
+        X (np.ndarray): Rows x columns, NaN for missing values.
+        top_k (int): Pairs to report.
+
+    Returns:
+        Dict[str, Any]: The number of pairs and the top pairs by |r| with covariance, n and p-value.
+    """
+    # Positional column labels, so duplicate names still map back to their own column
+    found = correlate(pd.DataFrame(X, copy=False), method="pearson", output="top_k", top_k=top_k)
+    pairs = []
+    for pair in found["pairs"]:
+        i, j = int(pair["x"]), int(pair["y"])
+        both = ~np.isnan(X[:, i]) & ~np.isnan(X[:, j])
+        covariance = np.cov(X[both, i], X[both, j])[0, 1]
+        pairs.append({
+            "x": columns[i], "y": columns[j], "pearson_r": pair["r"],
+            "covariance": covariance, "n": pair["n"], "p_value": _p_values(np.array([pair["r"]]), np.array([pair["n"]]))[0]
+        })
+    return {"numeric_columns": len(columns), "pairs_tested": found["pairs_tested"], "top_pairs": pairs}
+
+def find_time_column(df: pd.DataFrame) -> Tuple[Optional[str], Optional[pd.Series]]:
+    """
+    Picks the column that orders the rows in time: a datetime column, or a text column
+    with a date-like name whose values parse as dates.
+
+    Returns:
+        Tuple[Optional[str], Optional[pd.Series]]: The column name and its parsed values, or (None, None).
+    """
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            return str(col), df[col]
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        if any(hint in str(col).lower() for hint in _TIME_HINTS):
+            parsed = pd.to_datetime(df[col], errors="coerce", format="mixed")
+            if parsed.notna().mean() >= 0.95:
+                return str(col), parsed
+    return None, None
+
+def _time_axis(df: pd.DataFrame) -> Tuple[str, np.ndarray, str, str]:
+    """
+    Returns (label, time of each row as float, unit, span description).
+    Time is in days since the first timestamp, or the row number when there is no time column.
+    """
+    time_column, times = find_time_column(df)
+    if times is None:
+        return "row order", np.arange(len(df), dtype=np.float64), "per_row", f"{len(df)} rows"
+    t = (times - times.min()).dt.total_seconds().to_numpy(dtype=np.float64) / 86400.0
+    return time_column, t, "per_day", f"{times.min()} to {times.max()}"
+
+def _time_sorted(df: pd.DataFrame, X: np.ndarray) -> Tuple[str, np.ndarray, np.ndarray, str, str]:
+    label, t, unit, span = _time_axis(df)
+    order = np.argsort(t, kind="stable")
+    t, X = t[order], X[order]
+    keep = np.isfinite(t)
+    return label, t[keep], X[keep], unit, span
+
+def trend_stats(df: pd.DataFrame, columns: List[str], X: np.ndarray, max_columns: int = 50) -> Dict[str, Any]:
+    """
+    Linear trend of every numeric column against time (or row order when there is no time column).
+
+    Args:
+        df (pd.DataFrame): The dataset (to find the time column).
+        columns (List[str]): Numeric column names.
+        X (np.ndarray): Rows x columns, NaN for missing values.
+        max_columns (int): Columns to report, strongest trends first.
+
+    Returns:
+        Dict[str, Any]: The time axis used and per column: slope per unit, R², and growth
+        between the first and last 10% of rows.
+    """
+    label, t, X, unit, span = _time_sorted(df, X)
+    present = ~np.isnan(X)
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # All-NaN columns
+        n = present.sum(axis=0)
+        t_mean = (t @ present) / n
+        dt = np.where(present, t[:, None] - t_mean, 0.0)
+        dy = np.where(present, X - np.nanmean(X, axis=0), 0.0)
+        sxy = np.sum(dt * dy, axis=0)
+        sxx = np.sum(dt * dt, axis=0)
+        syy = np.sum(dy * dy, axis=0)
+        slope = sxy / sxx
+        r2 = sxy ** 2 / (sxx * syy)
+        edge = max(1, len(t) // 10)
+        first, last = np.nanmean(X[:edge], axis=0), np.nanmean(X[-edge:], axis=0)
+        growth = (last - first) / np.abs(first) * 100
+
+    ranked = np.argsort(-np.nan_to_num(r2, nan=-1.0))[:max_columns]
+    return {
+        "time_axis": label,
+        "span": span,
+        "trends": {
+            columns[i]: {
+                f"slope_{unit}": slope[i], "r_squared": r2[i],
+                "first_10pct_mean": first[i], "last_10pct_mean": last[i], "growth_pct": growth[i]
+            }
+            for i in ranked
+        }
+    }
+
+def phase1_stats(df: pd.DataFrame, max_columns: int = 50) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Computes the Univariate, Bivariate and Trend scans from one numeric matrix.
+
+    Args:
+        df (pd.DataFrame): The cleaned dataset.
+        max_columns (int): Upper bound on per-column entries reported per scan (keeps prompts small).
+
+    Returns:
+        Dict[str, Optional[Dict[str, Any]]]: Rounded, JSON-ready statistics per specialty
+        (None where the scan does not apply, e.g. fewer than two numeric columns for Bivariate).
+    """
+    columns, X = _numeric_matrix(df)
+    if not columns:
+        return {"Univariate": None, "Bivariate": None, "Trend": None}
+
+    univariate = univariate_stats(columns, X)
+    # Most unusual distributions first
+    ranked = sorted(univariate, key=lambda c: -(abs(np.nan_to_num(univariate[c]["skew"])) + univariate[c]["outliers_1.5iqr"] / max(univariate[c]["count"], 1)))
+    trend = trend_stats(df, columns, X, max_columns)
+    return {
+        "Univariate": _round({
+            "rows": len(df),
+            "numeric_columns": len(columns),
+            "columns": {c: univariate[c] for c in ranked[:max_columns]}
+        }),
+        "Bivariate": _round(bivariate_stats(columns, X)) if len(columns) > 1 else None,
+        "Trend": _round(trend)
+    }
+
+def plot_phase1(df: pd.DataFrame, specialty: str, stats: Dict[str, Any], plot_path: str) -> Optional[str]:
+    """
+    Renders the chart for one Phase-1 scan with the object-oriented Matplotlib API
+    (no pyplot global state, so it is safe to call from worker threads).
+
+    Args:
+        df (pd.DataFrame): The cleaned dataset.
+        specialty (str): "Univariate", "Bivariate" or "Trend".
+        stats (Dict[str, Any]): The scan's statistics (see phase1_stats).
+        plot_path (str): Where to save the PNG.
+
+    Returns:
+        Optional[str]: The plot path, or None if there is nothing to plot.
+    """
+    from matplotlib.figure import Figure
+
+    if specialty == "Univariate":
+        cols = list(stats["columns"])[:9]
+        if not cols:
+            return None
+        rows = math.ceil(len(cols) / 3)
+        fig = Figure(figsize=(12, 3 * rows))
+        for i, col in enumerate(cols):
+            ax = fig.add_subplot(rows, 3, i + 1)
+            ax.hist(df[col].dropna().to_numpy(dtype=np.float64), bins=40, color="#4C72B0")
+            ax.set_title(f"{col} (skew={stats['columns'][col]['skew']})", fontsize=9)
+    elif specialty == "Bivariate":
+        pairs = stats["top_pairs"]
+        cols = list(dict.fromkeys([p["x"] for p in pairs] + [p["y"] for p in pairs]))[:20]
+        if len(cols) < 2:
+            return None
+        corr = correlate(df[cols], method="pearson", output="array")["matrix"]
+        fig = Figure(figsize=(2 + 0.5 * len(cols), 1 + 0.5 * len(cols)))
+        ax = fig.add_subplot(1, 1, 1)
+        image = ax.imshow(corr, cmap="coolwarm", vmin=-1, vmax=1)
+        ax.set_xticks(range(len(cols)), cols, rotation=90, fontsize=7)
+        ax.set_yticks(range(len(cols)), cols, fontsize=7)
+        ax.set_title("Pearson correlation (strongest pairs)")
+        fig.colorbar(image, ax=ax)
+    elif specialty == "Trend":
+        cols = list(stats["trends"])[:4]
+        if not cols:
+            return None
+        _, t, X, _, _ = _time_sorted(df, df[cols].to_numpy(dtype=np.float64, na_value=np.nan))
+        if not len(t):
+            return None
+        # Average into at most 200 time bins so millions of rows plot instantly
+        width = max(np.ptp(t), 1e-12)
+        bins = np.minimum(((t - t.min()) / width * 200).astype(int), 199)
+        centers = t.min() + (np.arange(200) + 0.5) * width / 200
+        fig = Figure(figsize=(12, 2.5 * len(cols)))
+        for i, col in enumerate(cols):
+            ax = fig.add_subplot(len(cols), 1, i + 1)
+            ok = ~np.isnan(X[:, i])
+            counts = np.bincount(bins[ok], minlength=200)
+            sums = np.bincount(bins[ok], weights=X[ok, i], minlength=200)
+            filled = counts > 0
+            ax.plot(centers[filled], sums[filled] / counts[filled], color="#DD8452")
+            ax.set_title(f"{col} vs {stats['time_axis']} (R²={stats['trends'][col]['r_squared']})", fontsize=9)
+    else:
+        raise ValueError(f"Unknown Phase-1 specialty: {specialty}")
+
+    fig.tight_layout()
+    fig.savefig(plot_path, dpi=100)
+    return plot_path